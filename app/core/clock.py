@@ -0,0 +1,87 @@
+import asyncio
+import selectors
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Union
+
+
+class SystemClock:
+    """Relógio real (padrão): time.monotonic, time.perf_counter e UTC atual"""
+
+    monotonic = staticmethod(time.monotonic)
+    perf_counter = staticmethod(time.perf_counter)
+
+    @staticmethod
+    def now() -> datetime:
+        return datetime.now(timezone.utc)
+
+    @staticmethod
+    def new_event_loop() -> asyncio.AbstractEventLoop:
+        return asyncio.new_event_loop()
+
+
+class VirtualClock:
+    """Relógio simulado que só avança quando o event loop fica ocioso
+
+    Usado com o loop de `new_event_loop()`: em vez de bloquear no select
+    até o próximo timer, o loop pula o relógio direto para ele. Assim
+    asyncio.sleep, wait_for e os timers dos componentes (que leem este
+    relógio) andam em tempo virtual, e uma simulação sem I/O real roda
+    tão rápido quanto a CPU permite, de forma determinística.
+    """
+
+    # Vários componentes tratam instante 0 como "nunca" (ex.: checked_at do
+    # health check), então o relógio monotônico começa longe de zero
+    ORIGIN = 1_000_000.0
+
+    def __init__(self, start: datetime = datetime(2025, 1, 1, tzinfo=timezone.utc)):
+        self.start = start
+        self.elapsed = 0.0
+
+    def monotonic(self) -> float:
+        return self.ORIGIN + self.elapsed
+
+    perf_counter = monotonic
+
+    def now(self) -> datetime:
+        return self.start + timedelta(seconds=self.elapsed)
+
+    def advance(self, seconds: float) -> None:
+        self.elapsed += seconds
+
+    def new_event_loop(self) -> asyncio.AbstractEventLoop:
+        return VirtualEventLoop(self)
+
+
+class VirtualSelector(selectors.DefaultSelector):
+    """Select que nunca espera: avança o relógio virtual pelo timeout"""
+
+    def __init__(self, clock: VirtualClock):
+        super().__init__()
+        self.clock = clock
+
+    def select(self, timeout=None):
+        events = super().select(0)
+        if events or timeout == 0:
+            return events
+        if timeout is None:
+            # Nada agendado: só outra thread (call_soon_threadsafe) acorda o loop
+            return super().select(None)
+        self.clock.advance(timeout)
+        return []
+
+
+class VirtualEventLoop(asyncio.SelectorEventLoop):
+    """Event loop cujo time() é o relógio virtual"""
+
+    def __init__(self, clock: VirtualClock):
+        super().__init__(VirtualSelector(clock))
+        self.clock = clock
+
+    def time(self) -> float:
+        return self.clock.monotonic()
+
+
+Clock = Union[SystemClock, VirtualClock]
+
+system_clock = SystemClock()
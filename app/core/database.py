@@ -4,6 +4,8 @@ from sqlmodel import SQLModel
 from typing import AsyncGenerator
 
 from app.core.config import settings
+from app.core.storage import is_embedded
+from app.models.payment import PARTITIONED
 
 
 def create_database_engine() -> AsyncEngine:
@@ -12,8 +14,9 @@ def create_database_engine() -> AsyncEngine:
         settings.database_url,
         echo=False,
         future=True,
-        pool_size=settings.pool_size,
-        max_overflow=settings.max_overflow,
+        # Com vários processos o pool é dividido entre eles
+        pool_size=max(1, settings.pool_size // settings.workers),
+        max_overflow=max(0, settings.max_overflow // settings.workers),
         pool_pre_ping=True,
         pool_recycle=3600,
         connect_args={
@@ -26,13 +29,49 @@ def create_database_engine() -> AsyncEngine:
     )
 
 
-engine = create_database_engine()
+# Com o engine local (embedded://) não há banco SQL
+engine = None if is_embedded(settings.database_url) else create_database_engine()
+
+
+def asyncpg_dsn() -> str:
+    """DSN para conexões asyncpg diretas (sem o prefixo do dialeto)"""
+    return settings.database_url.replace("postgresql+asyncpg://", "postgresql://")
+
+
+def create_missing_indexes(connection) -> None:
+    """Índices declarados depois que a tabela já existia (create_all os pula)"""
+    for table in SQLModel.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(connection, checkfirst=True)
+
+
+def check_partitioning(connection) -> None:
+    """Falha no startup se payments não tem o layout da configuração
+
+    O layout do modelo (PK e PARTITION BY) é fixado na importação por
+    payments_partition_hours, e create_all não altera uma tabela que já
+    existe: trocar a configuração exige recriar (ou migrar) a tabela.
+    """
+    kind = connection.exec_driver_sql(
+        "SELECT relkind::text FROM pg_class WHERE relname = 'payments'"
+    ).scalar()
+    if (kind == "p") != PARTITIONED:
+        layout = "partitioned" if kind == "p" else "not partitioned"
+        raise RuntimeError(
+            f"payments table is {layout} but payments_partition_hours="
+            f"{settings.payments_partition_hours}; recreate or migrate the table"
+        )
 
 
 async def init_db() -> None:
     """Initialize database tables"""
+    if engine is None:
+        return
     async with engine.begin() as conn:
         await conn.run_sync(SQLModel.metadata.create_all)
+        await conn.run_sync(check_partitioning)
+        await conn.run_sync(create_missing_indexes)
+
 
 async_session = sessionmaker(
     engine,
@@ -44,4 +83,4 @@ async_session = sessionmaker(
 async def get_session() -> AsyncGenerator[AsyncSession, None]:
     """Get database session"""
     async with async_session() as session:
-        yield session
\ No newline at end of file
+        yield session
@@ -0,0 +1,229 @@
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+from app.core.config import settings
+
+
+# Buckets exponenciais de 100µs a ~13s (em segundos)
+LATENCY_BUCKETS = tuple(0.0001 * 2**i for i in range(18))
+
+# Tamanhos de lote (potências de 2 até 1024)
+SIZE_BUCKETS = tuple(float(2**i) for i in range(11))
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], *extra: str) -> str:
+    parts = [f'{name}="{value}"' for name, value in zip(names, values)]
+    parts.extend(filter(None, extra))
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value)
+
+
+class Counter:
+    """Contador monotônico (o event loop é single-thread: sem locks)"""
+
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0
+
+    def inc(self, amount: int = 1) -> None:
+        self.value += amount
+
+
+class Histogram:
+    """Histograma de buckets fixos: observe() é um bisect e dois incrementos"""
+
+    __slots__ = ("bounds", "counts", "sum")
+
+    def __init__(self, bounds: Sequence[float]):
+        self.bounds = tuple(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+
+    @property
+    def count(self) -> int:
+        return sum(self.counts)
+
+    def quantile(self, q: float) -> float:
+        """Estimativa do quantil pelo limite superior do bucket"""
+        total = self.count
+        if not total:
+            return 0.0
+        target = q * total
+        seen = 0
+        for bound, count in zip(self.bounds, self.counts):
+            seen += count
+            if seen >= target:
+                return bound
+        return self.bounds[-1]
+
+
+class MetricFamily:
+    """Família de métricas com labels; filhos são criados uma vez e reutilizados"""
+
+    def __init__(
+        self,
+        kind: str,
+        name: str,
+        help_text: str,
+        label_names: Sequence[str] = (),
+        factory: Callable = Counter,
+    ):
+        self.kind = kind
+        self.name = name
+        self.help = help_text
+        self.label_names = tuple(label_names)
+        self.factory = factory
+        self.children: Dict[Tuple[str, ...], Union[Counter, Histogram]] = {}
+
+        # Sem labels: exporta zero desde o início e liga os atalhos direto no
+        # filho, evitando o lookup por labels a cada observação
+        if not self.label_names:
+            child = self.labels()
+            for method in ("inc", "observe"):
+                if hasattr(child, method):
+                    setattr(self, method, getattr(child, method))
+
+    def labels(self, *values: str, **kwargs: str):
+        """Obtém (ou cria) o filho para os valores de label"""
+        if kwargs:
+            values = tuple(str(kwargs[name]) for name in self.label_names)
+        key = tuple(str(value) for value in values)
+        child = self.children.get(key)
+        if child is None:
+            child = self.children[key] = self.factory()
+        return child
+
+    # Atalhos para famílias sem labels
+    def inc(self, amount: int = 1) -> None:
+        self.labels().inc(amount)
+
+    def observe(self, value: float) -> None:
+        self.labels().observe(value)
+
+    def render(self, const: str = "") -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+        for values, child in self.children.items():
+            if isinstance(child, Histogram):
+                cumulative = 0
+                bounds = (*child.bounds, float("inf"))
+                for bound, count in zip(bounds, child.counts):
+                    cumulative += count
+                    labels = _format_labels(
+                        self.label_names, values, const, f'le="{_format_value(bound)}"'
+                    )
+                    lines.append(f"{self.name}_bucket{labels} {cumulative}")
+                labels = _format_labels(self.label_names, values, const)
+                lines.append(f"{self.name}_sum{labels} {_format_value(child.sum)}")
+                lines.append(f"{self.name}_count{labels} {cumulative}")
+            else:
+                labels = _format_labels(self.label_names, values, const)
+                lines.append(f"{self.name}{labels} {_format_value(child.value)}")
+
+        return lines
+
+
+class GaugeFamily:
+    """Gauge lido sob demanda de uma função (valor ou {labels: valor})"""
+
+    def __init__(
+        self,
+        name: str,
+        help_text: str,
+        func: Callable[[], Union[float, Dict[Tuple[str, ...], float]]],
+        label_names: Sequence[str] = (),
+    ):
+        self.name = name
+        self.help = help_text
+        self.func = func
+        self.label_names = tuple(label_names)
+
+    def render(self, const: str = "") -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} gauge"]
+        value = self.func()
+        items = value.items() if isinstance(value, dict) else [((), value)]
+        for values, sample in items:
+            labels = _format_labels(self.label_names, values, const)
+            lines.append(f"{self.name}{labels} {_format_value(float(sample))}")
+        return lines
+
+
+class MetricsRegistry:
+    """Registro global exportado em /metrics no formato texto do Prometheus
+
+    O registro é por processo. Com `workers` > 1 cada scrape cai no worker
+    que o kernel escolher (SO_REUSEPORT) e mostra só os valores dele, então
+    toda série leva o label `worker` (o slot): contadores de workers
+    diferentes não se misturam e o total vem de sum(rate(...)) por série.
+    """
+
+    def __init__(self, prefix: str = "rinha_"):
+        self.prefix = prefix
+        self.families: Dict[str, Union[MetricFamily, GaugeFamily]] = {}
+
+    def counter(
+        self, name: str, help_text: str, labels: Sequence[str] = ()
+    ) -> MetricFamily:
+        return self._register(
+            MetricFamily("counter", self.prefix + name, help_text, labels, Counter)
+        )
+
+    def histogram(
+        self,
+        name: str,
+        help_text: str,
+        labels: Sequence[str] = (),
+        buckets: Optional[Iterable[float]] = None,
+    ) -> MetricFamily:
+        bounds = tuple(buckets or LATENCY_BUCKETS)
+        return self._register(
+            MetricFamily(
+                "histogram",
+                self.prefix + name,
+                help_text,
+                labels,
+                lambda: Histogram(bounds),
+            )
+        )
+
+    def gauge(
+        self,
+        name: str,
+        help_text: str,
+        func: Callable,
+        labels: Sequence[str] = (),
+    ) -> GaugeFamily:
+        """Registra (ou substitui) um gauge calculado na coleta"""
+        family = GaugeFamily(self.prefix + name, help_text, func, labels)
+        self.families[family.name] = family
+        return family
+
+    def _register(self, family: MetricFamily) -> MetricFamily:
+        # Mesmo nome: reaproveita a família existente
+        existing = self.families.get(family.name)
+        if isinstance(existing, MetricFamily):
+            return existing
+        self.families[family.name] = family
+        return family
+
+    def render(self) -> str:
+        const = f'worker="{settings.worker_slot}"' if settings.workers > 1 else ""
+        lines = []
+        for family in self.families.values():
+            lines.extend(family.render(const))
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
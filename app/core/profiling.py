@@ -0,0 +1,215 @@
+import asyncio
+import os
+import sys
+import threading
+import time
+from collections import Counter, deque
+from typing import Deque, Dict, List, Optional
+
+from fastapi import Request
+
+from app.core.config import settings
+from app.core.metrics import registry
+
+
+LOOP_LAG_SECONDS = registry.histogram(
+    "loop_lag_seconds", "Atraso de agendamento do event loop"
+)
+SLOW_CALLBACKS = registry.counter(
+    "slow_callbacks_total", "Vezes em que o event loop ficou bloqueado"
+)
+
+# Relatórios de callbacks lentos mantidos em memória
+MAX_SLOW_REPORTS = 50
+
+
+def frame_label(frame) -> str:
+    """Nome do frame no formato "funcao (arquivo:linha_da_def)" """
+    code = frame.f_code
+    filename = code.co_filename
+    cwd = os.getcwd()
+    if filename.startswith(cwd):
+        filename = filename[len(cwd) + 1 :]
+    return f"{code.co_name} ({filename}:{code.co_firstlineno})"
+
+
+def collapse_stack(frame) -> str:
+    """Pilha da raiz até a folha separada por ";" (formato collapsed)"""
+    labels = []
+    while frame is not None:
+        labels.append(frame_label(frame))
+        frame = frame.f_back
+    return ";".join(reversed(labels))
+
+
+def format_stack(frame) -> List[str]:
+    """Pilha legível (folha por último) com a linha atual de cada frame"""
+    lines = []
+    while frame is not None:
+        code = frame.f_code
+        lines.append(f"{code.co_filename}:{frame.f_lineno} in {code.co_name}")
+        frame = frame.f_back
+    return list(reversed(lines))
+
+
+class LoopLagMonitor:
+    """Mede o atraso do event loop e captura a pilha quando ele trava
+
+    Uma task dorme `interval` e registra quanto acordou atrasada; a cada
+    volta ela também atualiza um heartbeat. Uma thread watchdog confere o
+    heartbeat e, se o loop passou de `slow_ms` sem rodar, lê a pilha da
+    thread do loop com sys._current_frames() (o callback que está travando).
+    """
+
+    def __init__(
+        self,
+        interval_ms: Optional[int] = None,
+        slow_ms: Optional[int] = None,
+    ):
+        self.interval = (interval_ms or settings.loop_lag_interval_ms) / 1000
+        self.slow = (slow_ms or settings.slow_callback_ms) / 1000
+        self.reports: Deque[Dict] = deque(maxlen=MAX_SLOW_REPORTS)
+        self.max_lag = 0.0
+        self.running = False
+
+        self._heartbeat = time.monotonic()
+        self._loop_thread_id: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+
+    async def start(self) -> None:
+        """Inicia a task de medição e a thread watchdog"""
+        self.running = True
+        self._loop_thread_id = threading.get_ident()
+        self._heartbeat = time.monotonic()
+        self._stopped.clear()
+        self._task = asyncio.create_task(self._run())
+        self._watchdog = threading.Thread(
+            target=self._watch, name="loop-watchdog", daemon=True
+        )
+        self._watchdog.start()
+
+    async def stop(self) -> None:
+        """Para a medição"""
+        self.running = False
+        self._stopped.set()
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+        if self._watchdog:
+            await asyncio.to_thread(self._watchdog.join)
+
+    async def _run(self) -> None:
+        """Dorme um intervalo e registra o atraso ao acordar"""
+        while self.running:
+            start_time = time.monotonic()
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            self._heartbeat = now
+
+            lag = max(now - start_time - self.interval, 0.0)
+            LOOP_LAG_SECONDS.observe(lag)
+            self.max_lag = max(self.max_lag, lag)
+
+    def _watch(self) -> None:
+        """Thread watchdog: captura a pilha do loop quando o heartbeat atrasa"""
+        reported = None
+        while not self._stopped.wait(self.slow / 2):
+            heartbeat = self._heartbeat
+            blocked = time.monotonic() - heartbeat - self.interval
+            # Um relatório por travamento (o heartbeat muda quando o loop volta)
+            if blocked < self.slow or reported == heartbeat:
+                continue
+
+            frame = sys._current_frames().get(self._loop_thread_id)
+            if frame is None:
+                continue
+
+            reported = heartbeat
+            stack = format_stack(frame)
+            SLOW_CALLBACKS.inc()
+            self.reports.append(
+                {
+                    "at": time.time(),
+                    "blocked_ms": round(blocked * 1000, 1),
+                    "stack": stack,
+                }
+            )
+            print(
+                f"Event loop blocked for {blocked * 1000:.0f} ms at:\n  "
+                + "\n  ".join(stack[-8:])
+            )
+
+    def snapshot(self) -> Dict:
+        """Resumo do atraso e dos travamentos recentes"""
+        histogram = LOOP_LAG_SECONDS.labels()
+        return {
+            "samples": histogram.count,
+            "p50_ms": histogram.quantile(0.5) * 1000,
+            "p99_ms": histogram.quantile(0.99) * 1000,
+            "max_ms": round(self.max_lag * 1000, 3),
+            "slow_callbacks": list(self.reports),
+        }
+
+
+class SamplingProfiler:
+    """Profiler estatístico: amostra as pilhas das threads periodicamente
+
+    Roda numa thread à parte, então o event loop continua atendendo durante
+    a coleta. O resultado são pilhas no formato collapsed ("a;b;c N"),
+    prontas para flamegraph.pl / speedscope.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+
+    @property
+    def busy(self) -> bool:
+        return self._lock.locked()
+
+    def sample(
+        self,
+        duration: float,
+        interval: float = 0.005,
+        thread_ids: Optional[List[int]] = None,
+    ) -> Counter:
+        """Coleta amostras por `duration` segundos (uma coleta por vez)"""
+        if not self._lock.acquire(blocking=False):
+            raise RuntimeError("Profiler already running")
+
+        stacks: Counter = Counter()
+        own_id = threading.get_ident()
+        deadline = time.monotonic() + duration
+        try:
+            while time.monotonic() < deadline:
+                for thread_id, frame in sys._current_frames().items():
+                    if thread_id == own_id:
+                        continue
+                    if thread_ids is not None and thread_id not in thread_ids:
+                        continue
+                    stacks[collapse_stack(frame)] += 1
+                time.sleep(interval)
+        finally:
+            self._lock.release()
+
+        return stacks
+
+    async def profile(
+        self, duration: float, interval: float = 0.005, all_threads: bool = False
+    ) -> str:
+        """Perfila o processo sem bloquear o loop; retorna as pilhas collapsed"""
+        duration = min(duration, settings.profile_max_seconds)
+        thread_ids = None if all_threads else [threading.get_ident()]
+        stacks = await asyncio.to_thread(self.sample, duration, interval, thread_ids)
+        return "".join(f"{stack} {count}\n" for stack, count in stacks.most_common())
+
+
+async def get_loop_monitor(request: Request) -> LoopLagMonitor:
+    """Obtém monitor de loop do estado da aplicação"""
+    return request.app.state.loop_monitor
+
+
+async def get_profiler(request: Request) -> SamplingProfiler:
+    """Obtém profiler do estado da aplicação"""
+    return request.app.state.profiler
@@ -0,0 +1,155 @@
+"""Servidor multi-processo com listeners SO_REUSEPORT
+
+Com `workers > 1` o processo pai prepara o banco e o diretório de estado
+compartilhado e faz fork de N workers. Cada worker abre o próprio socket na
+mesma porta (SO_REUSEPORT: o kernel distribui as conexões) e roda um
+uvicorn com uvloop + httptools. Worker que morre é recriado no mesmo slot.
+
+Uso:
+
+    WORKERS=2 python -m app.core.server
+"""
+
+import asyncio
+import os
+import shutil
+import signal
+import socket
+import tempfile
+
+import uvicorn
+
+from app.core.config import settings
+
+
+APP = "app.main:asgi_app"
+
+
+def create_socket(host: str, port: int) -> socket.socket:
+    """Socket de escuta com SO_REUSEPORT (um por worker)"""
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+    sock.bind((host, port))
+    sock.listen(settings.listen_backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+def uvicorn_config(app: str = APP, **overrides) -> uvicorn.Config:
+    """Configuração comum (uvloop + httptools, sem access log)"""
+    options = {
+        "host": settings.host,
+        "port": settings.port,
+        "loop": "uvloop",
+        "http": "httptools",
+        "lifespan": "on",
+        "access_log": False,
+        "log_level": "info",
+        "backlog": settings.listen_backlog,
+        **overrides,
+    }
+    return uvicorn.Config(app, **options)
+
+
+def prepare_shared_dir() -> str:
+    """Diretório de estado compartilhado, limpo a cada start do servidor"""
+    directory = settings.shared_state_dir
+    if not directory:
+        base = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+        directory = os.path.join(base, f"rinha-{os.getpid()}")
+
+    shutil.rmtree(directory, ignore_errors=True)
+    os.makedirs(directory, mode=0o700)
+    return directory
+
+
+async def prepare_database() -> None:
+    """Cria as tabelas uma vez, antes do fork (evita corrida no create_all)"""
+    from app.core.database import engine, init_db
+
+    await init_db()
+    # Nenhuma conexão do pai pode ser herdada pelos workers
+    if engine is not None:
+        await engine.dispose()
+
+
+def run_worker(slot: int, app: str = APP) -> None:
+    """Executado no processo filho: abre o socket e serve"""
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    settings.worker_slot = slot
+
+    sock = create_socket(settings.host, settings.port)
+    server = uvicorn.Server(uvicorn_config(app))
+    server.run(sockets=[sock])
+
+
+class Supervisor:
+    """Processo pai: cria, vigia e encerra os workers"""
+
+    def __init__(self, workers: int, app: str = APP):
+        self.workers = workers
+        self.app = app
+        self.children = {}
+        self.stopping = False
+
+    def spawn(self, slot: int) -> None:
+        pid = os.fork()
+        if pid == 0:
+            code = 0
+            try:
+                run_worker(slot, self.app)
+            except BaseException as e:
+                print(f"Worker {slot} crashed: {e}")
+                code = 1
+            finally:
+                os._exit(code)
+        self.children[pid] = slot
+
+    def stop(self, signum, frame) -> None:
+        self.stopping = True
+        for pid in list(self.children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    def run(self) -> None:
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+
+        for slot in range(self.workers):
+            self.spawn(slot)
+
+        while self.children:
+            try:
+                pid, status = os.wait()
+            except ChildProcessError:
+                break
+            except InterruptedError:
+                continue
+
+            slot = self.children.pop(pid, None)
+            if slot is not None and not self.stopping:
+                print(f"Worker {slot} (pid {pid}) exited with {status}, restarting")
+                self.spawn(slot)
+
+
+def serve(app: str = APP) -> None:
+    """Ponto de entrada: um processo ou supervisor com N workers"""
+    if settings.workers <= 1:
+        uvicorn.Server(uvicorn_config(app)).run()
+        return
+
+    settings.shared_state_dir = prepare_shared_dir()
+    try:
+        asyncio.run(prepare_database())
+        Supervisor(settings.workers, app).run()
+    finally:
+        shutil.rmtree(settings.shared_state_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    serve()
@@ -0,0 +1,173 @@
+import fcntl
+import mmap
+import os
+import struct
+from contextlib import contextmanager
+from typing import Any, Callable, Iterator, Tuple
+
+from app.core.config import settings
+
+
+def shared_path(name: str) -> str:
+    """Caminho de um segmento no diretório compartilhado ("" = local ao processo)"""
+    if not settings.shared_state_dir:
+        return ""
+    return os.path.join(settings.shared_state_dir, name)
+
+
+class SharedRecord:
+    """Registro binário de tamanho fixo em memória compartilhada (mmap + seqlock)
+
+    Com `path` vazio usa mmap anônimo: compartilhado apenas com processos
+    filhos criados via fork. Com `path` (ex.: /dev/shm/...) qualquer processo
+    que abrir o mesmo arquivo enxerga o mesmo registro.
+    """
+
+    SEQUENCE = struct.Struct("<Q")
+
+    # Tentativas de leitura antes de desistir de um snapshot consistente
+    MAX_READ_ATTEMPTS = 1000
+
+    def __init__(self, path: str, layout: struct.Struct):
+        self.path = path
+        self.layout = layout
+        self.size = self.SEQUENCE.size + layout.size
+        self.buffer, self.fd = map_segment(path, self.size)
+        # Última leitura consistente (ou zeros) para quando o seqlock não fecha
+        self.last = layout.unpack(bytes(layout.size))
+
+    def read(self) -> Tuple[Any, ...]:
+        """Lê o registro; repete enquanto houver escrita concorrente
+
+        Se não conseguir um snapshot consistente em MAX_READ_ATTEMPTS (um
+        escritor parado no meio da escrita ou morto com a sequência ímpar),
+        devolve a última leitura boa deste processo, ou zeros.
+        """
+        for _ in range(self.MAX_READ_ATTEMPTS):
+            (before,) = self.SEQUENCE.unpack_from(self.buffer, 0)
+            if before & 1:
+                continue
+            values = self.layout.unpack_from(self.buffer, self.SEQUENCE.size)
+            (after,) = self.SEQUENCE.unpack_from(self.buffer, 0)
+            if before == after:
+                self.last = values
+                return values
+        return self.last
+
+    def write(self, *values: Any) -> None:
+        """Escreve o registro (um único escritor por vez)
+
+        Uma sequência ímpar deixada por um escritor que morreu no meio da
+        escrita é reaproveitada: ao terminar, a sequência volta a ser par.
+        """
+        (sequence,) = self.SEQUENCE.unpack_from(self.buffer, 0)
+        sequence |= 1
+        self.SEQUENCE.pack_into(self.buffer, 0, sequence)
+        self.layout.pack_into(self.buffer, self.SEQUENCE.size, *values)
+        self.SEQUENCE.pack_into(self.buffer, 0, sequence + 1)
+
+    def update(self, func: Callable[..., Tuple[Any, ...]]) -> Tuple[Any, ...]:
+        """Read-modify-write atômico entre processos (flock no arquivo)"""
+        with exclusive(self.fd):
+            values = func(*self.read())
+            self.write(*values)
+            return values
+
+    def close(self) -> None:
+        """Libera o mapeamento"""
+        self.buffer.close()
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+
+
+class SharedCounters:
+    """Contadores int64 com uma linha por processo (slot)
+
+    Cada processo escreve apenas na sua linha, então não há disputa nem
+    lock; a leitura soma a coluna de todos os slots.
+    """
+
+    def __init__(self, path: str, slots: int, width: int, slot: int = 0):
+        self.slots = slots
+        self.width = width
+        self.slot = slot
+        self.buffer, self.fd = map_segment(path, 8 * slots * width)
+        self.values = memoryview(self.buffer).cast("q")
+        self.offset = slot * width
+
+    def add(self, index: int, delta: int) -> None:
+        """Soma delta na coluna index da linha deste processo"""
+        self.values[self.offset + index] += delta
+
+    def total(self, index: int) -> int:
+        """Soma da coluna index em todos os processos"""
+        return sum(self.values[index :: self.width])
+
+    def clear_slot(self) -> None:
+        """Zera a linha deste processo (ex.: após um restart do worker)"""
+        for index in range(self.width):
+            self.values[self.offset + index] = 0
+
+
+def map_segment(path: str, size: int):
+    """Mapeia `size` bytes do arquivo (criando se preciso) ou memória anônima
+
+    Retorna (mmap, fd); o fd fica aberto para permitir flock em `exclusive`.
+    """
+    if not path:
+        return mmap.mmap(-1, size), None
+
+    fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+    try:
+        if os.fstat(fd).st_size < size:
+            os.ftruncate(fd, size)
+        return mmap.mmap(fd, size), fd
+    except Exception:
+        os.close(fd)
+        raise
+
+
+@contextmanager
+def exclusive(fd) -> Iterator[None]:
+    """Lock exclusivo entre processos (no-op para segmentos anônimos)"""
+    if fd is None:
+        yield
+        return
+    fcntl.flock(fd, fcntl.LOCK_EX)
+    try:
+        yield
+    finally:
+        fcntl.flock(fd, fcntl.LOCK_UN)
+
+
+class LeaderLock:
+    """Eleição de líder entre processos via flock não bloqueante"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.fd = None
+
+    def try_acquire(self) -> bool:
+        """Retorna True se este processo é (ou passou a ser) o líder"""
+        if not self.path:
+            return True
+        if self.fd is not None:
+            return True
+
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            os.close(fd)
+            return False
+
+        self.fd = fd
+        return True
+
+    def release(self) -> None:
+        """Abre mão da liderança"""
+        if self.fd is not None:
+            fcntl.flock(self.fd, fcntl.LOCK_UN)
+            os.close(self.fd)
+            self.fd = None
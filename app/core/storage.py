@@ -0,0 +1,211 @@
+import asyncio
+import mmap
+import os
+import struct
+from typing import Any, Iterator, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+
+EMBEDDED_SCHEME = "embedded"
+
+# tipo, status, processador (-1 = nenhum), moeda, tentativas, id, centavos,
+# taxa, instante (epoch µs), external_id, erro: 128 bytes por registro
+RECORD = struct.Struct("<BBb3sHqqdq40s48s")
+
+# write_index (em registros), próxima sequência de id, inserts, época
+HEADER = struct.Struct("<qqqq")
+
+INSERT = 1
+UPDATE = 2
+
+INITIAL_RECORDS = 8192
+
+
+def is_embedded(url: str) -> bool:
+    """database_url aponta para o engine local (embedded:///caminho/base)"""
+    return urlsplit(url).scheme == EMBEDDED_SCHEME
+
+
+def embedded_path(url: str) -> str:
+    """Caminho base dos arquivos do engine local"""
+    parts = urlsplit(url)
+    return parts.netloc + parts.path
+
+
+class PaymentLog:
+    """Log append-only de registros de tamanho fixo (mmap) com fsync em grupo
+
+    Um único escritor por arquivo. O índice de escrita no cabeçalho só avança
+    depois do registro inteiro, então um crash do processo nunca expõe
+    registro parcial (as páginas ficam no page cache do arquivo). O fsync
+    roda numa thread a cada `fsync_interval` enquanto houver escrita nova;
+    quem precisa de durabilidade aguarda `sync()`, que pega carona no
+    próximo fsync junto com todos os outros que chegaram no intervalo.
+
+    Queda do sistema (energia, kernel) é outra história: nada ordena a
+    gravação da página do cabeçalho depois das páginas dos registros, então
+    o que veio depois do último fsync concluído pode voltar ausente ou
+    parcial mesmo com o índice apontando para ele. Só o que `sync()` já
+    confirmou é garantido.
+    """
+
+    def __init__(self, path: str, fsync_interval: float = 0.005):
+        self.path = path
+        self.fsync_interval = fsync_interval
+        self.fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+
+        size = os.fstat(self.fd).st_size
+        if size < HEADER.size:
+            size = self._file_size(INITIAL_RECORDS)
+            os.ftruncate(self.fd, size)
+        self.buffer = mmap.mmap(self.fd, size)
+        self.write_index, self.next_seq, self.inserts, self.epoch = HEADER.unpack_from(
+            self.buffer, 0
+        )
+
+        self.synced_index = self.write_index
+        # Incrementado a cada reset: um fsync que atravessou o purge não vale
+        # para os registros novos
+        self._resets = 0
+        self._waiters: List[Tuple[int, asyncio.Future]] = []
+        self._dirty = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    def __len__(self) -> int:
+        return self.write_index
+
+    @staticmethod
+    def _file_size(records: int) -> int:
+        return HEADER.size + records * RECORD.size
+
+    def _offset(self, index: int) -> int:
+        return HEADER.size + index * RECORD.size
+
+    def _remap(self, records: int) -> None:
+        """Redimensiona o arquivo e o mapeamento"""
+        self.buffer.close()
+        size = self._file_size(records)
+        os.ftruncate(self.fd, size)
+        self.buffer = mmap.mmap(self.fd, size)
+
+    def _write_header(self) -> None:
+        HEADER.pack_into(
+            self.buffer, 0, self.write_index, self.next_seq, self.inserts, self.epoch
+        )
+
+    def allocate(self) -> int:
+        """Próximo número de sequência do arquivo (persistido no cabeçalho)"""
+        self.next_seq += 1
+        return self.next_seq
+
+    def append(self, *values: Any) -> None:
+        """Grava registro no fim (o índice só avança depois do registro inteiro)"""
+        if self._offset(self.write_index + 1) > len(self.buffer):
+            self._remap(2 * (self.write_index + 1))
+
+        RECORD.pack_into(self.buffer, self._offset(self.write_index), *values)
+        self.write_index += 1
+        if values[0] == INSERT:
+            self.inserts += 1
+        self._write_header()
+        self._dirty.set()
+
+    def reset(self, epoch: int) -> None:
+        """Descarta os registros (purge); a sequência de ids continua crescendo"""
+        self.write_index = self.inserts = 0
+        self.synced_index = 0
+        self._resets += 1
+
+        # Quem aguardava registros descartados não tem mais o que esperar
+        for _, future in self._waiters:
+            if not future.done():
+                future.set_result(None)
+        self._waiters = []
+        self.epoch = epoch
+        if len(self.buffer) > self._file_size(INITIAL_RECORDS):
+            self._remap(INITIAL_RECORDS)
+        self._write_header()
+        self._dirty.set()
+
+    async def sync(self) -> None:
+        """Aguarda o fsync em grupo que cobre tudo o que já foi escrito"""
+        target = self.write_index
+        if self.synced_index >= target:
+            return
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.append((target, future))
+        self._dirty.set()
+        await future
+
+    async def start(self) -> None:
+        """Inicia o fsync periódico em background"""
+        self._task = asyncio.create_task(self._syncer())
+
+    async def stop(self) -> None:
+        """Para o fsync periódico com um último fsync"""
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        await self._fsync()
+
+    async def _syncer(self) -> None:
+        while True:
+            await self._dirty.wait()
+            # Junta no mesmo fsync tudo o que chegar durante o intervalo
+            await asyncio.sleep(self.fsync_interval)
+            await self._fsync()
+
+    async def _fsync(self) -> None:
+        self._dirty.clear()
+        target = self.write_index
+        resets = self._resets
+        try:
+            # fsync no fd (e não msync no mapeamento): o mapeamento pode ser
+            # trocado por um remap enquanto a thread grava; no Linux as páginas
+            # do mmap compartilhado estão no page cache do próprio arquivo
+            await asyncio.to_thread(os.fsync, self.fd)
+        except OSError as e:
+            for _, future in self._waiters:
+                if not future.done():
+                    future.set_exception(e)
+            self._waiters = []
+            return
+
+        if resets != self._resets:
+            return
+        self.synced_index = max(self.synced_index, target)
+        waiting = []
+        for waiter_target, future in self._waiters:
+            if waiter_target <= target:
+                if not future.done():
+                    future.set_result(None)
+            else:
+                waiting.append((waiter_target, future))
+        self._waiters = waiting
+
+    def close(self) -> None:
+        self.buffer.close()
+        os.close(self.fd)
+
+
+def read_log(path: str) -> Tuple[Tuple[int, int, int, int], Iterator[Tuple[Any, ...]]]:
+    """Cabeçalho e registros de um log (de qualquer processo), só leitura"""
+    with open(path, "rb") as file:
+        data = file.read()
+    if len(data) < HEADER.size:
+        return (0, 0, 0, 0), iter(())
+
+    header = HEADER.unpack_from(data, 0)
+    count = min(header[0], (len(data) - HEADER.size) // RECORD.size)
+    end = HEADER.size + count * RECORD.size
+    return header, RECORD.iter_unpack(memoryview(data)[HEADER.size : end])
+
+
+def read_header(path: str) -> Tuple[int, int, int, int]:
+    """Só o cabeçalho de um log"""
+    with open(path, "rb") as file:
+        data = file.read(HEADER.size)
+    if len(data) < HEADER.size:
+        return (0, 0, 0, 0)
+    return HEADER.unpack(data)
@@ -1,29 +1,64 @@
 from contextlib import asynccontextmanager
-import uvicorn
+from app.routes.fast import FastPathApp
 from app.routes.middleware import add_middleware
-from app.routes import payments
+from app.routes import admin, health, metrics, payments
 from app.core.config import settings
-from app.core.database import init_db
+from app.core.server import serve
+from app.core.profiling import LoopLagMonitor, SamplingProfiler
+from app.services.core.admission import AdmissionController
+from app.services.core.ingest import IngestPipeline
 from app.services.core.queue import QueueManager
+from app.services.core.repository import create_repository
+from app.services.core.warmup import WarmUp
 from fastapi import FastAPI
 
+# Armazenamento dos pagamentos (Postgres ou log local, conforme database_url)
+repository = create_repository()
+
 # Global queue manager
-queue_manager = QueueManager()
+queue_manager = QueueManager(repository)
+
+# Controle de admissão na entrada (opcional)
+admission = AdmissionController(queue_manager) if settings.admission_enabled else None
+
+# Pipeline de ingestão (group commit dos inserts)
+ingest_pipeline = IngestPipeline(repository)
+
+# Warm-up no startup e prontidão (/ready)
+warmup = WarmUp(queue_manager)
+
+# Diagnóstico do event loop e profiler sob demanda
+loop_monitor = LoopLagMonitor()
+profiler = SamplingProfiler()
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Gerenciamento do ciclo de vida da aplicação"""
-    # Inicializa banco de dados
-    await init_db()
-    
+    # Monitora o event loop desde o início (inclusive o startup)
+    await loop_monitor.start()
+
+    # Inicializa banco de dados (ou abre o log local)
+    await repository.start()
+
     # Inicia queue manager
     await queue_manager.start()
-    
+
+    # Inicia pipeline de ingestão
+    await ingest_pipeline.start()
+
+    # Pools, statements e conexões aquecidos em background: /ready fica em
+    # 503 até terminar (o servidor já aceita conexões durante o warm-up)
+    warmup.start()
+
     yield
-    
-    # Cleanup
+
+    # Cleanup (fora de prontidão antes de drenar)
+    await warmup.stop()
+    await ingest_pipeline.stop()
     await queue_manager.stop()
+    await repository.stop()
+    await loop_monitor.stop()
 
 
 # Aplicação FastAPI
@@ -40,21 +75,30 @@ add_middleware(app)
 # Inclui rotas dos endpoints obrigatórios
 app.include_router(payments.router, tags=["payments"])
 
+# Métricas (Prometheus) e diagnóstico
+app.include_router(metrics.router, tags=["metrics"])
+if settings.admin_enabled:
+    app.include_router(admin.router, tags=["admin"])
+
+# Liveness e readiness
+app.include_router(health.router, tags=["health"])
+
 # Disponibiliza queue manager via dependency injection
+app.state.repository = repository
 app.state.queue_manager = queue_manager
+app.state.ingest_pipeline = ingest_pipeline
+app.state.admission = admission
+app.state.warmup = warmup
+app.state.loop_monitor = loop_monitor
+app.state.profiler = profiler
+
+# Fast path ASGI opcional para os endpoints quentes (o resto vai para o FastAPI)
+asgi_app = FastPathApp(app) if settings.fast_path else app
 
 
 def main():
-    """Executa na porta 9999"""
-    uvicorn.run(
-        "app.main:app",
-        host=settings.host,
-        port=settings.port,  # Porta 9999
-        workers=1,
-        loop="uvloop",
-        access_log=False,
-        log_level="info",
-    )
+    """Executa na porta 9999 (um processo, ou WORKERS processos com SO_REUSEPORT)"""
+    serve("app.main:asgi_app")
 
 
 if __name__ == "__main__":
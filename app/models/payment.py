@@ -1,8 +1,16 @@
 from datetime import datetime, timezone
 from enum import Enum
 from typing import Optional
+from sqlalchemy import BigInteger, DateTime, Index
 from sqlmodel import Field, SQLModel
 
+from app.core.config import settings
+
+
+# Tabela particionada por created_at (Postgres): a chave de partição precisa
+# fazer parte da PK, então UPDATEs por PK levam (id, created_at)
+PARTITIONED = settings.payments_partition_hours > 0
+
 
 class PaymentStatus(str, Enum):
     PENDING = "pending"
@@ -14,20 +22,54 @@ class PaymentStatus(str, Enum):
 
 class Payment(SQLModel, table=True):
     __tablename__ = "payments"
-    
-    id: Optional[int] = Field(default=None, primary_key=True)
+    __table_args__ = (
+        # Consultas ad-hoc de summary (concluídos por processador numa faixa)
+        Index(
+            "ix_payments_status_processor_created",
+            "status",
+            "processor_id",
+            "created_at",
+        ),
+        # created_at cresce com a inserção: BRIN cobre faixas com índice minúsculo
+        Index("ix_payments_created_at_brin", "created_at", postgresql_using="brin"),
+        {"postgresql_partition_by": "RANGE (created_at)"} if PARTITIONED else {},
+    )
+
+    id: Optional[int] = Field(
+        default=None, primary_key=True, sa_column_kwargs={"autoincrement": True}
+    )
     amount: float = Field(gt=0)
     currency: str = Field(default="BRL", max_length=3)
     status: PaymentStatus = Field(default=PaymentStatus.PENDING, index=True)
     processor_id: Optional[int] = Field(default=None, index=True)
     attempts: int = Field(default=0, ge=0)
-    created_at: datetime = Field(default_factory=datetime.now(timezone.utc))
-    updated_at: datetime = Field(default_factory=datetime.now(timezone.utc))
+    created_at: datetime = Field(
+        default_factory=lambda: datetime.now(timezone.utc),
+        sa_type=DateTime(timezone=True),
+        primary_key=PARTITIONED,
+    )
+    updated_at: datetime = Field(
+        default_factory=lambda: datetime.now(timezone.utc),
+        sa_type=DateTime(timezone=True),
+    )
     external_id: Optional[str] = Field(default=None)
     error_message: Optional[str] = Field(default=None)
+    claimed_by: Optional[str] = Field(default=None, max_length=64)
     fee: Optional[float] = Field(default=None, ge=0)
 
 
+class PaymentRollup(SQLModel, table=True):
+    """Concluídos por processador e bucket de tempo (summary entre instâncias)"""
+
+    __tablename__ = "payment_rollups"
+
+    processor_id: int = Field(primary_key=True)
+    # Início do bucket em epoch ms (múltiplo de summary_bucket_ms)
+    bucket: int = Field(primary_key=True, sa_type=BigInteger)
+    count: int = Field(default=0, sa_type=BigInteger)
+    cents: int = Field(default=0, sa_type=BigInteger)
+
+
 class PaymentCreate(SQLModel):
     amount: float = Field(gt=0)
     currency: str = Field(default="BRL", max_length=3)
@@ -40,7 +82,7 @@ class PaymentResponse(SQLModel):
     status: PaymentStatus
     processor_id: Optional[int] = None
     created_at: datetime
-    
+
     class Config:
         from_attributes = True
 
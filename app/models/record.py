@@ -0,0 +1,81 @@
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from app.models.payment import PaymentStatus
+
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+MICROSECOND = timedelta(microseconds=1)
+
+
+def now_us() -> int:
+    """Instante atual em microssegundos desde a época (UTC)"""
+    return time.time_ns() // 1000
+
+
+def to_us(value: datetime) -> int:
+    """datetime (naive = UTC) -> microssegundos desde a época, sem arredondar"""
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return (value - EPOCH) // MICROSECOND
+
+
+def to_datetime(timestamp_us: int) -> datetime:
+    """Microssegundos desde a época -> datetime UTC"""
+    return EPOCH + timedelta(microseconds=timestamp_us)
+
+
+class PaymentRecord:
+    """Pagamento em trânsito (ingestão, fila, retentativas) sem ORM
+
+    Só inteiros e uma string curta em __slots__: valor em centavos e
+    created_at em microssegundos. O modelo `Payment` só é usado onde o
+    banco realmente precisa dele.
+    """
+
+    __slots__ = (
+        "id",
+        "cents",
+        "currency",
+        "created_us",
+        "attempts",
+        "enqueued_at",
+        "pinned",
+    )
+
+    # Todo pagamento aceito nasce pendente e sem processador
+    status = PaymentStatus.PENDING
+    processor_id = None
+
+    def __init__(
+        self,
+        cents: int,
+        currency: str = "BRL",
+        created_us: Optional[int] = None,
+        id: Optional[int] = None,
+        attempts: int = 0,
+        pinned: Optional[int] = None,
+    ):
+        self.id = id
+        self.cents = cents
+        self.currency = currency
+        self.created_us = now_us() if created_us is None else created_us
+        self.attempts = attempts
+        self.enqueued_at = 0.0
+        # Processador de uma tentativa ambígua: as retentativas vão só para ele
+        self.pinned = pinned
+
+    @property
+    def amount(self) -> float:
+        return self.cents / 100
+
+    @property
+    def created_at(self) -> datetime:
+        return to_datetime(self.created_us)
+
+    def __repr__(self) -> str:
+        return (
+            f"PaymentRecord(id={self.id}, cents={self.cents}, "
+            f"currency={self.currency!r}, attempts={self.attempts})"
+        )
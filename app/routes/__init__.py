@@ -1,5 +1,17 @@
-from app.routes.middleware import add_middleware
+from app.routes.admin import router as admin_router
+from app.routes.fast import FastPathApp
+from app.routes.health import router as health_router
+from app.routes.metrics import router as metrics_router
+from app.routes.middleware import add_middleware, ProcessTimeMiddleware
 from app.routes.payments import router as payments_router
 
 
-__all__ = ["add_middleware", "payments_router"]
+__all__ = [
+    "add_middleware",
+    "admin_router",
+    "FastPathApp",
+    "health_router",
+    "metrics_router",
+    "payments_router",
+    "ProcessTimeMiddleware",
+]
@@ -0,0 +1,36 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import PlainTextResponse
+
+from app.core.profiling import (
+    get_loop_monitor,
+    get_profiler,
+    LoopLagMonitor,
+    SamplingProfiler,
+)
+
+router = APIRouter(prefix="/admin")
+
+
+@router.get("/loop-lag")
+async def loop_lag(monitor: LoopLagMonitor = Depends(get_loop_monitor)):
+    """Atraso do event loop e pilhas dos travamentos recentes"""
+    return monitor.snapshot()
+
+
+@router.get("/profile", response_class=PlainTextResponse)
+async def profile(
+    seconds: float = Query(default=5.0, gt=0),
+    interval_ms: float = Query(default=5.0, ge=1),
+    all_threads: bool = Query(default=False),
+    profiler: SamplingProfiler = Depends(get_profiler),
+):
+    """Profile por amostragem do processo em execução (pilhas collapsed)"""
+    if profiler.busy:
+        raise HTTPException(status_code=409, detail="Profiler already running")
+
+    try:
+        stacks = await profiler.profile(seconds, interval_ms / 1000, all_threads)
+    except RuntimeError:
+        raise HTTPException(status_code=409, detail="Profiler already running")
+
+    return PlainTextResponse(stacks)
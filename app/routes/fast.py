@@ -0,0 +1,187 @@
+import time
+from datetime import datetime
+from typing import Optional
+from urllib.parse import parse_qsl
+
+import orjson
+from fastapi import FastAPI
+
+from app.core.metrics import registry
+from app.routes.middleware import ProcessTimeMiddleware
+from app.routes.payments import SHED_DETAILS, accept_payment, build_summary, purge_all
+
+
+# Respostas estáticas pré-codificadas
+JSON_HEADERS = [(b"content-type", b"application/json")]
+INVALID_PAYLOAD = orjson.dumps({"detail": "Invalid payment payload"})
+INVALID_QUERY = orjson.dumps({"detail": "Invalid from/to parameters"})
+INTERNAL_ERROR = orjson.dumps({"detail": "Internal server error"})
+SHED_BODIES = {
+    reason: orjson.dumps({"detail": detail}) for reason, detail in SHED_DETAILS.items()
+}
+
+INGRESS_PARSE_SECONDS = registry.histogram(
+    "ingress_parse_seconds", "Leitura e validação do corpo do POST /payments"
+)
+
+
+async def read_body(receive) -> bytes:
+    """Lê o corpo completo da requisição"""
+    body = b""
+    more_body = True
+    while more_body:
+        message = await receive()
+        body += message.get("body", b"")
+        more_body = message.get("more_body", False)
+    return body
+
+
+async def send_json(send, status: int, body: bytes, headers=()) -> None:
+    """Envia resposta JSON já codificada"""
+    await send(
+        {
+            "type": "http.response.start",
+            "status": status,
+            "headers": [
+                *JSON_HEADERS,
+                (b"content-length", str(len(body)).encode()),
+                *headers,
+            ],
+        }
+    )
+    await send({"type": "http.response.body", "body": body})
+
+
+def parse_datetime(value: Optional[str]) -> Optional[datetime]:
+    """Converte parâmetro ISO-8601 (aceita sufixo Z)"""
+    if not value:
+        return None
+    return datetime.fromisoformat(value)
+
+
+class FastPathApp:
+    """Handler ASGI cru para os endpoints quentes
+
+    POST /payments, GET /payment-summary e POST /purge-payments são atendidos
+    direto, sem BaseHTTPMiddleware, dependency injection nem pydantic; todo o
+    resto segue para o app FastAPI.
+    """
+
+    def __init__(self, app: FastAPI):
+        self.app = app
+        self.handlers = {
+            ("POST", "/payments"): self.create_payment,
+            ("GET", "/payment-summary"): self.payment_summary,
+            ("POST", "/purge-payments"): self.purge_payments,
+        }
+        self.timed = ProcessTimeMiddleware(self.dispatch)
+
+    async def __call__(self, scope, receive, send):
+        if (
+            scope["type"] == "http"
+            and (scope["method"], scope["path"]) in self.handlers
+        ):
+            await self.timed(scope, receive, send)
+        else:
+            await self.app(scope, receive, send)
+
+    async def dispatch(self, scope, receive, send):
+        handler = self.handlers[(scope["method"], scope["path"])]
+        started = False
+
+        async def tracked_send(message):
+            nonlocal started
+            if message["type"] == "http.response.start":
+                started = True
+            await send(message)
+
+        try:
+            await handler(scope, receive, tracked_send)
+        except Exception:
+            # Resposta já iniciada: um segundo response.start violaria o
+            # protocolo; o erro sobe e o servidor encerra a conexão
+            if started:
+                raise
+            await send_json(send, 500, INTERNAL_ERROR)
+
+    async def create_payment(self, scope, receive, send):
+        """POST /payments"""
+        body = await read_body(receive)
+        start_time = time.perf_counter()
+        try:
+            data = orjson.loads(body)
+            amount = data["amount"]
+            currency = data.get("currency", "BRL")
+            if (
+                isinstance(amount, bool)
+                or not isinstance(amount, (int, float))
+                or amount <= 0
+                or not isinstance(currency, str)
+                or len(currency) > 3
+            ):
+                raise ValueError
+        except (
+            orjson.JSONDecodeError,
+            KeyError,
+            TypeError,
+            AttributeError,
+            ValueError,
+        ):
+            await send_json(send, 422, INVALID_PAYLOAD)
+            return
+        finally:
+            INGRESS_PARSE_SECONDS.observe(time.perf_counter() - start_time)
+
+        state = self.app.state
+        rejection = state.admission.check() if state.admission else None
+        if rejection:
+            await send_json(
+                send,
+                rejection.status,
+                SHED_BODIES[rejection.reason],
+                [(b"retry-after", str(rejection.retry_after).encode())],
+            )
+            return
+
+        payment = await accept_payment(
+            float(amount), currency, state.ingest_pipeline, state.queue_manager
+        )
+
+        body = orjson.dumps(
+            {
+                "id": payment.id,
+                "amount": payment.amount,
+                "currency": payment.currency,
+                "status": payment.status,
+                "processor_id": payment.processor_id,
+                "created_at": payment.created_at,
+            },
+            option=orjson.OPT_UTC_Z,
+        )
+        await send_json(send, 200, body)
+
+    async def payment_summary(self, scope, receive, send):
+        """GET /payment-summary?from=...&to=..."""
+        params = dict(parse_qsl(scope.get("query_string", b"").decode()))
+        try:
+            start = parse_datetime(params.get("from"))
+            end = parse_datetime(params.get("to"))
+        except ValueError:
+            await send_json(send, 422, INVALID_QUERY)
+            return
+
+        summary = await build_summary(self.app.state.queue_manager, start, end)
+        await send_json(send, 200, orjson.dumps(summary))
+
+    async def purge_payments(self, scope, receive, send):
+        """POST /purge-payments"""
+        state = self.app.state
+        deleted_count = await purge_all(state.repository, state.queue_manager)
+
+        body = orjson.dumps(
+            {
+                "message": f"Successfully purged {deleted_count} payments",
+                "deleted_count": deleted_count,
+            }
+        )
+        await send_json(send, 200, body)
@@ -0,0 +1,21 @@
+from fastapi import APIRouter, Depends
+from fastapi.responses import JSONResponse
+
+from app.services.core.warmup import get_warmup, WarmUp
+
+router = APIRouter()
+
+
+@router.get("/health")
+async def health():
+    """Liveness: o processo está de pé e atendendo"""
+    return {"status": "ok"}
+
+
+@router.get("/ready")
+async def ready(warmup: WarmUp = Depends(get_warmup)):
+    """Readiness: warm-up concluído (503 durante o startup e o shutdown)"""
+    return JSONResponse(
+        {"ready": warmup.ready, "warmup": warmup.report},
+        status_code=200 if warmup.ready else 503,
+    )
@@ -1,18 +1,46 @@
 import time
-from typing import Callable
-from fastapi import FastAPI, Request
+from fastapi import FastAPI
+
+from app.core.metrics import registry
+
+
+HTTP_REQUEST_SECONDS = registry.histogram(
+    "http_request_seconds", "Tempo até o início da resposta HTTP"
+)
+
+
+class ProcessTimeMiddleware:
+    """Middleware ASGI puro que adiciona o header X-Process-Time
+
+    O mesmo tempo alimenta o histograma exportado em /metrics.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start_time = time.perf_counter()
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                process_time = time.perf_counter() - start_time
+                HTTP_REQUEST_SECONDS.observe(process_time)
+                message = {
+                    **message,
+                    "headers": [
+                        *message.get("headers", ()),
+                        (b"x-process-time", str(process_time).encode()),
+                    ],
+                }
+            await send(message)
+
+        await self.app(scope, receive, send_with_timing)
 
 
 def add_middleware(app: FastAPI):
     """Adiciona middleware para performance"""
-    
-    @app.middleware("http")
-    async def performance_middleware(request: Request, call_next: Callable):
-        start_time = time.time()
-        
-        response = await call_next(request)
-        
-        process_time = time.time() - start_time
-        response.headers["X-Process-Time"] = str(process_time)
-        
-        return response
+    app.add_middleware(ProcessTimeMiddleware)
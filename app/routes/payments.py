@@ -1,46 +1,132 @@
-from datetime import datetime, timezone
+import time
+from datetime import datetime
+from typing import Any, Dict, Optional
 
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.ext.asyncio import AsyncSession
-from sqlmodel import func, select
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import JSONResponse
 
-from app.core.database import get_session
+from app.core.metrics import registry
 from app.models.payment import (
-    Payment,
     PaymentCreate,
     PaymentResponse,
-    PaymentStatus,
     PaymentSummaryResponse,
     PurgeResponse,
 )
+from app.models.record import PaymentRecord
+from app.services.core.admission import AdmissionController, get_admission
+from app.services.core.ingest import get_ingest_pipeline, IngestPipeline
 from app.services.core.queue import get_queue_manager, QueueManager
+from app.services.core.repository import get_repository, PaymentRepository
+from app.services.core.summary import to_cents
 
 router = APIRouter()
 
+SUMMARY_QUERY_SECONDS = registry.histogram(
+    "summary_query_seconds", "Latência da consulta do payment-summary"
+)
+
+# Mensagens das recusas do controle de admissão
+SHED_DETAILS = {
+    "overload": "Too many pending payments, retry later",
+    "unavailable": "No payment processor available, retry later",
+    "queue_full": "Payment queue is full, retry later",
+}
+
+
+async def accept_payment(
+    amount: float,
+    currency: str,
+    ingest_pipeline: IngestPipeline,
+    queue_manager: QueueManager,
+) -> PaymentRecord:
+    """Grava e enfileira um pagamento (compartilhado com o fast path)"""
+    # Registro compacto: nada de instância ORM/pydantic por pagamento
+    payment = PaymentRecord(to_cents(amount), currency)
+
+    # Grava em lote junto com outras requisições (group commit)
+    await ingest_pipeline.submit(payment)
+
+    # Enfileira para processamento assíncrono
+    await queue_manager.enqueue_payment(payment)
+
+    return payment
+
+
+async def purge_all(repository: PaymentRepository, queue_manager: QueueManager) -> int:
+    """Apaga todos os pagamentos e zera os agregados"""
+    # Apaga (e conta) os pagamentos no armazenamento
+    deleted_count = await repository.purge()
+
+    # Descarta a fila pendente e zera os agregados
+    queue_manager.clear()
+
+    return deleted_count
+
+
+async def build_summary(
+    queue_manager: QueueManager,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+) -> Dict[str, Any]:
+    """Monta o payment-summary a partir do índice incremental (ou do rollup)"""
+    start_time = time.perf_counter()
+    repository = queue_manager.repository
+    if repository.rollup:
+        # Várias instâncias: só a tabela de rollup tem o total de todas
+        summary = await repository.summary(
+            queue_manager.summary.processor_ids, start, end
+        )
+    else:
+        # Consulta o índice incremental em O(log n), sem tocar no banco
+        summary = queue_manager.summary.summary(start, end)
+
+    # processor_1 = processador 0 (default), processor_2 = processador 1 (fallback)
+    processor_stats = {}
+    total_payments = 0
+    total_cents = 0
+
+    for processor_id, (count, cents) in summary.items():
+        processor_stats[processor_id] = {
+            "count": count,
+            "total_amount": cents / 100,
+        }
+        total_payments += count
+        total_cents += cents
+
+    SUMMARY_QUERY_SECONDS.observe(time.perf_counter() - start_time)
+
+    return {
+        "processor_1": processor_stats[0],
+        "processor_2": processor_stats[1],
+        "total_payments": total_payments,
+        "total_amount": total_cents / 100,
+    }
+
 
 @router.post("/payments", response_model=PaymentResponse)
 async def create_payment(
     payment_data: PaymentCreate,
-    session: AsyncSession = Depends(get_session),
+    ingest_pipeline: IngestPipeline = Depends(get_ingest_pipeline),
     queue_manager: QueueManager = Depends(get_queue_manager),
+    admission: Optional[AdmissionController] = Depends(get_admission),
 ):
     """Endpoint principal para receber pagamentos"""
-    try:
-        # Cria pagamento
-        payment = Payment(
-            amount=payment_data.amount,
-            currency=payment_data.currency,
-            status=PaymentStatus.PENDING,
-            created_at=datetime.now(timezone.utc),
-            updated_at=datetime.now(timezone.utc),
+    # Recusa cedo se a fila não cumpriria o SLO (antes de gravar qualquer coisa)
+    rejection = admission.check() if admission else None
+    if rejection:
+        return JSONResponse(
+            {"detail": SHED_DETAILS[rejection.reason]},
+            status_code=rejection.status,
+            headers={"Retry-After": str(rejection.retry_after)},
         )
 
-        session.add(payment)
-        await session.commit()
-        await session.refresh(payment)
-
-        # Enfileira para processamento assíncrono
-        await queue_manager.enqueue_payment(payment.id)
+    try:
+        payment = await accept_payment(
+            payment_data.amount,
+            payment_data.currency,
+            ingest_pipeline,
+            queue_manager,
+        )
 
         return PaymentResponse.from_orm(payment)
 
@@ -50,17 +136,12 @@ async def create_payment(
 
 @router.post("/purge-payments", response_model=PurgeResponse)
 async def purge_payments(
-    session: AsyncSession = Depends(get_session),
+    repository: PaymentRepository = Depends(get_repository),
+    queue_manager: QueueManager = Depends(get_queue_manager),
 ):
     """Endpoint secreto para limpeza (usado pelos testes)"""
     try:
-        # Conta pagamentos existentes
-        count_result = await session.execute(select(func.count(Payment.id)))
-        deleted_count = count_result.scalar()
-
-        # Deleta todos os pagamentos
-        await session.execute("DELETE FROM payments")
-        await session.commit()
+        deleted_count = await purge_all(repository, queue_manager)
 
         return PurgeResponse(
             message=f"Successfully purged {deleted_count} payments",
@@ -73,46 +154,13 @@ async def purge_payments(
 
 @router.get("/payment-summary", response_model=PaymentSummaryResponse)
 async def payment_summary(
-    session: AsyncSession = Depends(get_session),
+    from_: Optional[datetime] = Query(default=None, alias="from"),
+    to: Optional[datetime] = Query(default=None),
+    queue_manager: QueueManager = Depends(get_queue_manager),
 ):
     """Resumo dos pagamentos por processador"""
     try:
-        # Busca estatísticas por processador
-        result = await session.execute(
-            select(
-                Payment.processor_id,
-                func.count(Payment.id).label("count"),
-                func.sum(Payment.amount).label("total_amount"),
-            )
-            .where(Payment.status == PaymentStatus.COMPLETED)
-            .group_by(Payment.processor_id)
-        )
-
-        # Inicializa contadores
-        processor_stats = {
-            1: {"count": 0, "total_amount": 0.0},
-            2: {"count": 0, "total_amount": 0.0},
-        }
-
-        # Preenche estatísticas
-        total_payments = 0
-        total_amount = 0.0
-
-        for row in result:
-            if row.processor_id in [1, 2]:
-                processor_stats[row.processor_id] = {
-                    "count": row.count,
-                    "total_amount": float(row.total_amount or 0),
-                }
-                total_payments += row.count
-                total_amount += float(row.total_amount or 0)
-
-        return PaymentSummaryResponse(
-            processor_1=processor_stats[1],
-            processor_2=processor_stats[2],
-            total_payments=total_payments,
-            total_amount=total_amount,
-        )
+        return PaymentSummaryResponse(**await build_summary(queue_manager, from_, to))
 
     except Exception:
         raise HTTPException(status_code=500, detail="Internal server error")
@@ -1,14 +1,16 @@
-from app.services.core.circuit import CircuitState, CircuitBreaker
+from app.services.core.circuit import CircuitBreaker, CircuitOpenError, CircuitState
 from app.services.health import HealthCheckService
-from app.services.payment import Payment, PaymentProcessor
+from app.models.payment import Payment
+from app.services.payment import PaymentProcessor
 from app.services.core.queue import QueueManager
 
 
 __all__ = [
     "CircuitState",
     "CircuitBreaker",
+    "CircuitOpenError",
     "HealthCheckService",
     "Payment",
     "PaymentProcessor",
     "QueueManager",
-]
\ No newline at end of file
+]
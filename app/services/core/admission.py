@@ -0,0 +1,146 @@
+import math
+from typing import NamedTuple, Optional
+
+from fastapi import Request
+
+from app.core.clock import Clock
+from app.core.config import settings
+from app.core.metrics import registry
+
+from .queue import PAYMENTS_TOTAL, QueueManager
+
+
+ADMISSION_SHED = registry.counter(
+    "admission_shed_total", "Pagamentos recusados na entrada", ("reason",)
+)
+SHED_OVERLOAD = ADMISSION_SHED.labels("overload")
+SHED_UNAVAILABLE = ADMISSION_SHED.labels("unavailable")
+SHED_QUEUE_FULL = ADMISSION_SHED.labels("queue_full")
+
+# Rótulo de PAYMENTS_TOTAL das tentativas recusadas pelo circuit breaker
+REJECTED = ("rejected",)
+
+
+class Rejection(NamedTuple):
+    status: int
+    retry_after: int
+    reason: str
+
+
+class AdmissionController:
+    """Controle de admissão do POST /payments
+
+    Estima a vazão de drenagem da fila (EWMA das tentativas concluídas por
+    segundo) e, por Little, o tempo que um pagamento novo esperaria. O
+    limite de profundidade acompanha essa vazão (vazão × SLO, nunca abaixo
+    de admission_min_depth). Recusa com:
+
+        429  espera prevista e idade da cabeça da fila acima do SLO
+        503  nenhum processador disponível com fila acima do mínimo,
+             ou fila no teto absoluto (admission_max_depth)
+
+    sempre com Retry-After estimado pelo tempo de drenar o excesso.
+
+    A profundidade é a do QueueManager: com a fila no Postgres inclui as
+    linhas PENDING da tabela (lidas a cada segundo), não só os lotes já
+    reivindicados pela fila local.
+    """
+
+    def __init__(
+        self,
+        queue_manager: QueueManager,
+        slo_ms: Optional[int] = None,
+        min_depth: Optional[int] = None,
+        max_depth: Optional[int] = None,
+        alpha: Optional[float] = None,
+        clock: Optional[Clock] = None,
+    ):
+        self.queue_manager = queue_manager
+        self.clock = clock or queue_manager.clock
+        self.slo = (slo_ms or settings.admission_slo_ms) / 1000
+        self.min_depth = min_depth or settings.admission_min_depth
+        self.max_depth = max_depth or settings.admission_max_depth
+        self.alpha = alpha or settings.admission_rate_alpha
+        self.max_retry_after = settings.admission_max_retry_after
+
+        # Vazão de drenagem (tentativas/s), amostrada no máximo 1 vez por segundo
+        self.drain_rate = 0.0
+        self._last_sample = self.clock.monotonic()
+        self._last_completed = self._completed()
+
+        registry.gauge(
+            "admission_drain_rate",
+            "Vazão estimada de drenagem da fila (por segundo)",
+            lambda: self.drain_rate,
+        )
+        registry.gauge(
+            "admission_depth_limit",
+            "Profundidade de fila admitida (vazão × SLO)",
+            lambda: self.depth_limit,
+        )
+
+    @staticmethod
+    def _completed() -> float:
+        """Tentativas concluídas (cada uma tira um item da fila)
+
+        Recusas do circuit breaker ficam de fora: o item volta para a fila
+        sem ter sido drenado, e contá-las elevaria o limite justamente
+        quando a fila não anda.
+        """
+        return sum(
+            child.value
+            for labels, child in PAYMENTS_TOTAL.children.items()
+            if labels != REJECTED
+        )
+
+    def _sample(self, now: float) -> None:
+        elapsed = now - self._last_sample
+        if elapsed < 1.0:
+            return
+        completed = self._completed()
+        rate = (completed - self._last_completed) / elapsed
+        self.drain_rate += self.alpha * (rate - self.drain_rate)
+        self._last_sample = now
+        self._last_completed = completed
+
+    @property
+    def depth_limit(self) -> int:
+        return max(self.min_depth, int(self.drain_rate * self.slo))
+
+    def _retry_after(self, excess: int) -> int:
+        if self.drain_rate <= 0:
+            return self.max_retry_after
+        return max(1, min(self.max_retry_after, math.ceil(excess / self.drain_rate)))
+
+    def check(self) -> Optional[Rejection]:
+        """None se o pagamento pode entrar; senão o motivo da recusa"""
+        self._sample(self.clock.monotonic())
+        queue_manager = self.queue_manager
+        depth = queue_manager.depth()
+
+        if depth >= self.max_depth:
+            SHED_QUEUE_FULL.inc()
+            return Rejection(
+                503, self._retry_after(depth - self.depth_limit), "queue_full"
+            )
+
+        if depth < self.min_depth:
+            return None
+
+        processor = queue_manager.processor
+        if not any(processor.is_available(pid) for pid in processor.processors):
+            SHED_UNAVAILABLE.inc()
+            return Rejection(503, settings.health_check_interval, "unavailable")
+
+        # Espera prevista acima do SLO e confirmada pela idade da cabeça da fila
+        limit = self.depth_limit
+        if depth > limit and queue_manager.head_age() > self.slo:
+            SHED_OVERLOAD.inc()
+            return Rejection(429, self._retry_after(depth - limit), "overload")
+
+        return None
+
+
+async def get_admission(request: Request) -> Optional[AdmissionController]:
+    """Obtém o controle de admissão do estado da aplicação (None se desligado)"""
+    return request.app.state.admission
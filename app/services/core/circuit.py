@@ -1,7 +1,12 @@
-from datetime import datetime, timedelta
+import struct
 from enum import Enum
 from typing import Any, Callable, Optional
 
+from app.core.clock import Clock, system_clock
+from app.core.config import settings
+from app.core.metrics import registry
+from app.core.shared import SharedRecord
+
 
 class CircuitState(str, Enum):
     CLOSED = "closed"
@@ -9,65 +14,251 @@ class CircuitState(str, Enum):
     HALF_OPEN = "half_open"
 
 
+STATES = list(CircuitState)
+
+CIRCUIT_TRANSITIONS = registry.counter(
+    "circuit_transitions_total",
+    "Transições de estado do circuit breaker",
+    ("processor", "state"),
+)
+CIRCUIT_REJECTED = registry.counter(
+    "circuit_rejected_total",
+    "Chamadas recusadas pelo circuit breaker",
+    ("processor",),
+)
+
+# Cada posição da janela: bit 0 = falha, bit 1 = lenta
+FAILED = 1
+SLOW = 2
+
+
+class CircuitOpenError(Exception):
+    """Chamada recusada: circuito aberto ou sem vaga de probe"""
+
+
 class CircuitBreaker:
-    """Implementa resiliência contra falhas dos processadores"""
+    """Circuit breaker por taxa de falhas/lentidão numa janela deslizante
+
+    As últimas `window` chamadas ficam num ring buffer; com pelo menos
+    `min_calls` amostras, o circuito abre se a taxa de falhas atingir
+    `failure_rate` ou a de chamadas lentas (>= `slow_call_ms`) atingir
+    `slow_rate`. Depois de `open_seconds` (ou de um health check saudável)
+    vai para HALF_OPEN, que admite no máximo `half_open_probes` chamadas:
+    todas com sucesso fecham o circuito; uma falha reabre.
+
+    Tempo sempre no relógio monotônico de `clock` (time.monotonic por
+    padrão). Com `state_path` o estado (janela inclusive) fica num registro
+    compartilhado (mmap): no Linux o relógio monotônico é o mesmo para todos
+    os processos do host.
+    """
 
     def __init__(
         self,
-        failure_threshold: int = 5,
-        timeout_seconds: int = 60,
         name: str = "circuit_breaker",
+        state_path: str = "",
+        window: Optional[int] = None,
+        min_calls: Optional[int] = None,
+        failure_rate: Optional[float] = None,
+        slow_rate: Optional[float] = None,
+        slow_call_ms: Optional[int] = None,
+        open_seconds: Optional[float] = None,
+        half_open_probes: Optional[int] = None,
+        clock: Optional[Clock] = None,
     ):
-        self.failure_threshold = failure_threshold
-        self.timeout_seconds = timeout_seconds
         self.name = name
-        self.failure_count = 0
-        self.last_failure_time: Optional[datetime] = None
+        self.clock = clock or system_clock
+        # Resolvido uma vez: lido várias vezes por chamada
+        self.monotonic = self.clock.monotonic
+        self.window = window or settings.circuit_window_size
+        self.min_calls = min(min_calls or settings.circuit_min_calls, self.window)
+        self.failure_rate = failure_rate or settings.circuit_failure_rate
+        self.slow_rate = slow_rate or settings.circuit_slow_rate
+        self.slow_call = (slow_call_ms or settings.circuit_slow_call_ms) / 1000
+        self.open_seconds = open_seconds or settings.circuit_open_seconds
+        self.half_open_probes = half_open_probes or settings.circuit_half_open_probes
+
         self.state = CircuitState.CLOSED
-        self.success_count = 0
+        self.state_since = self.monotonic()
+        self.ring = bytearray(self.window)
+        self.index = 0
+        self.count = 0
+        self.failures = 0
+        self.slow = 0
+        self.probes = 0
+        self.probe_successes = 0
+
+        self.transitions = {
+            state: CIRCUIT_TRANSITIONS.labels(name, state.value) for state in STATES
+        }
+        self.rejected = CIRCUIT_REJECTED.labels(name)
+
+        # estado, desde (monotonic), probes em curso, probes ok, índice,
+        # amostras, falhas, lentas, janela
+        self.layout = struct.Struct(f"<Bdqqqqqq{self.window}s")
+        self.record = SharedRecord(state_path, self.layout) if state_path else None
+        if self.record is not None:
+            self.record.update(self._init_shared)
 
     async def call(self, func: Callable, *args, **kwargs) -> Any:
         """Execute function with circuit breaker protection"""
-        if self.state == CircuitState.OPEN:
-            if self._should_attempt_reset():
-                self.state = CircuitState.HALF_OPEN
-            else:
-                raise Exception(f"Circuit breaker {self.name} is OPEN")
+        if not self._transition(self._admit):
+            self.rejected.inc()
+            raise CircuitOpenError(
+                f"Circuit breaker {self.name} is {self.state.value.upper()}"
+            )
 
+        start = self.monotonic()
         try:
             result = await func(*args, **kwargs)
-            self._on_success()
-            return result
-        except Exception as e:
-            self._on_failure()
-            raise e
-
-    def _should_attempt_reset(self) -> bool:
-        """Check if circuit should attempt reset"""
-        if self.last_failure_time is None:
-            return True
-        return datetime.utcnow() - self.last_failure_time > timedelta(
-            seconds=self.timeout_seconds
-        )
+        except BaseException as e:
+            # Cancelamento não é falha do processador: só devolve a vaga de probe
+            failed = isinstance(e, Exception)
+            elapsed = self.monotonic() - start
+            self._transition(lambda: self._record(failed, elapsed, counted=failed))
+            raise
 
-    def _on_success(self) -> None:
-        """Handle successful call"""
-        self.failure_count = 0
-        self.success_count += 1
+        elapsed = self.monotonic() - start
+        self._transition(lambda: self._record(False, elapsed))
+        return result
+
+    def on_health(self, failing: bool) -> None:
+        """Sinal do health check: abre já se falhando, sonda cedo se saudável"""
+        self._transition(lambda: self._apply_health(failing))
+
+    # Transições (sempre sobre o estado carregado) ----------------------------
+
+    def _admit(self) -> bool:
+        now = self.monotonic()
+        if self.state == CircuitState.OPEN:
+            if now - self.state_since < self.open_seconds:
+                return False
+            self._set_state(CircuitState.HALF_OPEN, now)
 
-        if self.state == CircuitState.HALF_OPEN and self.success_count >= 3:
-            self.state = CircuitState.CLOSED
+        if self.state == CircuitState.HALF_OPEN:
+            if self.probes + self.probe_successes >= self.half_open_probes:
+                # Vagas presas (ex.: processo morto no meio do probe) expiram
+                if now - self.state_since < self.open_seconds:
+                    return False
+                self._set_state(CircuitState.HALF_OPEN, now)
+            self.probes += 1
 
-    def _on_failure(self) -> None:
-        """Handle failed call"""
-        self.failure_count += 1
-        self.last_failure_time = datetime.utcnow()
-        self.success_count = 0
+        return True
 
-        if self.failure_count >= self.failure_threshold:
-            self.state = CircuitState.OPEN
+    def _record(self, failed: bool, elapsed: float, counted: bool = True) -> None:
+        now = self.monotonic()
+        if self.state == CircuitState.HALF_OPEN:
+            self.probes = max(0, self.probes - 1)
+            if not counted:
+                return
+            if failed:
+                self._set_state(CircuitState.OPEN, now)
+                return
+            self.probe_successes += 1
+            if self.probe_successes >= self.half_open_probes:
+                self._set_state(CircuitState.CLOSED, now)
+            return
+
+        if not counted or self.state == CircuitState.OPEN:
+            # Resultado tardio de uma chamada admitida antes de abrir
+            return
+
+        outcome = (FAILED if failed else 0) | (SLOW if elapsed >= self.slow_call else 0)
+        evicted = self.ring[self.index] if self.count == self.window else 0
+        self.ring[self.index] = outcome
+        self.index = (self.index + 1) % self.window
+        self.count = min(self.count + 1, self.window)
+        self.failures += (outcome & FAILED) - (evicted & FAILED)
+        self.slow += ((outcome & SLOW) - (evicted & SLOW)) >> 1
+
+        if self.count >= self.min_calls and (
+            self.failures >= self.failure_rate * self.count
+            or self.slow >= self.slow_rate * self.count
+        ):
+            self._set_state(CircuitState.OPEN, now)
+
+    def _apply_health(self, failing: bool) -> None:
+        now = self.monotonic()
+        if failing and self.state == CircuitState.CLOSED:
+            self._set_state(CircuitState.OPEN, now)
+        elif not failing and self.state == CircuitState.OPEN:
+            self._set_state(CircuitState.HALF_OPEN, now)
+
+    def _set_state(self, state: CircuitState, now: float) -> None:
+        if state != self.state:
+            self.transitions[state].inc()
+        self.state = state
+        self.state_since = now
+        self.probes = 0
+        self.probe_successes = 0
+        if state == CircuitState.CLOSED:
+            # Recomeça a janela: as falhas antigas já motivaram a abertura
+            self.ring[:] = bytes(self.window)
+            self.index = self.count = self.failures = self.slow = 0
+
+    # Estado compartilhado --------------------------------------------------
+
+    def _transition(self, apply: Callable[[], Any]) -> Any:
+        """Aplica a transição no estado local ou no registro compartilhado"""
+        if self.record is None:
+            return apply()
+
+        result = None
+
+        def update(*values):
+            nonlocal result
+            self._load(values)
+            result = apply()
+            return self._dump()
+
+        self.record.update(update)
+        return result
+
+    def _init_shared(self, *values):
+        """Registro novo (tudo zero) começa fechado, com o relógio atual"""
+        if values[1] == 0.0:
+            return self._dump()
+        return values
+
+    def _load(self, values) -> None:
+        (
+            state,
+            self.state_since,
+            self.probes,
+            self.probe_successes,
+            self.index,
+            self.count,
+            self.failures,
+            self.slow,
+            ring,
+        ) = values
+        self.state = STATES[state]
+        self.ring[:] = ring
+
+    def _dump(self):
+        return (
+            STATES.index(self.state),
+            self.state_since,
+            self.probes,
+            self.probe_successes,
+            self.index,
+            self.count,
+            self.failures,
+            self.slow,
+            bytes(self.ring),
+        )
 
     @property
     def is_healthy(self) -> bool:
-        """Check if circuit breaker is allowing calls"""
-        return self.state != CircuitState.OPEN
+        """Aceitaria uma chamada agora (leitura, sem consumir vaga de probe)"""
+        if self.record is not None:
+            self._load(self.record.read())
+
+        if self.state == CircuitState.CLOSED:
+            return True
+        elapsed = self.monotonic() - self.state_since
+        if self.state == CircuitState.OPEN:
+            return elapsed >= self.open_seconds
+        return (
+            self.probes + self.probe_successes < self.half_open_probes
+            or elapsed >= self.open_seconds
+        )
@@ -0,0 +1,200 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional
+
+from app.core.clock import Clock, system_clock
+from app.core.config import settings
+from app.core.metrics import registry
+
+from .transport import RequestNotSent, TransportError
+
+
+HEDGES = registry.counter(
+    "processor_hedges_total",
+    "Chamadas lentas que dispararam consulta de status (hedge)",
+    ("processor", "outcome"),
+)
+
+Probe = Callable[[], Awaitable[Optional[Dict[str, Any]]]]
+
+# external_id já usado no processador: uma tentativa anterior pode ter cobrado
+DUPLICATE = 422
+
+
+def ambiguous(error: Exception) -> bool:
+    """Falha que não diz se o processador cobrou (precisa da consulta)
+
+    Sem status HTTP (conexão caída, timeout depois de escrever) ou 422 de
+    external_id repetido. Conexão recusada e requisição não enviada não
+    chegaram ao processador; os demais status HTTP são recusas definitivas.
+    """
+    if isinstance(error, (ConnectionRefusedError, RequestNotSent)):
+        return False
+    if isinstance(error, TransportError) and error.status is not None:
+        return error.status == DUPLICATE
+    return True
+
+
+async def confirm(request: Awaitable[Dict[str, Any]], probe: Probe) -> Dict[str, Any]:
+    """Aguarda `request`; numa falha ambígua, confere pelo `probe` antes de desistir"""
+    try:
+        return await request
+    except Exception as e:
+        if not ambiguous(e):
+            raise
+        found = await _final_probe(probe)
+        if found is None:
+            raise
+        return found
+
+
+async def _final_probe(probe: Probe) -> Optional[Dict[str, Any]]:
+    try:
+        return await probe()
+    except Exception:
+        return None
+
+
+class LatencyWindow:
+    """Últimas N latências com quantil recalculado a cada `refresh` amostras"""
+
+    __slots__ = ("samples", "index", "count", "quantile", "refresh", "value")
+
+    def __init__(self, size: int, quantile: float, refresh: int = 32):
+        self.samples = [0.0] * size
+        self.index = 0
+        self.count = 0
+        self.quantile = quantile
+        self.refresh = refresh
+        self.value: Optional[float] = None
+
+    def observe(self, latency: float) -> None:
+        self.samples[self.index] = latency
+        self.index = (self.index + 1) % len(self.samples)
+        self.count += 1
+        if self.count % self.refresh == 0:
+            filled = self.samples[: min(self.count, len(self.samples))]
+            ordered = sorted(filled)
+            self.value = ordered[
+                min(len(ordered) - 1, int(self.quantile * len(ordered)))
+            ]
+
+
+class HedgePolicy:
+    """Hedge idempotente de chamadas lentas ao processador
+
+    Se a chamada passa do quantil observado (p95 por padrão), consulta o
+    status do pagamento pelo external_id no mesmo processador. O primeiro
+    resultado definitivo vence: resposta da chamada original ou pagamento
+    encontrado na consulta (a original é cancelada e libera o worker).
+    Não reenvia para o outro processador: a deduplicação por external_id
+    é por processador, então um reenvio poderia cobrar duas vezes.
+
+    Consulta sem resultado (o processador ainda não registrou) é repetida
+    com o intervalo dobrando, até `max_probes` consultas; depois disso a
+    espera pela original só é limitada pelo request_timeout do transporte.
+
+    A janela observa toda chamada que termina, inclusive falhas e as que o
+    hedge resolveu (nestas, o tempo até a resolução é um limite inferior da
+    latência); observar só as rápidas puxaria o quantil para baixo.
+
+    Falhas ambíguas (ver `ambiguous`) também são conferidas pela consulta,
+    como em `confirm`, que o processador usa quando o hedge está desligado.
+    """
+
+    def __init__(
+        self,
+        processor_ids: Iterable[int],
+        names: Optional[Dict[int, str]] = None,
+        quantile: Optional[float] = None,
+        min_delay_ms: Optional[int] = None,
+        window: Optional[int] = None,
+        clock: Optional[Clock] = None,
+        max_probes: Optional[int] = None,
+    ):
+        self.clock = clock or system_clock
+        quantile = quantile or settings.hedge_quantile
+        window = window or settings.hedge_window
+        self.min_delay = (min_delay_ms or settings.hedge_min_delay_ms) / 1000
+        self.max_probes = max_probes or settings.hedge_max_probes
+        self.windows = {pid: LatencyWindow(window, quantile) for pid in processor_ids}
+
+        names = names or {}
+        self.outcomes = {
+            pid: {
+                outcome: HEDGES.labels(names.get(pid, str(pid)), outcome)
+                for outcome in ("fired", "won", "missed")
+            }
+            for pid in self.windows
+        }
+
+    def delay(self, processor_id: int) -> Optional[float]:
+        """Atraso até o hedge; None enquanto não há amostras suficientes"""
+        value = self.windows[processor_id].value
+        if value is None:
+            return None
+        return max(self.min_delay, value)
+
+    async def call(
+        self, processor_id: int, request: Awaitable[Dict[str, Any]], probe: Probe
+    ) -> Dict[str, Any]:
+        """Executa `request` com hedge via `probe` após o atraso adaptativo"""
+        start = self.clock.perf_counter()
+        primary = asyncio.ensure_future(request)
+        pending_probe: Optional[asyncio.Future] = None
+        outcomes = self.outcomes[processor_id]
+        window = self.windows[processor_id]
+
+        try:
+            # Sem amostras suficientes ainda não há atraso: não faz hedge
+            delay = self.delay(processor_id)
+            probes = 0
+            while delay is not None and probes < self.max_probes:
+                await asyncio.wait((primary,), timeout=delay)
+                if primary.done():
+                    break
+
+                outcomes["fired"].inc()
+                probes += 1
+                pending_probe = asyncio.ensure_future(probe())
+                await asyncio.wait(
+                    (primary, pending_probe), return_when=asyncio.FIRST_COMPLETED
+                )
+                if primary.done():
+                    break
+
+                found = self._probe_result(pending_probe)
+                if found is not None:
+                    outcomes["won"].inc()
+                    window.observe(self.clock.perf_counter() - start)
+                    return found
+                outcomes["missed"].inc()
+                delay *= 2
+
+            try:
+                response = await primary
+            except Exception as e:
+                window.observe(self.clock.perf_counter() - start)
+                if not probes and not self.ambiguous(e):
+                    raise
+                # Chamada lenta ou falha ambígua: a cobrança pode ter
+                # acontecido mesmo assim; confere antes de desistir
+                found = await _final_probe(probe)
+                if found is None:
+                    raise
+                outcomes["won"].inc()
+                return found
+
+            window.observe(self.clock.perf_counter() - start)
+            return response
+        finally:
+            for future in (primary, pending_probe):
+                if future is not None and not future.done():
+                    future.cancel()
+
+    ambiguous = staticmethod(ambiguous)
+
+    @staticmethod
+    def _probe_result(future: asyncio.Future) -> Optional[Dict[str, Any]]:
+        if future.cancelled() or future.exception() is not None:
+            return None
+        return future.result()
@@ -0,0 +1,133 @@
+import asyncio
+import time
+from typing import List, Optional, Tuple
+
+from fastapi import Request
+
+from app.core.config import settings
+from app.core.metrics import registry, SIZE_BUCKETS
+from app.models.record import PaymentRecord
+
+from .repository import PaymentRepository
+
+
+DB_INSERT_SECONDS = registry.histogram(
+    "db_insert_seconds", "Latência do INSERT em lote (group commit)"
+)
+INGEST_BATCH_SIZE = registry.histogram(
+    "ingest_batch_size", "Pagamentos por lote gravado", buckets=SIZE_BUCKETS
+)
+INGEST_FAILED_BATCHES = registry.counter(
+    "ingest_failed_batches_total", "Lotes de INSERT que falharam"
+)
+
+
+class IngestPipeline:
+    """Agrupa inserts de pagamentos em lotes (group commit)"""
+
+    def __init__(
+        self,
+        repository: PaymentRepository,
+        batch_size: Optional[int] = None,
+        linger_ms: Optional[int] = None,
+        max_flushes: Optional[int] = None,
+    ):
+        self.batch_size = batch_size or settings.ingest_batch_size
+        self.linger = (linger_ms or settings.ingest_linger_ms) / 1000
+        self.pending: List[Tuple[PaymentRecord, asyncio.Future]] = []
+        self.running = False
+        self.repository = repository
+
+        self._has_items = asyncio.Event()
+        self._full = asyncio.Event()
+        self._flush_slots = asyncio.Semaphore(
+            max_flushes or settings.ingest_max_flushes
+        )
+        self._flushes: set = set()
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self) -> None:
+        """Inicia o flusher em background"""
+        self.running = True
+        self._task = asyncio.create_task(self._flusher())
+
+    async def stop(self) -> None:
+        """Grava o que estiver pendente e para o flusher"""
+        self.running = False
+        self._has_items.set()
+        self._full.set()
+
+        if self._task:
+            await self._task
+        if self._flushes:
+            await asyncio.gather(*self._flushes, return_exceptions=True)
+
+    async def submit(self, payment: PaymentRecord) -> PaymentRecord:
+        """Adiciona pagamento ao lote atual e aguarda o commit"""
+        future = asyncio.get_running_loop().create_future()
+        self.pending.append((payment, future))
+
+        self._has_items.set()
+        if len(self.pending) >= self.batch_size:
+            self._full.set()
+
+        return await future
+
+    async def _flusher(self) -> None:
+        """Fecha lotes por tamanho ou por tempo (linger)"""
+        while self.running or self.pending:
+            await self._has_items.wait()
+
+            # Espera o lote encher ou o linger expirar
+            if self.running and len(self.pending) < self.batch_size:
+                try:
+                    await asyncio.wait_for(self._full.wait(), timeout=self.linger)
+                except asyncio.TimeoutError:
+                    pass
+
+            batch = self.pending[: self.batch_size]
+            del self.pending[: self.batch_size]
+
+            if len(self.pending) < self.batch_size:
+                self._full.clear()
+            if not self.pending:
+                self._has_items.clear()
+
+            if not batch:
+                continue
+
+            await self._flush_slots.acquire()
+            flush = asyncio.create_task(self._flush(batch))
+            self._flushes.add(flush)
+            flush.add_done_callback(self._flushes.discard)
+
+    async def _flush(self, batch: List[Tuple[PaymentRecord, asyncio.Future]]) -> None:
+        """Grava o lote com uma única escrita no repositório (ids na ordem)"""
+        start_time = time.perf_counter()
+
+        try:
+            ids = await self.repository.insert([payment for payment, _ in batch])
+
+        except Exception as e:
+            INGEST_FAILED_BATCHES.inc()
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        finally:
+            self._flush_slots.release()
+
+        DB_INSERT_SECONDS.observe(time.perf_counter() - start_time)
+        INGEST_BATCH_SIZE.observe(len(batch))
+
+        # Libera todas as requisições que aguardavam este lote
+        for (payment, future), payment_id in zip(batch, ids):
+            payment.id = payment_id
+            if not future.done():
+                future.set_result(payment)
+
+
+async def get_ingest_pipeline(request: Request) -> IngestPipeline:
+    """Obtém pipeline de ingestão do estado da aplicação"""
+    return request.app.state.ingest_pipeline
@@ -0,0 +1,152 @@
+import asyncio
+import math
+from collections import deque
+from typing import Deque, Dict, Optional, Type
+
+from app.core.config import settings
+
+
+class AIMDAlgorithm:
+    """Additive increase / multiplicative decrease"""
+
+    name = "aimd"
+
+    def __init__(self):
+        self.slow_threshold = settings.limiter_slow_ms / 1000
+        self.backoff = settings.limiter_backoff
+
+    def update(
+        self, limit: float, latency: float, success: bool, in_flight: int
+    ) -> float:
+        if not success or latency > self.slow_threshold:
+            return limit * self.backoff
+
+        # Só cresce se o limite está de fato sendo usado
+        if in_flight * 2 >= limit:
+            return limit + 1.0 / limit
+        return limit
+
+
+class GradientAlgorithm:
+    """Gradiente estilo Vegas: compara RTT de longo prazo com a amostra atual"""
+
+    name = "gradient"
+
+    def __init__(self, smoothing: float = 0.2, long_alpha: float = 0.05):
+        self.smoothing = smoothing
+        self.long_alpha = long_alpha
+        self.backoff = settings.limiter_backoff
+        self.long_rtt: Optional[float] = None
+
+    def update(
+        self, limit: float, latency: float, success: bool, in_flight: int
+    ) -> float:
+        if not success:
+            return limit * self.backoff
+
+        if self.long_rtt is None:
+            self.long_rtt = latency
+        else:
+            self.long_rtt += self.long_alpha * (latency - self.long_rtt)
+
+        # Não cresce se o limite não está sendo usado
+        if in_flight * 2 < limit:
+            return limit
+
+        gradient = max(0.5, min(1.0, self.long_rtt / max(latency, 1e-6)))
+        target = limit * gradient + math.sqrt(limit)
+        return limit * (1 - self.smoothing) + target * self.smoothing
+
+
+LIMIT_ALGORITHMS: Dict[str, Type] = {
+    AIMDAlgorithm.name: AIMDAlgorithm,
+    GradientAlgorithm.name: GradientAlgorithm,
+}
+
+
+def create_algorithm(name: Optional[str] = None):
+    """Instancia o algoritmo configurado em Settings"""
+    name = name or settings.limiter_algorithm
+    try:
+        return LIMIT_ALGORITHMS[name]()
+    except KeyError:
+        raise ValueError(f"Unknown limiter algorithm: {name}")
+
+
+class AdaptiveLimiter:
+    """Limite de concorrência adaptativo com fila FIFO justa de permits"""
+
+    def __init__(
+        self,
+        initial_limit: int,
+        name: str = "limiter",
+        algorithm=None,
+        min_limit: Optional[int] = None,
+        max_limit: Optional[int] = None,
+    ):
+        self.name = name
+        self.algorithm = algorithm or create_algorithm()
+        self.min_limit = settings.limiter_min if min_limit is None else min_limit
+        self.max_limit = settings.limiter_max if max_limit is None else max_limit
+        self.limit = float(min(max(initial_limit, self.min_limit), self.max_limit))
+        self.in_flight = 0
+        self.waiters: Deque[asyncio.Future] = deque()
+
+    @property
+    def waiting(self) -> int:
+        return len(self.waiters)
+
+    @property
+    def saturated(self) -> bool:
+        return self.in_flight >= int(self.limit) or bool(self.waiters)
+
+    async def acquire(self, timeout: Optional[float] = None) -> bool:
+        """Aguarda um permit em ordem de chegada; False se estourar o timeout"""
+        if not self.saturated:
+            self.in_flight += 1
+            return True
+
+        waiter = asyncio.get_running_loop().create_future()
+        self.waiters.append(waiter)
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), timeout)
+            return True
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if waiter.done() and not waiter.cancelled():
+                # Permit chegou junto com o timeout/cancelamento: devolve
+                self.in_flight -= 1
+                self._wake()
+            else:
+                waiter.cancel()
+                self.waiters.remove(waiter)
+            if isinstance(e, asyncio.CancelledError):
+                raise
+            return False
+
+    def release(self, latency: float, success: bool) -> None:
+        """Devolve o permit e ajusta o limite com a amostra observada"""
+        limit = self.algorithm.update(self.limit, latency, success, self.in_flight)
+        self.limit = min(max(limit, self.min_limit), self.max_limit)
+        self.in_flight -= 1
+        self._wake()
+
+    def discard(self) -> None:
+        """Devolve o permit sem amostra (a chamada não chegou ao processador)"""
+        self.in_flight -= 1
+        self._wake()
+
+    def _wake(self) -> None:
+        """Entrega permits livres aos primeiros da fila"""
+        while self.waiters and self.in_flight < int(self.limit):
+            waiter = self.waiters.popleft()
+            if not waiter.done():
+                self.in_flight += 1
+                waiter.set_result(None)
+
+    def snapshot(self) -> Dict[str, float]:
+        """Estado atual para observabilidade"""
+        return {
+            "limit": round(self.limit, 2),
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+        }
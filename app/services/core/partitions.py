@@ -0,0 +1,142 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional
+
+from sqlalchemy import text
+
+from app.core.config import settings
+from app.core.database import engine
+from app.core.metrics import registry
+from app.models.record import EPOCH
+
+
+PARTITIONS_CREATED = registry.counter(
+    "payments_partitions_created_total", "Partições de payments criadas"
+)
+PARTITIONS_DROPPED = registry.counter(
+    "payments_partitions_dropped_total", "Partições de payments removidas no purge"
+)
+
+# Chave do advisory lock: uma instância por vez mexe nas partições
+LOCK_KEY = 0x7061796D
+
+# Partições existentes de payments
+CHILDREN = (
+    "SELECT child.relname FROM pg_inherits"
+    " JOIN pg_class child ON child.oid = pg_inherits.inhrelid"
+    " JOIN pg_class parent ON parent.oid = pg_inherits.inhparent"
+    " WHERE parent.relname = 'payments'"
+)
+
+
+class PartitionManager:
+    """Partições de payments por faixa de created_at, criadas com antecedência
+
+    Cada partição cobre `payments_partition_hours` horas (alinhadas à época
+    Unix). No start e depois a cada `payments_partition_check_seconds` a
+    partição atual e as `payments_partitions_ahead` seguintes são criadas se
+    faltarem; uma partição DEFAULT recebe o que cair fora (ex.: relógio
+    adiantado), então um INSERT nunca falha por falta de partição.
+
+    O purge vira TRUNCATE (instantâneo, sem tuplas mortas) e as partições
+    anteriores à atual são removidas. Várias instâncias podem rodar isso ao
+    mesmo tempo: cada passo segura um advisory lock na transação.
+    """
+
+    def __init__(self):
+        self.width = timedelta(hours=settings.payments_partition_hours)
+        self.ahead = settings.payments_partitions_ahead
+        self.interval = settings.payments_partition_check_seconds
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self, maintain: bool = True) -> None:
+        """Garante as partições agora e, com `maintain`, periodicamente"""
+        await self.ensure()
+        if maintain:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.ensure()
+            except Exception as e:
+                print(f"Partition maintenance error: {e}")
+
+    def _window(self, instant: datetime) -> datetime:
+        """Início da partição que contém o instante"""
+        return EPOCH + (instant - EPOCH) // self.width * self.width
+
+    def _name(self, start: datetime) -> str:
+        return f"payments_p{start:%Y%m%d%H}"
+
+    async def ensure(self) -> List[str]:
+        """Cria a partição atual, as `ahead` seguintes e a DEFAULT"""
+        start = self._window(datetime.now(timezone.utc))
+        created = []
+
+        async with engine.begin() as conn:
+            await conn.execute(
+                text("SELECT pg_advisory_xact_lock(:key)"), {"key": LOCK_KEY}
+            )
+
+            existing = set(await conn.scalars(text(CHILDREN)))
+
+            if "payments_default" not in existing:
+                await conn.execute(
+                    text("CREATE TABLE payments_default PARTITION OF payments DEFAULT")
+                )
+
+            for i in range(self.ahead + 1):
+                lower = start + i * self.width
+                name = self._name(lower)
+                if name in existing:
+                    continue
+                await conn.execute(
+                    text(
+                        f"CREATE TABLE {name} PARTITION OF payments"
+                        f" FOR VALUES FROM ('{lower.isoformat()}')"
+                        f" TO ('{(lower + self.width).isoformat()}')"
+                    )
+                )
+                created.append(name)
+
+        PARTITIONS_CREATED.inc(len(created))
+        return created
+
+    async def truncate(self, conn) -> int:
+        """Purge: esvazia todas as partições e remove as anteriores à atual
+
+        Roda na transação de quem chama; retorna quantas linhas havia. A
+        contagem é feita com a tabela já bloqueada (o mesmo lock que o
+        TRUNCATE pegaria), então nenhum INSERT escapa entre as duas.
+        """
+        await conn.execute(
+            text("SELECT pg_advisory_xact_lock(:key)"), {"key": LOCK_KEY}
+        )
+        await conn.execute(text("LOCK TABLE payments IN ACCESS EXCLUSIVE MODE"))
+        deleted_count = await conn.scalar(text("SELECT count(*) FROM payments"))
+        await conn.execute(text("TRUNCATE payments"))
+
+        current = self._name(self._window(datetime.now(timezone.utc)))
+        names = await conn.scalars(
+            text(
+                CHILDREN + " AND child.relname LIKE 'payments\\_p%'"
+                " AND child.relname < :current"
+            ),
+            {"current": current},
+        )
+
+        dropped = 0
+        for name in list(names):
+            await conn.execute(text(f"DROP TABLE {name}"))
+            dropped += 1
+
+        PARTITIONS_DROPPED.inc(dropped)
+        return deleted_count
@@ -0,0 +1,186 @@
+import asyncio
+import socket
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional, Tuple
+
+import asyncpg
+from sqlalchemy import and_, case, func, literal, or_, select, update
+
+from app.core.config import settings
+from app.core.database import async_session, asyncpg_dsn
+from app.models.payment import Payment, PaymentStatus
+from app.models.record import PaymentRecord, to_us
+from app.services.core.summary import to_cents
+
+
+# Estados que ainda precisam de processamento
+UNFINISHED = (PaymentStatus.PROCESSING, PaymentStatus.RETRYING)
+
+
+class PostgresQueueBackend:
+    """Fila de trabalho na própria tabela payments (FOR UPDATE SKIP LOCKED)
+
+    Cada instância reivindica lotes de linhas PENDING (ou RETRYING sem dono),
+    marcando-as como PROCESSING com `claimed_by`. Inserts disparam NOTIFY no
+    canal configurado, acordando as instâncias sem polling. Numa linha
+    RETRYING, `processor_id` é o processador fixado por uma falha ambígua.
+
+    O dono é a instância mais o slot do worker: processos irmãos do mesmo
+    container não devolvem o trabalho uns dos outros. Enquanto vivo, o dono
+    renova o lease das suas linhas (inclusive as que esperam o backoff).
+    """
+
+    def __init__(self):
+        instance = settings.instance_id or socket.gethostname()
+        self.owner = f"{instance[:56]}:{settings.worker_slot}"
+        self.channel = settings.queue_notify_channel
+        self.lease = timedelta(seconds=settings.queue_lease_seconds)
+        self.notified = asyncio.Event()
+        self._listener: Optional[asyncpg.Connection] = None
+
+    async def start(self) -> None:
+        """Abre conexão dedicada para LISTEN"""
+        self._listener = await asyncpg.connect(asyncpg_dsn())
+        await self._listener.add_listener(self.channel, self._on_notify)
+
+    async def stop(self) -> None:
+        """Fecha conexão de LISTEN"""
+        if self._listener is not None:
+            await self._listener.close()
+            self._listener = None
+
+    def _on_notify(self, connection, pid, channel, payload) -> None:
+        self.notified.set()
+
+    async def claim(self, limit: int) -> List[PaymentRecord]:
+        """Reivindica até `limit` pagamentos pendentes para esta instância"""
+        claimable = (
+            select(Payment.id)
+            .where(
+                or_(
+                    Payment.status == PaymentStatus.PENDING,
+                    and_(
+                        Payment.status == PaymentStatus.RETRYING,
+                        Payment.claimed_by.is_(None),
+                    ),
+                )
+            )
+            .order_by(Payment.id)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+            .scalar_subquery()
+        )
+
+        async with async_session() as session:
+            result = await session.execute(
+                update(Payment)
+                .where(Payment.id.in_(claimable))
+                .values(
+                    status=PaymentStatus.PROCESSING,
+                    claimed_by=self.owner,
+                    updated_at=datetime.now(timezone.utc),
+                )
+                .returning(
+                    Payment.id,
+                    Payment.amount,
+                    Payment.currency,
+                    Payment.created_at,
+                    Payment.attempts,
+                    Payment.processor_id,
+                )
+                .execution_options(synchronize_session=False)
+            )
+            rows = result.all()
+            await session.commit()
+
+        return [
+            PaymentRecord(
+                to_cents(row.amount),
+                row.currency,
+                to_us(row.created_at),
+                id=row.id,
+                attempts=row.attempts,
+                pinned=row.processor_id,
+            )
+            for row in rows
+        ]
+
+    async def pending(self, limit: int) -> Tuple[int, Optional[datetime]]:
+        """PENDING na tabela (contagem limitada a `limit`) e o created_at mais antigo"""
+        pending = Payment.status == PaymentStatus.PENDING
+        counted = select(Payment.id).where(pending).limit(limit).subquery()
+
+        async with async_session() as session:
+            result = await session.execute(
+                select(
+                    select(func.count()).select_from(counted).scalar_subquery(),
+                    select(func.min(Payment.created_at))
+                    .where(pending)
+                    .scalar_subquery(),
+                )
+            )
+            count, oldest = result.one()
+
+        return count, oldest
+
+    async def renew(self) -> int:
+        """Renova o lease das linhas não concluídas desta instância"""
+        async with async_session() as session:
+            result = await session.execute(
+                update(Payment)
+                .where(
+                    Payment.status.in_(UNFINISHED),
+                    Payment.claimed_by == self.owner,
+                )
+                .values(updated_at=datetime.now(timezone.utc))
+                .execution_options(synchronize_session=False)
+            )
+            await session.commit()
+
+        return result.rowcount
+
+    async def release(self, include_stale: bool = False) -> int:
+        """Devolve à fila o trabalho não concluído desta instância
+
+        Com `include_stale`, também recupera linhas cujo lease expirou
+        (instâncias que morreram sem devolver o trabalho).
+        """
+        owned = Payment.claimed_by == self.owner
+        if include_stale:
+            owned = or_(owned, Payment.claimed_by.is_(None), self._stale())
+        return await self._release(owned)
+
+    async def sweep(self) -> int:
+        """Recupera linhas de outros donos cujo lease expirou
+
+        Sem isso, o trabalho de uma instância que morreu e não voltou com o
+        mesmo slot só seria recuperado no próximo restart de alguém.
+        """
+        return await self._release(
+            and_(Payment.claimed_by != self.owner, self._stale())
+        )
+
+    def _stale(self):
+        return Payment.updated_at < datetime.now(timezone.utc) - self.lease
+
+    async def _release(self, owned) -> int:
+        """PROCESSING volta a PENDING e RETRYING fica sem dono (reivindicáveis)"""
+        async with async_session() as session:
+            result = await session.execute(
+                update(Payment)
+                .where(Payment.status.in_(UNFINISHED), owned)
+                .values(
+                    status=case(
+                        (
+                            Payment.status == PaymentStatus.PROCESSING,
+                            literal(PaymentStatus.PENDING, Payment.status.type),
+                        ),
+                        else_=Payment.status,
+                    ),
+                    claimed_by=None,
+                )
+                .execution_options(synchronize_session=False)
+            )
+            await session.commit()
+
+        return result.rowcount
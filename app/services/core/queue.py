@@ -1,126 +1,389 @@
 import asyncio
-import time
+import logging
 from datetime import datetime
-from typing import Any, Dict
-
-from sqlmodel import select
+from typing import Optional
 
+from app.core.clock import Clock, system_clock
 from app.core.config import settings
-from app.core.database import async_session
-from app.models.payment import Payment, PaymentStatus
+from app.core.metrics import registry
+from app.models.payment import PaymentStatus
+from app.models.record import PaymentRecord
 
 from ..payment import PaymentProcessor
+from .pgqueue import PostgresQueueBackend
+from .repository import PaymentRepository
+from .retry import RetryScheduler
+from .spill import SpillQueue
+from .status import StatusWriter
+from .summary import create_summary_index
 from fastapi import Request
 
+# Pagamentos novos sempre passam na frente das retentativas
+PRIORITY_NEW = 0
+PRIORITY_RETRY = 1
+
+QUEUE_WAIT_SECONDS = registry.histogram(
+    "queue_wait_seconds", "Tempo entre enfileirar e um worker pegar o pagamento"
+)
+PAYMENTS_TOTAL = registry.counter(
+    "payments_total", "Pagamentos por resultado da tentativa", ("outcome",)
+)
+WORKER_ERRORS = registry.counter(
+    "worker_errors_total", "Exceções inesperadas nos workers"
+)
+BACKGROUND_ERRORS = registry.counter(
+    "queue_background_errors_total",
+    "Falhas nas tarefas de fundo da fila (feeder, backlog, lease)",
+    ("task",),
+)
+FEEDER_ERRORS = BACKGROUND_ERRORS.labels("feeder")
+BACKLOG_ERRORS = BACKGROUND_ERRORS.labels("backlog")
+LEASE_ERRORS = BACKGROUND_ERRORS.labels("lease")
+PAYMENTS_PROCESSED = PAYMENTS_TOTAL.labels("processed")
+PAYMENTS_RETRIED = PAYMENTS_TOTAL.labels("retried")
+PAYMENTS_FAILED = PAYMENTS_TOTAL.labels("failed")
+PAYMENTS_REJECTED = PAYMENTS_TOTAL.labels("rejected")
+
+logger = logging.getLogger(__name__)
+
+# Intervalo de leitura do backlog no Postgres para a admissão
+BACKLOG_REFRESH_SECONDS = 1.0
+
+
 class QueueManager:
     """Processamento assíncrono para máxima performance"""
-    
-    def __init__(self):
-        self.queue = asyncio.Queue()
+
+    def __init__(self, repository: PaymentRepository, clock: Optional[Clock] = None):
+        self.repository = repository
+        self.clock = clock or system_clock
         self.max_workers = settings.max_workers
         self.workers = []
-        self.processor = PaymentProcessor()
+        self.processor = PaymentProcessor(self.clock)
+        self.summary = create_summary_index(self.processor.processors.keys())
         self.running = False
-        
-        # Estatísticas para payment-summary
-        self.stats = {
-            "processed": 0,
-            "failed": 0,
-            "start_time": time.time(),
-        }
-        
+
+        # Retentativas agendadas fora dos workers
+        self.retry_scheduler = RetryScheduler(self._requeue_retry, clock=self.clock)
+        self.max_attempts = settings.retry_max_attempts
+
+        # Atualizações de status gravadas em lote
+        self.status_writer = StatusWriter(repository)
+        self.track_processing = settings.track_processing_status
+
+        # Fila compartilhada no Postgres (opcional, para várias instâncias)
+        self.backend = (
+            PostgresQueueBackend() if settings.queue_backend == "postgres" else None
+        )
+        self.feeder = None
+        self.renewer = None
+        self.watcher = None
+
+        # Backlog PENDING no Postgres (a fila local só guarda poucos lotes),
+        # lido periodicamente quando há controle de admissão
+        self.backlog = 0
+        self.backlog_oldest: Optional[datetime] = None
+        self.claim_batch = settings.queue_claim_batch
+        self.poll_interval = settings.queue_poll_interval_ms / 1000
+        self.drain_timeout = settings.shutdown_drain_timeout
+
+        # Fila limitada em memória; o excedente vai para um segmento em disco
+        # (com a fila no Postgres o próprio banco é o armazenamento durável)
+        spill_path = None
+        if not self.backend and settings.queue_spill_path:
+            spill_path = f"{settings.queue_spill_path}.{settings.worker_slot}.spill"
+        self.queue = SpillQueue(path=spill_path, clock=self.clock)
+
+        # Gauges lidos na coleta do /metrics
+        registry.gauge(
+            "queue_depth", "Pagamentos na fila local", lambda: self.queue.qsize()
+        )
+        registry.gauge(
+            "queue_spilled",
+            "Pagamentos da fila guardados em disco",
+            lambda: self.queue.spilled,
+        )
+        registry.gauge(
+            "retry_pending",
+            "Retentativas aguardando o backoff",
+            lambda: len(self.retry_scheduler),
+        )
+        registry.gauge(
+            "status_pending",
+            "Atualizações de status aguardando o lote",
+            lambda: len(self.status_writer.pending),
+        )
+
     async def start(self) -> None:
         """Inicia workers da queue"""
         self.running = True
-        
+
+        # Reconstrói agregados do payment-summary a partir do banco (com o
+        # rollup o summary é lido do próprio banco e o índice local não é usado)
+        if not self.repository.rollup:
+            await self.summary.rebuild(self.repository)
+
+        # Inicia health check em background
+        await self.processor.start()
+
+        # Backlog que ficou em disco de uma execução anterior
+        self.queue.open()
+
+        # Inicia agendador de retentativas e gravação de status em lote
+        await self.retry_scheduler.start()
+        await self.status_writer.start()
+
+        # Recupera trabalho reivindicado e não concluído antes de um restart
+        if self.backend:
+            recovered = await self.backend.release(include_stale=True)
+            if recovered:
+                logger.info("Recovered %d unfinished payments", recovered)
+            await self.backend.start()
+            self.feeder = asyncio.create_task(self._feed())
+            self.renewer = asyncio.create_task(self._renew_leases())
+            if settings.admission_enabled:
+                self.watcher = asyncio.create_task(self._watch_backlog())
+
         for i in range(self.max_workers):
             worker = asyncio.create_task(self._worker(f"worker-{i}"))
             self.workers.append(worker)
-    
+
     async def stop(self) -> None:
-        """Para todos os workers"""
+        """Para os workers drenando o trabalho em andamento até o deadline"""
         self.running = False
-        
-        for worker in self.workers:
-            worker.cancel()
-        
-        await asyncio.gather(*self.workers, return_exceptions=True)
+        await self.retry_scheduler.stop()
+
+        for task in (self.feeder, self.renewer, self.watcher):
+            if task:
+                task.cancel()
+                await asyncio.gather(task, return_exceptions=True)
+
+        # Dá tempo para os pagamentos em andamento terminarem
+        if self.workers:
+            _, pending = await asyncio.wait(self.workers, timeout=self.drain_timeout)
+            for worker in pending:
+                worker.cancel()
+            await asyncio.gather(*self.workers, return_exceptions=True)
+
+        # Sem backend: retentativas agendadas e fila restante vão para o disco
+        if not self.backend:
+            for _, _, task in self.retry_scheduler.heap:
+                self.queue.put(PRIORITY_RETRY, task)
+            self.retry_scheduler.heap.clear()
+            persisted = self.queue.persist()
+            if persisted:
+                logger.info("Persisted %d queued payments to spill log", persisted)
+        self.queue.close()
+
+        await self.status_writer.stop()
+
+        # Devolve à fila compartilhada o que não foi concluído
+        if self.backend:
+            await self.backend.release()
+            await self.backend.stop()
+
         await self.processor.close()
-    
-    async def enqueue_payment(self, payment_id: int) -> None:
-        """Enfileira pagamento para processamento"""
-        await self.queue.put({"payment_id": payment_id})
-    
+
+    async def enqueue_payment(self, payment: PaymentRecord) -> None:
+        """Enfileira pagamento (o próprio registro compacto) para processamento"""
+        if self.backend:
+            # A linha já está PENDING no banco: só acorda o feeder local
+            self.backend.notified.set()
+            return
+
+        self._put(PRIORITY_NEW, payment)
+
+    def depth(self) -> int:
+        """Pagamentos aguardando processamento (fila local + backlog no Postgres)"""
+        return self.queue.qsize() + self.backlog
+
+    def head_age(self) -> float:
+        """Há quanto tempo o pagamento mais antigo aguarda (segundos)"""
+        age = self.queue.head_age()
+        if self.backlog_oldest is not None:
+            age = max(age, (self.clock.now() - self.backlog_oldest).total_seconds())
+        return age
+
+    def clear(self) -> None:
+        """Descarta o trabalho pendente e os agregados (purge)"""
+        self.queue.clear()
+        self.retry_scheduler.heap.clear()
+        self.summary.purge()
+
+    def _requeue_retry(self, task: PaymentRecord) -> None:
+        """Reinjeta retentativa vencida com prioridade menor que pagamentos novos"""
+        self._put(PRIORITY_RETRY, task)
+
+    def _put(self, priority: int, task: PaymentRecord) -> None:
+        """Coloca na fila local marcando o instante (para o queue wait)"""
+        task.enqueued_at = self.clock.perf_counter()
+        self.queue.put(priority, task)
+
+    async def _feed(self) -> None:
+        """Reivindica lotes do Postgres quando há espaço na fila local"""
+        while self.running:
+            claimed = []
+            try:
+                capacity = self.claim_batch * 2 - self.queue.qsize()
+                if capacity > 0:
+                    self.backend.notified.clear()
+                    claimed = await self.backend.claim(min(capacity, self.claim_batch))
+                    for task in claimed:
+                        self._put(PRIORITY_NEW, task)
+            except Exception as e:
+                FEEDER_ERRORS.inc()
+                logger.warning("Queue feeder error: %s", e)
+
+            # Lote cheio: provavelmente há mais, tenta de novo logo
+            if len(claimed) == self.claim_batch:
+                await asyncio.sleep(0)
+                continue
+
+            try:
+                await asyncio.wait_for(
+                    self.backend.notified.wait(), timeout=self.poll_interval
+                )
+            except asyncio.TimeoutError:
+                pass
+
+    async def _watch_backlog(self) -> None:
+        """Atualiza o backlog PENDING lido pela admissão (contagem limitada)"""
+        while self.running:
+            try:
+                self.backlog, self.backlog_oldest = await self.backend.pending(
+                    settings.admission_max_depth
+                )
+            except Exception as e:
+                BACKLOG_ERRORS.inc()
+                logger.warning("Backlog watcher error: %s", e)
+            await asyncio.sleep(BACKLOG_REFRESH_SECONDS)
+
+    async def _renew_leases(self) -> None:
+        """Mantém vivo o lease do trabalho reivindicado e recupera os vencidos
+
+        Sem a renovação, uma retentativa esperando o backoff por mais que o
+        lease (ex.: processadores fora do ar) seria recuperada por outra
+        instância. A varredura devolve à fila o que instâncias mortas deixaram.
+        """
+        interval = self.backend.lease.total_seconds() / 3
+        while self.running:
+            await asyncio.sleep(interval)
+            try:
+                await self.backend.renew()
+                if await self.backend.sweep():
+                    self.backend.notified.set()
+            except Exception as e:
+                LEASE_ERRORS.inc()
+                logger.warning("Lease renewal error: %s", e)
+
     async def _worker(self, worker_name: str) -> None:
         """Worker que processa pagamentos da queue"""
-        while self.running:
+        # Sem backend nem segmento em disco, a fila local é drenada antes de sair
+        drain = not self.backend and not self.queue.path
+        while self.running or (drain and not self.queue.empty()):
             try:
                 task = await asyncio.wait_for(self.queue.get(), timeout=1.0)
+                QUEUE_WAIT_SECONDS.observe(self.clock.perf_counter() - task.enqueued_at)
+
+                # Fila local baixando: pede mais trabalho ao feeder
+                if self.backend and self.queue.qsize() < self.claim_batch:
+                    self.backend.notified.set()
+
                 await self._process_payment_task(task)
                 self.queue.task_done()
             except asyncio.TimeoutError:
                 continue
             except asyncio.CancelledError:
                 break
-            except Exception as e:
-                print(f"Worker {worker_name} error: {e}")
-    
-    async def _process_payment_task(self, task: Dict[str, Any]) -> None:
-        """Processa pagamento individual"""
-        payment_id = task["payment_id"]
-        
+            except Exception:
+                WORKER_ERRORS.inc()
+                logger.exception("Worker %s error", worker_name)
+
+    async def _process_payment_task(self, task: PaymentRecord) -> None:
+        """Processa pagamento individual (sem leituras no banco)"""
+        payment_id = task.id
+        task.attempts += 1
+
         try:
-            async with async_session() as session:
-                # Busca pagamento
-                result = await session.execute(
-                    select(Payment).where(Payment.id == payment_id)
+            # Status intermediário é opcional: normalmente é sobrescrito no lote
+            if self.track_processing:
+                self.status_writer.update(
+                    payment_id,
+                    status=PaymentStatus.PROCESSING,
+                    attempts=task.attempts,
+                    updated_at=self.clock.now(),
+                    created_at=task.created_at,
+                )
+
+            # Processa pagamento
+            result = await self.processor.process_payment(
+                payment_id, task.amount, task.currency, task.pinned
+            )
+
+            if result["success"]:
+                self.status_writer.complete(
+                    payment_id,
+                    task.cents,
+                    task.created_us // 1000,
+                    status=PaymentStatus.COMPLETED,
+                    external_id=result["external_id"],
+                    processor_id=result["processor_id"],
+                    fee=result["fee"],
+                    attempts=task.attempts,
+                    updated_at=self.clock.now(),
+                    # Localiza a partição (faz parte da PK com particionamento)
+                    created_at=task.created_at,
+                )
+                PAYMENTS_PROCESSED.inc()
+
+                # O processador já confirmou: agregados refletem na hora
+                self.summary.record_cents(
+                    result["processor_id"], task.cents, task.created_us // 1000
+                )
+                return
+
+            # Circuito aberto: a tentativa não aconteceu, só espera o backoff
+            if result.get("rejected"):
+                task.attempts -= 1
+                PAYMENTS_REJECTED.inc()
+                self.retry_scheduler.schedule(
+                    task, self.retry_scheduler.backoff(max(task.attempts, 1))
                 )
-                payment = result.scalar_one_or_none()
-                
-                if not payment:
-                    return
-                
-                # Atualiza status para processando
-                payment.status = PaymentStatus.PROCESSING
-                payment.attempts += 1
-                payment.updated_at = datetime.utcnow()
-                
-                session.add(payment)
-                await session.commit()
-                
-                # Processa pagamento
-                result = await self.processor.process_payment(payment)
-                
-                if result["success"]:
-                    payment.status = PaymentStatus.COMPLETED
-                    payment.external_id = result["external_id"]
-                    payment.processor_id = result["processor_id"]
-                    payment.fee = result["fee"]
-                    self.stats["processed"] += 1
-                else:
-                    payment.error_message = result["error"]
-                    
-                    # Retry com até 3 tentativas
-                    if payment.attempts < 3:
-                        payment.status = PaymentStatus.RETRYING
-                        
-                        # Exponential backoff
-                        retry_delay = min(2 ** payment.attempts, 10)
-                        await asyncio.sleep(retry_delay)
-                        
-                        # Re-enfileira
-                        await self.enqueue_payment(payment_id)
-                    else:
-                        payment.status = PaymentStatus.FAILED
-                        self.stats["failed"] += 1
-                
-                payment.updated_at = datetime.utcnow()
-                session.add(payment)
-                await session.commit()
-                
-        except Exception as e:
-            print(f"Error processing payment {payment_id}: {e}")
-            self.stats["failed"] += 1
+                return
+
+            # Falha ambígua: o processador pode ter cobrado; só ele deduplica
+            # pelo external_id, então as retentativas ficam com ele
+            if result.get("ambiguous"):
+                task.pinned = result["processor_id"]
+
+            # Retry com até retry_max_attempts tentativas
+            if task.attempts < self.max_attempts:
+                status = PaymentStatus.RETRYING
+            else:
+                status = PaymentStatus.FAILED
+                PAYMENTS_FAILED.inc()
+
+            self.status_writer.update(
+                payment_id,
+                status=status,
+                error_message=result["error"],
+                attempts=task.attempts,
+                # Fixação sobrevive à devolução da linha à fila compartilhada
+                processor_id=task.pinned,
+                updated_at=self.clock.now(),
+                created_at=task.created_at,
+            )
+
+            # Re-enfileira via scheduler (exponential backoff com jitter)
+            if status == PaymentStatus.RETRYING:
+                PAYMENTS_RETRIED.inc()
+                self.retry_scheduler.schedule(
+                    task, self.retry_scheduler.backoff(task.attempts)
+                )
+
+        except Exception:
+            logger.exception("Error processing payment %s", payment_id)
+            WORKER_ERRORS.inc()
+            PAYMENTS_FAILED.inc()
 
 
 async def get_queue_manager(request: Request) -> QueueManager:
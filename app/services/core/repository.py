@@ -0,0 +1,453 @@
+import asyncio
+import glob
+import os
+import struct
+from datetime import datetime, timezone
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional, Tuple, Union
+
+from fastapi import Request
+from sqlalchemy import delete, func, insert, select, text, update
+from sqlalchemy.dialects.postgresql import insert as upsert
+
+from app.core.config import settings
+from app.core.database import async_session, engine, init_db
+from app.core.shared import SharedRecord
+from app.core.storage import (
+    INSERT,
+    UPDATE,
+    PaymentLog,
+    embedded_path,
+    is_embedded,
+    read_header,
+    read_log,
+)
+from app.models.payment import Payment, PaymentRollup, PaymentStatus
+from app.models.record import PaymentRecord, to_us
+
+from .partitions import PartitionManager
+from .summary import to_cents, to_epoch_ms
+
+
+# (processor_id, centavos, created_at em epoch ms) de um pagamento concluído
+Completed = Tuple[int, int, int]
+
+# processor_id -> (quantidade, centavos)
+Summary = Dict[int, Tuple[int, int]]
+
+
+class SqlPaymentRepository:
+    """Pagamentos na tabela payments (Postgres via SQLAlchemy/asyncpg)"""
+
+    name = "sql"
+
+    def __init__(self):
+        # INSERT multi-row ... RETURNING id na ordem dos parâmetros
+        self.statement = insert(Payment).returning(
+            Payment.id, sort_by_parameter_order=True
+        )
+
+        # Com a fila no Postgres, cada lote avisa as instâncias via NOTIFY
+        self.notify_channel = (
+            settings.queue_notify_channel
+            if settings.queue_backend == "postgres"
+            else None
+        )
+
+        # Rollup por (processador, bucket) para o summary entre instâncias
+        self.rollup = settings.summary_backend == "rollup"
+        self.bucket_ms = settings.summary_bucket_ms
+        rollup = upsert(PaymentRollup)
+        self.rollup_statement = rollup.on_conflict_do_update(
+            index_elements=[PaymentRollup.processor_id, PaymentRollup.bucket],
+            set_={
+                "count": PaymentRollup.count + rollup.excluded.count,
+                "cents": PaymentRollup.cents + rollup.excluded.cents,
+            },
+        )
+
+        # payments particionada por created_at (purge por TRUNCATE)
+        self.partitions = (
+            PartitionManager() if settings.payments_partition_hours else None
+        )
+
+    async def start(self) -> None:
+        """Cria as tabelas (idempotente) e as partições de payments"""
+        await init_db()
+        if self.partitions:
+            # Todo processo garante as partições antes do tráfego; só o
+            # slot 0 as mantém em background
+            await self.partitions.start(maintain=settings.worker_slot == 0)
+
+    async def stop(self) -> None:
+        if self.partitions:
+            await self.partitions.stop()
+
+    @staticmethod
+    def _row(payment: PaymentRecord) -> dict:
+        created_at = payment.created_at
+        return {
+            "amount": payment.amount,
+            "currency": payment.currency,
+            "status": PaymentStatus.PENDING,
+            "attempts": payment.attempts,
+            "created_at": created_at,
+            "updated_at": created_at,
+        }
+
+    async def insert(self, payments: List[PaymentRecord]) -> List[int]:
+        """Um único INSERT multi-row ... RETURNING id; retorna os ids na ordem"""
+        async with async_session() as session:
+            result = await session.execute(
+                self.statement, [self._row(payment) for payment in payments]
+            )
+            ids = result.scalars().all()
+            if self.notify_channel:
+                await session.execute(select(func.pg_notify(self.notify_channel, "")))
+            await session.commit()
+        return ids
+
+    async def update_status(
+        self,
+        rows: List[Dict[str, Any]],
+        completed: Optional[Dict[int, Completed]] = None,
+    ) -> None:
+        """UPDATE em lote por chave primária (executemany)
+
+        Com o rollup ligado, os concluídos do lote entram na mesma transação
+        (antes do UPDATE): se o lote falhar, o rollup também volta.
+        """
+        async with async_session() as session:
+            if self.rollup and completed:
+                await self._roll_up(session, completed)
+            await session.execute(update(Payment), rows)
+            await session.commit()
+
+    async def _roll_up(self, session, completed: Dict[int, Completed]) -> None:
+        """Upsert em lote dos totais por (processador, bucket)
+
+        Só contam os pagamentos que ainda não estavam concluídos no banco
+        (lidos com FOR UPDATE), então reenviar uma conclusão não duplica.
+        """
+        result = await session.execute(
+            select(Payment.id)
+            .where(
+                Payment.id.in_(list(completed)),
+                Payment.status != PaymentStatus.COMPLETED,
+            )
+            .with_for_update()
+        )
+
+        totals: Dict[Tuple[int, int], List[int]] = {}
+        for payment_id in result.scalars():
+            processor_id, cents, created_ms = completed[payment_id]
+            key = (processor_id, created_ms - created_ms % self.bucket_ms)
+            total = totals.setdefault(key, [0, 0])
+            total[0] += 1
+            total[1] += cents
+
+        if totals:
+            # Ordem fixa das chaves: instâncias concorrentes travam as linhas
+            # do rollup na mesma sequência (sem deadlock)
+            await session.execute(
+                self.rollup_statement,
+                [
+                    {
+                        "processor_id": processor_id,
+                        "bucket": bucket,
+                        "count": count,
+                        "cents": cents,
+                    }
+                    for (processor_id, bucket), (count, cents) in sorted(totals.items())
+                ],
+            )
+
+    def _bucket(self, value: datetime) -> int:
+        """Início (epoch ms) do bucket que contém o instante"""
+        timestamp_ms = to_epoch_ms(value)
+        return timestamp_ms - timestamp_ms % self.bucket_ms
+
+    async def summary(
+        self,
+        processor_ids: Iterable[int],
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+    ) -> Summary:
+        """Totais por processador lidos só do rollup (faixa em buckets inteiros)"""
+        query = select(
+            PaymentRollup.processor_id,
+            func.sum(PaymentRollup.count),
+            func.sum(PaymentRollup.cents),
+        ).group_by(PaymentRollup.processor_id)
+
+        if start is not None:
+            query = query.where(PaymentRollup.bucket >= self._bucket(start))
+        if end is not None:
+            query = query.where(PaymentRollup.bucket <= self._bucket(end))
+
+        result = {processor_id: (0, 0) for processor_id in processor_ids}
+        async with async_session() as session:
+            for processor_id, count, cents in await session.execute(query):
+                if processor_id in result:
+                    result[processor_id] = (int(count), int(cents))
+        return result
+
+    async def purge(self) -> int:
+        """Apaga todos os pagamentos (e o rollup); retorna quantos havia"""
+        async with async_session() as session:
+            if self.partitions:
+                # TRUNCATE nas partições: sem reescrever a tabela nem deixar
+                # tuplas mortas para o autovacuum
+                deleted_count = await self.partitions.truncate(
+                    await session.connection()
+                )
+            else:
+                result = await session.execute(delete(Payment))
+                deleted_count = result.rowcount
+            await session.execute(delete(PaymentRollup))
+            await session.commit()
+        return deleted_count
+
+    async def completed(self) -> AsyncIterator[Completed]:
+        """Pagamentos concluídos numa única leitura em stream"""
+        async with async_session() as session:
+            result = await session.stream(
+                select(Payment.processor_id, Payment.amount, Payment.created_at)
+                .where(Payment.status == PaymentStatus.COMPLETED)
+                .execution_options(yield_per=1000)
+            )
+            async for processor_id, amount, created_at in result:
+                yield processor_id, to_cents(amount), to_epoch_ms(created_at)
+
+    async def warm_up(self, connections: int) -> int:
+        """Conexões do pool abertas em paralelo, com os statements quentes preparados
+
+        O INSERT do lote é só preparado no servidor (executá-lo gastaria um
+        id: nextval não volta no rollback). Os dois formatos de UPDATE de
+        status (sucesso e falha) são executados em lote, como no
+        StatusWriter, para ids que não existem: nenhuma linha é tocada.
+        """
+        row = self._row(PaymentRecord(1))
+        insert_sql = str(
+            self.statement.compile(dialect=engine.dialect, column_keys=list(row))
+        )
+
+        async def warm_connection() -> None:
+            # Sessões simultâneas seguram conexões distintas do pool
+            async with async_session() as session:
+                await session.execute(text("SELECT 1"))
+                connection = await (await session.connection()).get_raw_connection()
+                await connection.driver_connection.prepare(insert_sql)
+
+                now = datetime.now(timezone.utc)
+                for values in (
+                    {
+                        "status": PaymentStatus.COMPLETED,
+                        "external_id": "",
+                        "processor_id": 0,
+                        "fee": 0.0,
+                        "attempts": 1,
+                        "updated_at": now,
+                    },
+                    {
+                        "status": PaymentStatus.RETRYING,
+                        "error_message": "",
+                        "attempts": 1,
+                        "updated_at": now,
+                    },
+                ):
+                    # Dois ids (executemany): sem checagem de rowcount por linha
+                    await session.execute(
+                        update(Payment),
+                        [
+                            {"id": missing, "created_at": now, **values}
+                            for missing in (0, -1)
+                        ],
+                    )
+                await session.rollback()
+
+        await asyncio.gather(*(warm_connection() for _ in range(connections)))
+        return connections
+
+
+# Status <-> byte do registro
+STATUSES = list(PaymentStatus)
+EPOCH = struct.Struct("<q")
+
+# Bits da sequência local no id: os de cima identificam o slot (processo)
+SEQ_BITS = 40
+
+
+def _text(value: Optional[str], size: int) -> bytes:
+    return (value or "").encode()[:size]
+
+
+class LogPaymentRepository:
+    """Pagamentos num log local append-only (mmap), sem servidor de banco
+
+    Cada processo (slot) escreve só no próprio arquivo `{path}.{slot}.log`:
+    um registro INSERT por pagamento aceito e um registro UPDATE por mudança
+    de status. Os ids são `slot << 40 | sequência`, únicos entre processos
+    sem coordenação. Os índices (payment-summary, contagem do purge) são
+    reconstruídos lendo os logs no restart.
+
+    O purge incrementa uma época em `{path}.epoch`: logs de épocas anteriores
+    são ignorados na leitura e zerados pelo dono antes da próxima escrita.
+    """
+
+    name = "embedded"
+    rollup = False
+
+    def __init__(self, path: str, slot: Optional[int] = None):
+        self.path = path
+        self.slot = settings.worker_slot if slot is None else slot
+        self.fsync_interval = settings.storage_fsync_interval_ms / 1000
+        self.sync_commit = settings.storage_sync_commit
+        self.log: Optional[PaymentLog] = None
+        self.epoch_record: Optional[SharedRecord] = None
+
+    async def start(self) -> None:
+        """Abre (ou cria) o log do slot e inicia o fsync em grupo"""
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self.epoch_record = SharedRecord(f"{self.path}.epoch", EPOCH)
+        self.log = PaymentLog(f"{self.path}.{self.slot}.log", self.fsync_interval)
+        self._check_epoch()
+        await self.log.start()
+
+    async def stop(self) -> None:
+        if self.log is not None:
+            await self.log.stop()
+            self.log.close()
+            self.log = None
+        if self.epoch_record is not None:
+            self.epoch_record.close()
+            self.epoch_record = None
+
+    def _check_epoch(self) -> None:
+        """Purge feito por outro processo: zera o próprio log"""
+        epoch = self.epoch_record.read()[0]
+        if epoch != self.log.epoch:
+            self.log.reset(epoch)
+
+    def _paths(self) -> List[str]:
+        return sorted(glob.glob(f"{glob.escape(self.path)}.*.log"))
+
+    async def insert(self, payments: List[PaymentRecord]) -> List[int]:
+        """Um registro INSERT por pagamento; aguarda o fsync em grupo se configurado"""
+        log = self.log
+        self._check_epoch()
+
+        ids = []
+        for payment in payments:
+            payment_id = self.slot << SEQ_BITS | log.allocate()
+            log.append(
+                INSERT,
+                STATUSES.index(PaymentStatus.PENDING),
+                -1,
+                _text(payment.currency, 3),
+                payment.attempts,
+                payment_id,
+                payment.cents,
+                0.0,
+                payment.created_us,
+                b"",
+                b"",
+            )
+            ids.append(payment_id)
+
+        if self.sync_commit:
+            await log.sync()
+        return ids
+
+    async def update_status(
+        self,
+        rows: List[Dict[str, Any]],
+        completed: Optional[Dict[int, Completed]] = None,
+    ) -> None:
+        """Um registro UPDATE por linha (o fsync em grupo grava depois)"""
+        log = self.log
+        self._check_epoch()
+
+        for row in rows:
+            processor_id = row.get("processor_id")
+            updated_at = row.get("updated_at")
+            log.append(
+                UPDATE,
+                STATUSES.index(row["status"]),
+                -1 if processor_id is None else processor_id,
+                b"",
+                row.get("attempts", 0),
+                row["id"],
+                0,
+                row.get("fee") or 0.0,
+                to_us(updated_at) if updated_at is not None else 0,
+                _text(row.get("external_id"), 40),
+                _text(row.get("error_message"), 48),
+            )
+
+    async def purge(self) -> int:
+        """Nova época: todos os logs (de todos os processos) passam a valer vazio"""
+        epoch = self.epoch_record.read()[0]
+        deleted_count = 0
+        for path in self._paths():
+            _, _, inserts, log_epoch = read_header(path)
+            if log_epoch == epoch:
+                deleted_count += inserts
+
+        epoch = self.epoch_record.update(lambda epoch: (epoch + 1,))[0]
+        self.log.reset(epoch)
+        return deleted_count
+
+    async def completed(self) -> AsyncIterator[Completed]:
+        """Replay dos logs da época atual: INSERTs de todos antes dos UPDATEs"""
+        epoch = self.epoch_record.read()[0]
+        logs = []
+        for path in self._paths():
+            header, records = read_log(path)
+            if header[3] == epoch:
+                logs.append(list(records))
+
+        created: Dict[int, Tuple[int, int]] = {}
+        for records in logs:
+            for kind, _, _, _, _, payment_id, cents, _, timestamp_us, _, _ in records:
+                if kind == INSERT:
+                    created[payment_id] = (cents, timestamp_us)
+
+        completed = STATUSES.index(PaymentStatus.COMPLETED)
+        for records in logs:
+            for kind, status, processor_id, _, _, payment_id, *_ in records:
+                if kind != UPDATE or status != completed:
+                    continue
+                # pop: um pagamento só conta uma vez, mesmo com UPDATE repetido
+                payment = created.pop(payment_id, None)
+                if payment is not None:
+                    cents, created_us = payment
+                    yield processor_id, cents, created_us // 1000
+
+    async def warm_up(self, connections: int) -> int:
+        """Nada a preparar: o log já está mapeado desde o start"""
+        return 0
+
+
+# Implementações intercambiáveis (mesmos métodos), escolhidas por database_url
+PaymentRepository = Union[SqlPaymentRepository, LogPaymentRepository]
+
+
+def create_repository(url: Optional[str] = None) -> PaymentRepository:
+    """Instancia o armazenamento conforme o esquema de database_url"""
+    url = url or settings.database_url
+    if not is_embedded(url):
+        return SqlPaymentRepository()
+
+    if settings.queue_backend == "postgres":
+        raise ValueError("queue_backend=postgres requires a PostgreSQL database_url")
+    if settings.summary_backend == "rollup":
+        raise ValueError("summary_backend=rollup requires a PostgreSQL database_url")
+    return LogPaymentRepository(embedded_path(url))
+
+
+async def get_repository(request: Request) -> PaymentRepository:
+    """Obtém o repositório de pagamentos do estado da aplicação"""
+    return request.app.state.repository
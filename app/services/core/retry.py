@@ -0,0 +1,95 @@
+import asyncio
+import heapq
+import itertools
+import random
+from typing import Any, Callable, List, Optional, Tuple
+
+from app.core.clock import Clock, system_clock
+from app.core.config import settings
+from app.core.metrics import registry
+
+
+RETRY_DELAY_SECONDS = registry.histogram(
+    "retry_delay_seconds", "Atraso agendado para retentativas (backoff)"
+)
+
+
+class RetryScheduler:
+    """Fila de timers (heap) para retentativas com backoff exponencial e jitter
+
+    Os workers apenas agendam o item e seguem em frente; uma única task
+    dorme até o próximo vencimento e entrega os itens vencidos ao callback.
+    """
+
+    def __init__(
+        self,
+        callback: Callable[[Any], None],
+        base_delay: Optional[float] = None,
+        max_delay: Optional[float] = None,
+        clock: Optional[Clock] = None,
+    ):
+        self.callback = callback
+        self.clock = clock or system_clock
+        self.base_delay = (
+            settings.retry_base_delay_ms / 1000 if base_delay is None else base_delay
+        )
+        self.max_delay = (
+            settings.retry_max_delay_ms / 1000 if max_delay is None else max_delay
+        )
+        self.heap: List[Tuple[float, int, Any]] = []
+        self.running = False
+
+        self._sequence = itertools.count()
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    def __len__(self) -> int:
+        return len(self.heap)
+
+    def backoff(self, attempts: int) -> float:
+        """Backoff exponencial com "equal jitter": metade fixa, metade aleatória"""
+        ceiling = min(self.max_delay, self.base_delay * 2 ** max(attempts - 1, 0))
+        return ceiling / 2 + random.uniform(0, ceiling / 2)
+
+    def schedule(self, item: Any, delay: float) -> None:
+        """Agenda item para daqui a `delay` segundos"""
+        due = self.clock.monotonic() + delay
+        RETRY_DELAY_SECONDS.observe(delay)
+        heapq.heappush(self.heap, (due, next(self._sequence), item))
+
+        # Novo item vence antes do que a task está esperando
+        if self.heap[0][2] is item:
+            self._wakeup.set()
+
+    async def start(self) -> None:
+        """Inicia a task do timer"""
+        self.running = True
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Para a task do timer (itens pendentes ficam no heap)"""
+        self.running = False
+        self._wakeup.set()
+        if self._task:
+            await self._task
+
+    async def _run(self) -> None:
+        """Dorme até o próximo vencimento e reinjeta os itens vencidos"""
+        while self.running:
+            timeout = None
+            if self.heap:
+                timeout = max(self.heap[0][0] - self.clock.monotonic(), 0)
+
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+            now = self.clock.monotonic()
+            while self.heap and self.heap[0][0] <= now:
+                _, _, item = heapq.heappop(self.heap)
+                try:
+                    self.callback(item)
+                except Exception as e:
+                    print(f"Retry scheduler error: {e}")
@@ -0,0 +1,202 @@
+from typing import Dict, Iterable, NamedTuple, Optional, Sequence, Type
+
+from app.core.config import settings
+from app.core.shared import SharedCounters
+
+
+class ProcessorStats:
+    """Estatísticas observadas de um processador (EWMA)"""
+
+    __slots__ = ("latency", "success_rate", "in_flight", "samples")
+
+    def __init__(self, latency: float = 0.05):
+        self.latency = latency
+        self.success_rate = 1.0
+        self.in_flight = 0
+        self.samples = 0
+
+    def observe(self, latency: float, success: bool, alpha: float) -> None:
+        """Atualiza médias móveis exponenciais"""
+        self.samples += 1
+        self.success_rate += alpha * ((1.0 if success else 0.0) - self.success_rate)
+
+        # Falhas rápidas (ex.: conexão recusada) não dizem nada sobre latência
+        if success:
+            self.latency += alpha * (latency - self.latency)
+
+    def recover(self, weight: float) -> None:
+        """Aproxima a taxa de sucesso de 1 (sinal externo de que voltou)"""
+        self.success_rate += weight * (1.0 - self.success_rate)
+
+
+class Candidate(NamedTuple):
+    """Visão imutável de um processador no momento da decisão"""
+
+    processor_id: int
+    fee: float
+    priority: int
+    available: bool
+    saturated: bool
+    latency: float
+    success_rate: float
+    in_flight: int
+    limit: float
+    waiting: int
+
+
+class RoutingDecision(NamedTuple):
+    processor_id: int
+    hold: float = 0.0
+
+
+def least_loaded(candidates: Sequence[Candidate]) -> RoutingDecision:
+    """Fallback quando nada está disponível: menor carga"""
+    return RoutingDecision(min(candidates, key=lambda c: c.in_flight).processor_id)
+
+
+class PriorityStrategy:
+    """Prioridade estática e depois menor taxa (comportamento original)"""
+
+    name = "priority"
+
+    def choose(
+        self, candidates: Sequence[Candidate], allow_hold: bool = True
+    ) -> RoutingDecision:
+        usable = [c for c in candidates if c.available and not c.saturated]
+        if not usable:
+            return least_loaded(candidates)
+
+        best = min(usable, key=lambda c: (c.priority, c.fee))
+        return RoutingDecision(best.processor_id)
+
+
+class CostModelStrategy:
+    """Maior lucro esperado por unidade de tempo
+
+    score = taxa_de_sucesso * (1 - fee) / latência_esperada. Um processador
+    saturado pode ser escolhido com espera (`hold`) quando, mesmo somando a
+    espera estimada na fila de permits, o score dele supera o do melhor livre.
+    """
+
+    name = "cost"
+
+    def __init__(self, max_hold: Optional[float] = None):
+        self.max_hold = (
+            settings.routing_max_hold_ms / 1000 if max_hold is None else max_hold
+        )
+
+    @staticmethod
+    def score(candidate: Candidate, wait: float = 0.0) -> float:
+        return (
+            candidate.success_rate * (1.0 - candidate.fee) / (candidate.latency + wait)
+        )
+
+    @staticmethod
+    def expected_wait(candidate: Candidate) -> float:
+        """Tempo estimado até chegar a vez na fila de permits"""
+        return candidate.latency * (candidate.waiting + 1) / max(candidate.limit, 1)
+
+    def choose(
+        self, candidates: Sequence[Candidate], allow_hold: bool = True
+    ) -> RoutingDecision:
+        usable = [c for c in candidates if c.available and not c.saturated]
+        best = max(usable, key=self.score) if usable else None
+
+        if allow_hold:
+            for candidate in candidates:
+                if not (candidate.available and candidate.saturated):
+                    continue
+                wait = self.expected_wait(candidate)
+                if wait > self.max_hold:
+                    continue
+                if best is None or self.score(candidate, wait) > self.score(best):
+                    return RoutingDecision(candidate.processor_id, hold=wait)
+
+        if best is None:
+            return least_loaded(candidates)
+        return RoutingDecision(best.processor_id)
+
+
+STRATEGIES: Dict[str, Type] = {
+    PriorityStrategy.name: PriorityStrategy,
+    CostModelStrategy.name: CostModelStrategy,
+}
+
+
+def create_strategy(name: Optional[str] = None):
+    """Instancia a estratégia configurada em Settings"""
+    name = name or settings.routing_strategy
+    try:
+        return STRATEGIES[name]()
+    except KeyError:
+        raise ValueError(f"Unknown routing strategy: {name}")
+
+
+class RoutingEngine:
+    """Mantém estatísticas por processador e delega a escolha à estratégia
+
+    A taxa de sucesso só é medida nas chamadas roteadas: depois de uma
+    rajada de falhas o processador deixa de ser escolhido e a média não
+    sobe sozinha. Cada health check saudável a puxa de volta (`on_health`).
+    """
+
+    def __init__(
+        self,
+        processor_ids: Iterable[int],
+        strategy=None,
+        alpha: Optional[float] = None,
+        shared_path: str = "",
+        recovery: Optional[float] = None,
+    ):
+        processor_ids = tuple(processor_ids)
+        self.stats = {processor_id: ProcessorStats() for processor_id in processor_ids}
+        self.strategy = strategy or create_strategy()
+        self.alpha = settings.routing_ewma_alpha if alpha is None else alpha
+        self.recovery = (
+            settings.routing_health_recovery if recovery is None else recovery
+        )
+
+        # Multi-processo: chamadas em andamento somadas entre os processos
+        self.columns = {processor_id: i for i, processor_id in enumerate(processor_ids)}
+        self.shared = None
+        if shared_path:
+            self.shared = SharedCounters(
+                shared_path, settings.workers, len(processor_ids), settings.worker_slot
+            )
+            self.shared.clear_slot()
+
+    def begin(self, processor_id: int) -> None:
+        """Marca início de uma chamada"""
+        self.stats[processor_id].in_flight += 1
+        if self.shared:
+            self.shared.add(self.columns[processor_id], 1)
+
+    def end(self, processor_id: int, latency: float, success: bool) -> None:
+        """Marca fim de uma chamada e atualiza as médias"""
+        stats = self.stats[processor_id]
+        stats.in_flight -= 1
+        stats.observe(latency, success, self.alpha)
+        if self.shared:
+            self.shared.add(self.columns[processor_id], -1)
+
+    def discard(self, processor_id: int) -> None:
+        """Marca fim de uma chamada que não aconteceu (sem alimentar as médias)"""
+        self.stats[processor_id].in_flight -= 1
+        if self.shared:
+            self.shared.add(self.columns[processor_id], -1)
+
+    def on_health(self, processor_id: int, failing: bool) -> None:
+        """Health check novo: se saudável, recupera parte da taxa de sucesso"""
+        if not failing:
+            self.stats[processor_id].recover(self.recovery)
+
+    def in_flight(self, processor_id: int) -> int:
+        """Chamadas em andamento (de todos os processos, se compartilhado)"""
+        if self.shared:
+            return self.shared.total(self.columns[processor_id])
+        return self.stats[processor_id].in_flight
+
+    def choose(
+        self, candidates: Sequence[Candidate], allow_hold: bool = True
+    ) -> RoutingDecision:
+        return self.strategy.choose(candidates, allow_hold)
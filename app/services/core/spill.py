@@ -0,0 +1,279 @@
+import asyncio
+import itertools
+import mmap
+import os
+import struct
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from app.core.clock import Clock, system_clock
+from app.core.config import settings
+from app.core.metrics import registry
+from app.models.record import PaymentRecord
+
+
+SPILLED = registry.counter(
+    "queue_spilled_total", "Pagamentos transbordados da fila em memória para o disco"
+)
+
+# payment_id, centavos, created_at (epoch µs), tentativas, prioridade, moeda,
+# processador fixado + 1 (0 = nenhum; ocupa um byte do antigo padding)
+RECORD = struct.Struct("<qqqHB3sBx")
+
+# read_index, write_index (em registros)
+HEADER = struct.Struct("<qq")
+
+INITIAL_RECORDS = 4096
+
+
+class SpillLog:
+    """Segmento append-only de registros de tamanho fixo (mmap)
+
+    Escreve no fim e consome do início; os índices ficam no cabeçalho do
+    próprio arquivo, então o que não foi consumido sobrevive a um restart.
+    Quando o consumo alcança a escrita, o arquivo volta ao tamanho inicial.
+    """
+
+    def __init__(self, path: str, record: struct.Struct = RECORD):
+        self.path = path
+        self.record = record
+        self.fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+
+        size = os.fstat(self.fd).st_size
+        if size < HEADER.size:
+            size = self._file_size(INITIAL_RECORDS)
+            os.ftruncate(self.fd, size)
+        self.buffer = mmap.mmap(self.fd, size)
+        self.read_index, self.write_index = HEADER.unpack_from(self.buffer, 0)
+
+    def __len__(self) -> int:
+        return self.write_index - self.read_index
+
+    def _file_size(self, records: int) -> int:
+        return HEADER.size + records * self.record.size
+
+    def _remap(self, records: int) -> None:
+        """Redimensiona o arquivo e o mapeamento"""
+        self.buffer.close()
+        size = self._file_size(records)
+        os.ftruncate(self.fd, size)
+        self.buffer = mmap.mmap(self.fd, size)
+
+    def _offset(self, index: int) -> int:
+        return HEADER.size + index * self.record.size
+
+    def append(self, *values: Any) -> None:
+        """Grava registro no fim (o índice só avança depois do registro inteiro)"""
+        if self._offset(self.write_index + 1) > len(self.buffer):
+            self._remap(2 * (self.write_index + 1))
+
+        self.record.pack_into(self.buffer, self._offset(self.write_index), *values)
+        self.write_index += 1
+        HEADER.pack_into(self.buffer, 0, self.read_index, self.write_index)
+
+    def prepend(self, rows: List[Tuple[Any, ...]]) -> None:
+        """Grava registros antes do mais antigo (mantém a ordem de chegada)
+
+        Usa o espaço já consumido no início do arquivo quando cabe; senão
+        desloca os registros existentes para abrir espaço.
+        """
+        count = len(rows)
+        if not count:
+            return
+
+        if self.read_index >= count:
+            start = self.read_index - count
+        else:
+            pending = len(self)
+            if self._offset(pending + count) > len(self.buffer):
+                self._remap(2 * (pending + count))
+            self.buffer.move(
+                self._offset(count),
+                self._offset(self.read_index),
+                pending * self.record.size,
+            )
+            start = 0
+            self.write_index = pending + count
+
+        for i, values in enumerate(rows):
+            self.record.pack_into(self.buffer, self._offset(start + i), *values)
+        self.read_index = start
+        HEADER.pack_into(self.buffer, 0, self.read_index, self.write_index)
+
+    def pop(self) -> Tuple[Any, ...]:
+        """Consome o registro mais antigo"""
+        if not len(self):
+            raise IndexError("pop from empty spill log")
+
+        values = self.record.unpack_from(self.buffer, self._offset(self.read_index))
+        self.read_index += 1
+
+        if self.read_index == self.write_index:
+            # Esvaziou: recomeça do início e devolve o espaço em disco
+            self.read_index = self.write_index = 0
+            if len(self.buffer) > self._file_size(INITIAL_RECORDS):
+                self._remap(INITIAL_RECORDS)
+
+        HEADER.pack_into(self.buffer, 0, self.read_index, self.write_index)
+        return values
+
+    def clear(self) -> None:
+        """Descarta todos os registros"""
+        self.read_index = self.write_index = 0
+        if len(self.buffer) > self._file_size(INITIAL_RECORDS):
+            self._remap(INITIAL_RECORDS)
+        HEADER.pack_into(self.buffer, 0, 0, 0)
+
+    def flush(self) -> None:
+        """Força a gravação das páginas sujas no disco"""
+        self.buffer.flush()
+
+    def close(self) -> None:
+        self.flush()
+        self.buffer.close()
+        os.close(self.fd)
+
+
+def encode_task(priority: int, task: PaymentRecord) -> Tuple[Any, ...]:
+    """Registro da fila -> valores do registro em disco"""
+    return (
+        task.id,
+        task.cents,
+        task.created_us,
+        task.attempts,
+        priority,
+        task.currency.encode(),
+        0 if task.pinned is None else task.pinned + 1,
+    )
+
+
+def decode_task(values: Tuple[Any, ...]) -> Tuple[int, PaymentRecord]:
+    """Valores do registro em disco -> (prioridade, registro da fila)"""
+    payment_id, cents, created_us, attempts, priority, currency, pinned = values
+    task = PaymentRecord(
+        cents,
+        currency.rstrip(b"\0").decode(),
+        created_us,
+        id=payment_id,
+        attempts=attempts,
+        pinned=pinned - 1 if pinned else None,
+    )
+    return priority, task
+
+
+class SpillQueue:
+    """Fila de prioridade limitada em memória com transbordo para disco
+
+    Até `capacity` tasks ficam na PriorityQueue em memória; além disso (ou
+    enquanto ainda houver algo no disco, para manter a ordem de chegada) as
+    tasks vão para o SpillLog e voltam sequencialmente conforme abre espaço.
+    """
+
+    def __init__(
+        self,
+        capacity: Optional[int] = None,
+        path: Optional[str] = None,
+        clock: Optional[Clock] = None,
+    ):
+        self.capacity = max(1, capacity or settings.queue_capacity)
+        self.path = path
+        # Mesmo relógio de quem marca `enqueued_at` (o QueueManager)
+        self.clock = clock or system_clock
+        self.memory = asyncio.PriorityQueue()
+        self.log: Optional[SpillLog] = None
+        self._sequence = itertools.count()
+        # Tasks em memória na ordem de saída de cada prioridade (a sequência
+        # cresce, então é FIFO): a cabeça da fila é a primeira não vazia
+        self._heads: Dict[int, Deque[PaymentRecord]] = {}
+
+    def open(self) -> None:
+        """Abre o segmento em disco e carrega o backlog de uma execução anterior"""
+        if self.path and self.log is None:
+            self.log = SpillLog(self.path)
+            self._refill()
+
+    def qsize(self) -> int:
+        return self.memory.qsize() + (len(self.log) if self.log else 0)
+
+    def empty(self) -> bool:
+        return self.qsize() == 0
+
+    @property
+    def spilled(self) -> int:
+        return len(self.log) if self.log else 0
+
+    def head_age(self) -> float:
+        """Há quanto tempo a próxima task espera (o disco só tem as mais novas)"""
+        for priority in sorted(self._heads):
+            tasks = self._heads[priority]
+            if tasks:
+                return self.clock.perf_counter() - tasks[0].enqueued_at
+        return 0.0
+
+    def put(self, priority: int, task: PaymentRecord) -> None:
+        """Enfileira em memória ou, se cheia, no segmento em disco"""
+        if self.log is not None and (
+            len(self.log) or self.memory.qsize() >= self.capacity
+        ):
+            self.log.append(*encode_task(priority, task))
+            SPILLED.inc()
+            return
+        self._put_memory(priority, task)
+
+    async def get(self) -> PaymentRecord:
+        """Próxima task (repõe a memória a partir do disco)"""
+        priority, _, task = await self.memory.get()
+        self._heads[priority].popleft()
+        self._refill()
+        return task
+
+    def task_done(self) -> None:
+        self.memory.task_done()
+
+    def clear(self) -> int:
+        """Descarta tudo (memória e disco); retorna quantas tasks havia"""
+        cleared = self.qsize()
+        while not self.memory.empty():
+            self.memory.get_nowait()
+            self.memory.task_done()
+        self._heads.clear()
+        if self.log is not None:
+            self.log.clear()
+        return cleared
+
+    def _put_memory(self, priority: int, task: PaymentRecord) -> None:
+        self.memory.put_nowait((priority, next(self._sequence), task))
+        self._heads.setdefault(priority, deque()).append(task)
+
+    def _refill(self) -> None:
+        """Traz registros do disco enquanto houver espaço em memória"""
+        if self.log is None:
+            return
+        while len(self.log) and self.memory.qsize() < self.capacity:
+            priority, task = decode_task(self.log.pop())
+            # O tempo em disco não entra no queue wait (o relógio não persiste)
+            task.enqueued_at = self.clock.perf_counter()
+            self._put_memory(priority, task)
+
+    def persist(self) -> int:
+        """Move o que está em memória para o disco (shutdown); retorna quantas
+
+        As tasks em memória são mais antigas que as do disco, então entram
+        antes delas no segmento: no restart a ordem de chegada se mantém.
+        """
+        if self.log is None:
+            return 0
+
+        rows = []
+        while not self.memory.empty():
+            priority, _, task = self.memory.get_nowait()
+            rows.append(encode_task(priority, task))
+        self._heads.clear()
+        self.log.prepend(rows)
+        self.log.flush()
+        return len(rows)
+
+    def close(self) -> None:
+        if self.log is not None:
+            self.log.close()
+            self.log = None
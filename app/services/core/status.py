@@ -0,0 +1,113 @@
+import asyncio
+import time
+from typing import Any, Dict, Optional, Tuple
+
+from app.core.config import settings
+from app.core.metrics import registry, SIZE_BUCKETS
+
+from .repository import PaymentRepository
+
+
+STATUS_FLUSH_SECONDS = registry.histogram(
+    "status_flush_seconds", "Latência do UPDATE de status em lote"
+)
+STATUS_FLUSH_ROWS = registry.histogram(
+    "status_flush_rows", "Linhas por UPDATE de status em lote", buckets=SIZE_BUCKETS
+)
+STATUS_FAILED_FLUSHES = registry.counter(
+    "status_failed_flushes_total", "UPDATEs de status em lote que falharam"
+)
+
+
+class StatusWriter:
+    """Agrupa atualizações de status em UPDATEs em lote
+
+    Atualizações do mesmo pagamento são combinadas (vale a mais recente) e
+    gravadas periodicamente numa única escrita em lote no repositório. As
+    conclusões levam junto (processador, centavos, created_at em ms), que o
+    repositório usa para manter o rollup do summary na mesma transação.
+    """
+
+    def __init__(
+        self,
+        repository: PaymentRepository,
+        interval_ms: Optional[int] = None,
+        batch_size: Optional[int] = None,
+    ):
+        self.interval = (interval_ms or settings.status_flush_interval_ms) / 1000
+        self.batch_size = batch_size or settings.status_flush_batch_size
+        self.pending: Dict[int, Dict[str, Any]] = {}
+        self.completed: Dict[int, Tuple[int, int, int]] = {}
+        self.running = False
+        self.repository = repository
+
+        self._full = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    def update(self, payment_id: int, **values: Any) -> None:
+        """Registra atualização (combinada com as anteriores do mesmo id)"""
+        pending = self.pending.get(payment_id)
+        if pending is None:
+            self.pending[payment_id] = values
+            if len(self.pending) >= self.batch_size:
+                self._full.set()
+        else:
+            pending.update(values)
+
+    def complete(
+        self, payment_id: int, cents: int, created_ms: int, **values: Any
+    ) -> None:
+        """Registra a conclusão (status + contribuição para o rollup)"""
+        self.completed[payment_id] = (values["processor_id"], cents, created_ms)
+        self.update(payment_id, **values)
+
+    async def start(self) -> None:
+        """Inicia o flush periódico"""
+        self.running = True
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Para o flush periódico e grava o que restou"""
+        self.running = False
+        self._full.set()
+        if self._task:
+            await self._task
+        await self.flush()
+
+    async def _run(self) -> None:
+        """Grava a cada intervalo ou quando o lote enche"""
+        while self.running:
+            try:
+                await asyncio.wait_for(self._full.wait(), timeout=self.interval)
+            except asyncio.TimeoutError:
+                pass
+            self._full.clear()
+            await self.flush()
+
+    async def flush(self) -> None:
+        """Grava as atualizações pendentes"""
+        if not self.pending:
+            return
+
+        batch, self.pending = self.pending, {}
+        completed, self.completed = self.completed, {}
+        rows = [{"id": payment_id, **values} for payment_id, values in batch.items()]
+        start_time = time.perf_counter()
+
+        try:
+            await self.repository.update_status(rows, completed)
+
+            STATUS_FLUSH_SECONDS.observe(time.perf_counter() - start_time)
+            STATUS_FLUSH_ROWS.observe(len(rows))
+
+        except Exception as e:
+            print(f"Status flush error: {e}")
+            STATUS_FAILED_FLUSHES.inc()
+
+            # Devolve ao buffer sem sobrescrever atualizações mais novas
+            for payment_id, values in batch.items():
+                self.pending[payment_id] = {
+                    **values,
+                    **self.pending.get(payment_id, {}),
+                }
+            self.completed = {**completed, **self.completed}
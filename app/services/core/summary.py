@@ -0,0 +1,529 @@
+import mmap
+import os
+import struct
+from array import array
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from app.core.config import settings
+from app.core.shared import map_segment, SharedRecord
+
+
+INITIAL_BUCKETS = 4096
+
+# origin, capacity, geração do arquivo de dados, época (incrementada no purge)
+SLOT_META = struct.Struct("<qqqq")
+EPOCH = struct.Struct("<q")
+# processor_id, bucket, centavos de um pagamento fora da janela densa
+OUTLIER = struct.Struct("<qqq")
+
+
+class FenwickTree:
+    """Fenwick tree (BIT) de inteiros: update e soma de prefixo em O(log n)"""
+
+    __slots__ = ("tree",)
+
+    def __init__(self, values: Iterable[int]):
+        # Construção em O(n) a partir dos valores brutos
+        self.tree = array("q", [0])
+        self.tree.extend(values)
+        size = len(self.tree)
+
+        for i in range(1, size):
+            parent = i + (i & -i)
+            if parent < size:
+                self.tree[parent] += self.tree[i]
+
+    @classmethod
+    def over(cls, buffer) -> "FenwickTree":
+        """Árvore já construída sobre um buffer existente (ex.: memoryview de mmap)"""
+        tree = cls.__new__(cls)
+        tree.tree = buffer
+        return tree
+
+    def add(self, index: int, delta: int) -> None:
+        """Soma delta na posição index"""
+        i = index + 1
+        size = len(self.tree)
+        while i < size:
+            self.tree[i] += delta
+            i += i & -i
+
+    def prefix(self, index: int) -> int:
+        """Soma das posições [0, index]"""
+        total = 0
+        i = index + 1
+        while i > 0:
+            total += self.tree[i]
+            i -= i & -i
+        return total
+
+    def range_sum(self, lo: int, hi: int) -> int:
+        """Soma das posições [lo, hi]"""
+        return self.prefix(hi) - (self.prefix(lo - 1) if lo > 0 else 0)
+
+
+def to_epoch_ms(value: datetime) -> int:
+    """Converte datetime (naive = UTC) para epoch em milissegundos"""
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return int(value.timestamp() * 1000)
+
+
+def to_cents(amount: float) -> int:
+    """Converte valor monetário para centavos inteiros"""
+    return round(amount * 100)
+
+
+class SummaryIndex:
+    """Agregado incremental de pagamentos concluídos por processador e bucket de tempo
+
+    Os buckets ficam em arrays densos de no máximo `max_buckets` posições;
+    um timestamp que obrigaria a janela a passar disso (ex.: requestedAt
+    muito distante dos demais) vai para um mapa esparso por bucket, somado
+    linearmente na consulta, em vez de alocar arrays do tamanho do intervalo.
+    """
+
+    def __init__(
+        self,
+        processor_ids: Iterable[int] = (0, 1),
+        bucket_ms: Optional[int] = None,
+        max_buckets: Optional[int] = None,
+    ):
+        self.processor_ids = tuple(processor_ids)
+        self.bucket_ms = bucket_ms or settings.summary_bucket_ms
+        self.max_buckets = max_buckets or settings.summary_max_buckets
+        self.reset()
+
+    def reset(self) -> None:
+        """Zera o índice (usado no purge)"""
+        self.origin: Optional[int] = None
+        self.capacity = 0
+        self.counts: Dict[int, array] = {}
+        self.cents: Dict[int, array] = {}
+        self.count_trees: Dict[int, FenwickTree] = {}
+        self.cents_trees: Dict[int, FenwickTree] = {}
+        # processor_id -> bucket -> [count, cents] fora da janela densa
+        self.outliers: Dict[int, Dict[int, List[int]]] = {
+            processor_id: {} for processor_id in self.processor_ids
+        }
+
+    def purge(self) -> None:
+        """Zera os agregados (POST /purge-payments)"""
+        self.reset()
+
+    def record(self, processor_id: int, amount: float, created_at: datetime) -> None:
+        """Registra pagamento concluído"""
+        self.record_cents(processor_id, to_cents(amount), to_epoch_ms(created_at))
+
+    def record_cents(self, processor_id: int, cents: int, timestamp_ms: int) -> None:
+        """Registra pagamento concluído (valores já normalizados)"""
+        bucket = timestamp_ms // self.bucket_ms
+        index = self._ensure(bucket)
+        if index is None:
+            self._record_outlier(processor_id, bucket, cents)
+            return
+
+        self.counts[processor_id][index] += 1
+        self.cents[processor_id][index] += cents
+        self.count_trees[processor_id].add(index, 1)
+        self.cents_trees[processor_id].add(index, cents)
+
+    def summary(
+        self,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+    ) -> Dict[int, Tuple[int, int]]:
+        """Retorna {processor_id: (count, cents)} no intervalo [start, end]
+
+        A resolução é o bucket: `start` e `end` são arredondados para o
+        bucket que os contém, e os dois buckets das pontas entram inteiros
+        (com o padrão de 1 s, from/to valem como segundos cheios).
+        """
+        result = {processor_id: (0, 0) for processor_id in self.processor_ids}
+        if self.origin is None:
+            return result
+
+        lo_bucket = to_epoch_ms(start) // self.bucket_ms if start is not None else None
+        hi_bucket = to_epoch_ms(end) // self.bucket_ms if end is not None else None
+
+        lo = 0 if lo_bucket is None else max(0, lo_bucket - self.origin)
+        hi = (
+            self.capacity - 1
+            if hi_bucket is None
+            else min(self.capacity - 1, hi_bucket - self.origin)
+        )
+        for processor_id in self.processor_ids:
+            count, cents = _sum_outliers(
+                self.outliers[processor_id], lo_bucket, hi_bucket
+            )
+            if lo <= hi:
+                count += self.count_trees[processor_id].range_sum(lo, hi)
+                cents += self.cents_trees[processor_id].range_sum(lo, hi)
+            result[processor_id] = (count, cents)
+        return result
+
+    async def rebuild(self, repository) -> None:
+        """Reconstrói o índice a partir do repositório com uma única leitura"""
+        self.reset()
+
+        async for processor_id, cents, created_ms in repository.completed():
+            if processor_id in self.processor_ids:
+                self.record_cents(processor_id, cents, created_ms)
+
+    def _ensure(self, bucket: int) -> Optional[int]:
+        """Garante que o bucket cabe nos arrays, realocando se necessário
+
+        Retorna None se a janela densa teria de passar de `max_buckets`.
+        """
+        if self.origin is None:
+            initial = min(INITIAL_BUCKETS, self.max_buckets)
+            self._resize(bucket - initial // 2, initial)
+        elif bucket < self.origin:
+            if self.origin + self.capacity - bucket > self.max_buckets:
+                return None
+            grow = min(
+                max(self.capacity, self.origin - bucket),
+                self.max_buckets - self.capacity,
+            )
+            self._resize(self.origin - grow, self.capacity + grow)
+        elif bucket >= self.origin + self.capacity:
+            needed = bucket - self.origin + 1
+            if needed > self.max_buckets:
+                return None
+            self._resize(
+                self.origin, min(max(self.capacity * 2, needed), self.max_buckets)
+            )
+        return bucket - self.origin
+
+    def _record_outlier(self, processor_id: int, bucket: int, cents: int) -> None:
+        """Registra no mapa esparso um bucket fora da janela densa"""
+        totals = self.outliers[processor_id].setdefault(bucket, [0, 0])
+        totals[0] += 1
+        totals[1] += cents
+
+    def _resize(self, origin: int, capacity: int) -> None:
+        """Realoca arrays brutos e reconstrói as árvores em O(n)"""
+        offset = 0 if self.origin is None else self.origin - origin
+
+        for processor_id in self.processor_ids:
+            for column in (self.counts, self.cents):
+                values = array("q", bytes(8 * capacity))
+                old = column.get(processor_id)
+                if old is not None:
+                    values[offset : offset + len(old)] = old
+                column[processor_id] = values
+
+            self.count_trees[processor_id] = FenwickTree(self.counts[processor_id])
+            self.cents_trees[processor_id] = FenwickTree(self.cents[processor_id])
+
+        self.origin = origin
+        self.capacity = capacity
+
+
+class SharedSummaryIndex(SummaryIndex):
+    """SummaryIndex compartilhado entre os processos do servidor
+
+    Cada processo (slot) mantém as suas Fenwick trees num arquivo mmap próprio,
+    com um único escritor e seqlock; a consulta soma a faixa de todos os slots.
+    O purge incrementa uma época global: slots de épocas anteriores são
+    ignorados na leitura e zerados pelo dono antes da próxima escrita.
+    Buckets fora da janela densa vão para um arquivo append-only por slot
+    (um registro por pagamento), relido por inteiro na consulta.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        processor_ids: Iterable[int] = (0, 1),
+        bucket_ms: Optional[int] = None,
+        slot: Optional[int] = None,
+        slots: Optional[int] = None,
+        max_buckets: Optional[int] = None,
+    ):
+        self.directory = directory
+        self.slot = settings.worker_slot if slot is None else slot
+        self.slots = settings.workers if slots is None else slots
+        self.epoch_record = SharedRecord(
+            os.path.join(directory, "summary-epoch"), EPOCH
+        )
+        self.metas = [
+            SharedRecord(self._path(slot, "meta"), SLOT_META)
+            for slot in range(self.slots)
+        ]
+        self.epoch = self.epoch_record.read()[0]
+        self.generation = 0
+        self.view: Optional[memoryview] = None
+        self.mapped: Dict[int, Tuple[int, memoryview]] = {}
+
+        # Worker reiniciado: retoma o que o slot já tinha gravado
+        saved = self.metas[self.slot].read()
+        saved_outliers = _read_file(self._path(self.slot, "outliers"))
+        self.outlier_fd = os.open(
+            self._path(self.slot, "outliers"),
+            os.O_WRONLY | os.O_APPEND | os.O_CREAT,
+            0o600,
+        )
+        super().__init__(processor_ids, bucket_ms, max_buckets)
+        self.restored = self._restore(*saved, outliers=saved_outliers)
+
+    def _path(self, slot: int, suffix: str) -> str:
+        return os.path.join(self.directory, f"summary-{slot}.{suffix}")
+
+    def reset(self) -> None:
+        super().reset()
+        self.view = None
+        os.ftruncate(self.outlier_fd, 0)
+        self._publish_meta()
+
+    def purge(self) -> None:
+        """Zera os agregados de todos os processos (nova época)"""
+        self.epoch = self.epoch_record.update(lambda epoch: (epoch + 1,))[0]
+        self.reset()
+
+    def record_cents(self, processor_id: int, cents: int, timestamp_ms: int) -> None:
+        self._check_epoch()
+        bucket = timestamp_ms // self.bucket_ms
+        index = self._ensure(bucket)
+        if index is None:
+            self._record_outlier(processor_id, bucket, cents)
+            return
+
+        # Seqlock: leitores de outros processos repetem se pegarem a escrita no meio
+        self.view[0] += 1
+        self.counts[processor_id][index] += 1
+        self.cents[processor_id][index] += cents
+        self.count_trees[processor_id].add(index, 1)
+        self.cents_trees[processor_id].add(index, cents)
+        self.view[0] += 1
+
+    def summary(
+        self,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+    ) -> Dict[int, Tuple[int, int]]:
+        self._check_epoch()
+        result = super().summary(start, end)
+
+        lo = to_epoch_ms(start) // self.bucket_ms if start is not None else None
+        hi = to_epoch_ms(end) // self.bucket_ms if end is not None else None
+        for slot in range(self.slots):
+            if slot == self.slot:
+                continue
+            for totals in (
+                self._read_slot(slot, lo, hi),
+                self._read_outliers(slot, lo, hi),
+            ):
+                for processor_id, (count, cents) in totals.items():
+                    total_count, total_cents = result[processor_id]
+                    result[processor_id] = (total_count + count, total_cents + cents)
+        return result
+
+    async def rebuild(self, repository) -> None:
+        """Só o slot 0 carrega do banco, e apenas no primeiro start do servidor"""
+        if self.slot == 0 and not self.restored:
+            await super().rebuild(repository)
+
+    def _check_epoch(self) -> None:
+        """Purge feito por outro processo: zera o próprio slot"""
+        epoch = self.epoch_record.read()[0]
+        if epoch != self.epoch:
+            self.epoch = epoch
+            self.reset()
+
+    def _resize(self, origin: int, capacity: int) -> None:
+        super()._resize(origin, capacity)
+        self._publish()
+
+    def _record_outlier(self, processor_id: int, bucket: int, cents: int) -> None:
+        super()._record_outlier(processor_id, bucket, cents)
+        os.write(self.outlier_fd, OUTLIER.pack(processor_id, bucket, cents))
+
+    def _publish(self) -> None:
+        """Copia as árvores para um novo arquivo de dados e troca a geração"""
+        generation = self.generation + 1
+        width = self.capacity + 1
+        buffer, fd = map_segment(
+            self._path(self.slot, str(generation)),
+            8 * (1 + 2 * width * len(self.processor_ids)),
+        )
+        os.close(fd)
+        view = memoryview(buffer).cast("q")
+
+        for i, processor_id in enumerate(self.processor_ids):
+            for j, trees in enumerate((self.count_trees, self.cents_trees)):
+                start = 1 + (2 * i + j) * width
+                part = view[start : start + width]
+                part[:] = trees[processor_id].tree
+                trees[processor_id] = FenwickTree.over(part)
+
+        previous = self.generation
+        self.view, self.generation = view, generation
+        self._publish_meta()
+
+        if previous:
+            try:
+                os.unlink(self._path(self.slot, str(previous)))
+            except FileNotFoundError:
+                pass
+
+    def _publish_meta(self) -> None:
+        self.metas[self.slot].write(
+            self.origin or 0, self.capacity, self.generation, self.epoch
+        )
+
+    def _restore(
+        self, origin: int, capacity: int, generation: int, epoch: int, outliers: bytes
+    ) -> bool:
+        """Reabre o arquivo de dados do slot (restart do worker)"""
+        if not generation:
+            return False
+
+        self.generation = generation
+        view = self._map(self.slot, generation, writable=True)
+        if view is None or not capacity or epoch != self.epoch:
+            self._publish_meta()
+            return True
+
+        width = capacity + 1
+        for i, processor_id in enumerate(self.processor_ids):
+            for j, (trees, column) in enumerate(
+                ((self.count_trees, self.counts), (self.cents_trees, self.cents))
+            ):
+                start = 1 + (2 * i + j) * width
+                tree = FenwickTree.over(view[start : start + width])
+                trees[processor_id] = tree
+                column[processor_id] = array(
+                    "q", (tree.range_sum(k, k) for k in range(capacity))
+                )
+
+        self.origin, self.capacity, self.view = origin, capacity, view
+        self._publish_meta()
+
+        # O reset do __init__ truncou o arquivo de outliers: regrava
+        for processor_id, bucket, cents in _unpack_outliers(outliers):
+            if processor_id in self.outliers:
+                self._record_outlier(processor_id, bucket, cents)
+        return True
+
+    def _map(self, slot: int, generation: int, writable: bool = False):
+        """Mapeia (com cache) o arquivo de dados de um slot"""
+        cached = self.mapped.get(slot)
+        if cached is not None and cached[0] == generation:
+            return cached[1]
+
+        try:
+            fd = os.open(self._path(slot, str(generation)), os.O_RDWR)
+        except FileNotFoundError:
+            return None
+        try:
+            access = mmap.ACCESS_WRITE if writable else mmap.ACCESS_READ
+            view = memoryview(mmap.mmap(fd, 0, access=access)).cast("q")
+        finally:
+            os.close(fd)
+
+        self.mapped[slot] = (generation, view)
+        return view
+
+    def _read_slot(
+        self, slot: int, lo_bucket: Optional[int], hi_bucket: Optional[int]
+    ) -> Dict[int, Tuple[int, int]]:
+        """Soma a faixa no slot de outro processo (repete se houver escrita)"""
+        for _ in range(1000):
+            origin, capacity, generation, epoch = self.metas[slot].read()
+            if not capacity or epoch != self.epoch:
+                return {}
+
+            view = self._map(slot, generation)
+            if view is None:
+                # Arquivo trocado por um resize: relê o meta
+                continue
+
+            lo = 0 if lo_bucket is None else max(0, lo_bucket - origin)
+            hi = (
+                capacity - 1
+                if hi_bucket is None
+                else min(capacity - 1, hi_bucket - origin)
+            )
+            if lo > hi:
+                return {}
+
+            before = view[0]
+            if before & 1:
+                continue
+
+            width = capacity + 1
+            totals = {}
+            for i, processor_id in enumerate(self.processor_ids):
+                count_start = 1 + 2 * i * width
+                cents_start = count_start + width
+                totals[processor_id] = (
+                    FenwickTree.over(view[count_start : count_start + width]).range_sum(
+                        lo, hi
+                    ),
+                    FenwickTree.over(view[cents_start : cents_start + width]).range_sum(
+                        lo, hi
+                    ),
+                )
+
+            if view[0] == before and self.metas[slot].read()[2] == generation:
+                return totals
+        return {}
+
+    def _read_outliers(
+        self, slot: int, lo_bucket: Optional[int], hi_bucket: Optional[int]
+    ) -> Dict[int, Tuple[int, int]]:
+        """Soma os buckets esparsos de outro processo na faixa"""
+        if self.metas[slot].read()[3] != self.epoch:
+            return {}
+
+        outliers: Dict[int, Dict[int, List[int]]] = {}
+        for processor_id, bucket, cents in _unpack_outliers(
+            _read_file(self._path(slot, "outliers"))
+        ):
+            totals = outliers.setdefault(processor_id, {}).setdefault(bucket, [0, 0])
+            totals[0] += 1
+            totals[1] += cents
+
+        # Purge no meio da leitura: o arquivo pode ser de outra época
+        if self.metas[slot].read()[3] != self.epoch:
+            return {}
+        return {
+            processor_id: _sum_outliers(buckets, lo_bucket, hi_bucket)
+            for processor_id, buckets in outliers.items()
+            if processor_id in self.outliers
+        }
+
+
+def _sum_outliers(
+    outliers: Dict[int, List[int]], lo_bucket: Optional[int], hi_bucket: Optional[int]
+) -> Tuple[int, int]:
+    """Soma (count, cents) dos buckets esparsos dentro de [lo_bucket, hi_bucket]"""
+    count = cents = 0
+    for bucket, (bucket_count, bucket_cents) in outliers.items():
+        if (lo_bucket is None or bucket >= lo_bucket) and (
+            hi_bucket is None or bucket <= hi_bucket
+        ):
+            count += bucket_count
+            cents += bucket_cents
+    return count, cents
+
+
+def _read_file(path: str) -> bytes:
+    try:
+        with open(path, "rb") as file:
+            return file.read()
+    except FileNotFoundError:
+        return b""
+
+
+def _unpack_outliers(data: bytes):
+    """Registros completos do arquivo de outliers (ignora um append pela metade)"""
+    return OUTLIER.iter_unpack(data[: len(data) - len(data) % OUTLIER.size])
+
+
+def create_summary_index(processor_ids: Iterable[int]) -> SummaryIndex:
+    """Índice local ou compartilhado, conforme o modo de execução"""
+    if settings.shared_state_dir:
+        return SharedSummaryIndex(settings.shared_state_dir, processor_ids)
+    return SummaryIndex(processor_ids)
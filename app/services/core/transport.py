@@ -0,0 +1,282 @@
+import asyncio
+from collections import deque
+from typing import Deque, Dict, Optional, Tuple
+from urllib.parse import urlsplit
+
+import httpx
+
+from app.core.config import settings
+
+
+Connection = Tuple[asyncio.StreamReader, asyncio.StreamWriter]
+
+
+class TransportError(Exception):
+    """Resposta de erro (4xx/5xx) ou falha de protocolo do processador"""
+
+    def __init__(self, message: str, status: Optional[int] = None):
+        super().__init__(message)
+        self.status = status
+
+
+class RequestNotSent(ConnectionError):
+    """Conexão já fechada antes de escrever a requisição: seguro repetir"""
+
+
+# Respostas que nunca têm corpo (RFC 9112, 6.3)
+BODYLESS = (204, 304)
+
+
+class HttpxTransport:
+    """Implementação de referência sobre httpx.AsyncClient"""
+
+    name = "httpx"
+
+    def __init__(self, client: httpx.AsyncClient):
+        self.client = client
+
+    async def post_json(self, url: str, body: bytes) -> Tuple[int, bytes]:
+        response = await self.client.post(
+            url, content=body, headers={"content-type": "application/json"}
+        )
+        return response.status_code, response.content
+
+    async def get(self, url: str) -> Tuple[int, bytes]:
+        response = await self.client.get(url)
+        return response.status_code, response.content
+
+    async def warm(self, url: str, connections: int) -> int:
+        """GETs simultâneos: cada um abre (e devolve ao pool) uma conexão"""
+        results = await asyncio.gather(
+            *(self.client.get(url) for _ in range(connections)),
+            return_exceptions=True,
+        )
+        return sum(not isinstance(result, Exception) for result in results)
+
+    async def close(self) -> None:
+        """O client é compartilhado com o health check e fechado por quem o criou"""
+
+
+class HostPool:
+    """Conexões keep-alive para um host (LIFO: a mais recente está mais quente)"""
+
+    def __init__(self, host: str, port: int, size: int):
+        self.host = host
+        self.port = port
+        self.idle: Deque[Connection] = deque()
+        self.slots = asyncio.Semaphore(size)
+
+    async def acquire(self) -> Tuple[Connection, bool]:
+        """Retorna (conexão, reutilizada?)"""
+        await self.slots.acquire()
+        while self.idle:
+            reader, writer = self.idle.pop()
+            if not writer.is_closing() and not reader.at_eof():
+                return (reader, writer), True
+            writer.close()
+
+        try:
+            return await self.connect(), False
+        except BaseException:
+            self.slots.release()
+            raise
+
+    async def connect(self) -> Connection:
+        return await asyncio.open_connection(self.host, self.port)
+
+    def release(self, connection: Connection, reusable: bool) -> None:
+        if reusable:
+            self.idle.append(connection)
+        else:
+            connection[1].close()
+        self.slots.release()
+
+    async def warm(self, connections: int) -> int:
+        """Abre conexões antecipadamente (ex.: no startup)"""
+        opened = 0
+        while len(self.idle) < connections:
+            try:
+                self.idle.append(await self.connect())
+            except OSError:
+                break
+            opened += 1
+        return opened
+
+    def close(self) -> None:
+        while self.idle:
+            self.idle.pop()[1].close()
+
+
+class StreamTransport:
+    """Cliente HTTP/1.1 mínimo sobre asyncio streams
+
+    Um pool de conexões keep-alive por host e templates de requisição
+    pré-renderizados por URL: por chamada só entram o Content-Length e o
+    corpo. Da resposta são lidos apenas a status line e os headers de
+    framing (Content-Length, Transfer-Encoding, Connection).
+    """
+
+    name = "streams"
+
+    def __init__(
+        self, pool_size: Optional[int] = None, timeout: Optional[float] = None
+    ):
+        self.pool_size = pool_size or settings.processor_pool_size
+        self.timeout = timeout or settings.request_timeout
+        self.pools: Dict[Tuple[str, int], HostPool] = {}
+        self.templates: Dict[Tuple[str, str], Tuple[HostPool, bytes]] = {}
+
+    def _route(self, method: str, url: str) -> Tuple[HostPool, bytes]:
+        """Pool e início da requisição pré-renderizados para (método, url)"""
+        key = (method, url)
+        cached = self.templates.get(key)
+        if cached is not None:
+            return cached
+
+        parts = urlsplit(url)
+        host = parts.hostname or "localhost"
+        port = parts.port or 80
+        pool = self.pools.get((host, port))
+        if pool is None:
+            pool = self.pools[(host, port)] = HostPool(host, port, self.pool_size)
+
+        target = parts.path or "/"
+        if parts.query:
+            target += "?" + parts.query
+        head = f"{method} {target} HTTP/1.1\r\nHost: {parts.netloc}\r\n"
+        if method == "POST":
+            head += "Content-Type: application/json\r\nContent-Length: "
+        else:
+            head += "\r\n"
+
+        self.templates[key] = (pool, head.encode())
+        return self.templates[key]
+
+    async def post_json(self, url: str, body: bytes) -> Tuple[int, bytes]:
+        pool, head = self._route("POST", url)
+        return await self._request(
+            pool, b"%s%d\r\n\r\n%s" % (head, len(body), body), idempotent=False
+        )
+
+    async def get(self, url: str) -> Tuple[int, bytes]:
+        pool, head = self._route("GET", url)
+        return await self._request(pool, head, idempotent=True)
+
+    async def warm(self, url: str, connections: int) -> int:
+        pool, _ = self._route("GET", url)
+        return await pool.warm(connections)
+
+    async def _request(
+        self, pool: HostPool, request: bytes, idempotent: bool
+    ) -> Tuple[int, bytes]:
+        """Troca numa conexão do pool, repetindo só quando é seguro
+
+        Keep-alive fechado pelo servidor enquanto ocioso: se nada da
+        requisição foi escrito, tenta outra conexão. Depois de escrever,
+        só um GET é repetido (uma vez); o POST pode já ter sido aceito pelo
+        processador, então o erro sobe. `PaymentProcessor.process_payment`
+        confere a falha ambígua pelo GET do external_id (`hedge.confirm`) e,
+        se não esclarecer, a retentativa fica fixada no mesmo processador,
+        que deduplica pelo external_id.
+        """
+        retried = False
+        async with asyncio.timeout(self.timeout):
+            while True:
+                connection, reused = await pool.acquire()
+                try:
+                    status, body, keep_alive = await self._exchange(connection, request)
+                    break
+                except (ConnectionError, asyncio.IncompleteReadError) as e:
+                    pool.release(connection, reusable=False)
+                    if not reused:
+                        raise
+                    if isinstance(e, RequestNotSent):
+                        continue
+                    if not idempotent or retried:
+                        raise
+                    retried = True
+                except BaseException:
+                    # Timeout/cancelamento no meio da troca: conexão não reutilizável
+                    pool.release(connection, reusable=False)
+                    raise
+
+        pool.release(connection, reusable=keep_alive)
+        return status, body
+
+    async def _exchange(
+        self, connection: Connection, request: bytes
+    ) -> Tuple[int, bytes, bool]:
+        """Envia a requisição e lê status line, headers e corpo"""
+        reader, writer = connection
+        if writer.is_closing() or reader.at_eof() or reader.exception() is not None:
+            raise RequestNotSent("Connection closed before request was sent")
+        writer.write(request)
+        await writer.drain()
+
+        status_line = await reader.readline()
+        if not status_line:
+            raise ConnectionError("Connection closed before response")
+
+        # A reason phrase é opcional ("HTTP/1.1 204")
+        parts = status_line.split(None, 2)
+        if len(parts) < 2 or not parts[1].isdigit():
+            raise TransportError(f"Malformed status line: {status_line!r}")
+        version, status = parts[0], int(parts[1])
+        keep_alive = version == b"HTTP/1.1"
+        length = None
+        chunked = False
+
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n"):
+                break
+            if not line:
+                raise ConnectionError("Connection closed in headers")
+
+            name, _, value = line.partition(b":")
+            name = name.strip().lower()
+            if name == b"content-length":
+                length = int(value)
+            elif name == b"transfer-encoding":
+                chunked = b"chunked" in value.lower()
+            elif name == b"connection":
+                keep_alive = value.strip().lower() != b"close"
+
+        if status < 200 or status in BODYLESS:
+            body = b""
+        elif chunked:
+            body = await self._read_chunked(reader)
+        elif length is not None:
+            body = await reader.readexactly(length)
+        else:
+            body = await reader.read()
+            keep_alive = False
+
+        return status, body, keep_alive
+
+    @staticmethod
+    async def _read_chunked(reader: asyncio.StreamReader) -> bytes:
+        chunks = []
+        while True:
+            size = int((await reader.readline()).split(b";", 1)[0], 16)
+            if size == 0:
+                # Trailers (normalmente vazios) até a linha em branco
+                while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                    pass
+                return b"".join(chunks)
+            chunks.append(await reader.readexactly(size))
+            await reader.readexactly(2)
+
+    async def close(self) -> None:
+        for pool in self.pools.values():
+            pool.close()
+
+
+def create_transport(name: Optional[str], client: httpx.AsyncClient):
+    """Instancia o transporte configurado em Settings"""
+    name = name or settings.processor_transport
+    if name == HttpxTransport.name:
+        return HttpxTransport(client)
+    if name == StreamTransport.name:
+        return StreamTransport()
+    raise ValueError(f"Unknown processor transport: {name}")
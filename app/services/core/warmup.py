@@ -0,0 +1,123 @@
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from fastapi import Request
+
+from app.core.config import settings
+from app.core.metrics import registry
+
+from .queue import QueueManager
+
+
+WARMUP_SECONDS = registry.histogram(
+    "warmup_seconds", "Duração de cada etapa do warm-up", ("step",)
+)
+
+
+class WarmUp:
+    """Aquecimento no startup e estado de prontidão
+
+    Roda em background depois que o servidor já aceita conexões, então o
+    /ready responde 503 enquanto aquece. Antes de o app se declarar pronto:
+
+        database    abre `warmup_db_connections` conexões do pool em paralelo e
+                    prepara em cada uma os statements quentes do repositório,
+                    sem gravar nada (no engine local não há nada a preparar)
+        processors  abre conexões keep-alive com os dois processadores (falha
+                    se algum não aceitou nenhuma)
+        summary     lê o índice do payment-summary uma vez (páginas do mmap)
+                    ou prepara a consulta do rollup
+
+    Falhas de uma etapa são registradas no relatório mas não impedem o
+    startup: o trabalho só deixa de ser antecipado.
+    """
+
+    def __init__(self, queue_manager: QueueManager):
+        self.queue_manager = queue_manager
+        self.ready = False
+        self.report: Dict[str, Dict[str, Any]] = {}
+        self._task: Optional[asyncio.Task] = None
+
+        registry.gauge(
+            "ready", "Warm-up concluído e aceitando tráfego", lambda: int(self.ready)
+        )
+
+    def start(self) -> None:
+        """Dispara o warm-up em background (o startup não espera por ele)"""
+        self._task = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        """Cancela um warm-up ainda em andamento"""
+        self.mark_stopping()
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+
+    async def run(self) -> Dict[str, Dict[str, Any]]:
+        """Executa as etapas (limitadas por warmup_timeout) e marca pronto"""
+        if settings.warmup_enabled:
+            steps = (
+                ("database", self.warm_database),
+                ("processors", self.warm_processors),
+                ("summary", self.warm_summary),
+            )
+            for name, step in steps:
+                await self._step(name, step)
+
+        self.ready = True
+        return self.report
+
+    async def _step(self, name: str, step: Callable[[], Awaitable[Any]]) -> None:
+        start_time = time.perf_counter()
+        try:
+            result = await asyncio.wait_for(step(), timeout=settings.warmup_timeout)
+            entry = {"ok": True, "result": result}
+        except Exception as e:
+            print(f"Warm-up step {name} failed: {e!r}")
+            entry = {"ok": False, "error": repr(e)}
+
+        elapsed = time.perf_counter() - start_time
+        WARMUP_SECONDS.labels(name).observe(elapsed)
+        entry["seconds"] = round(elapsed, 4)
+        self.report[name] = entry
+
+    async def warm_database(self) -> int:
+        """Conexões abertas em paralelo, cada uma com os statements preparados"""
+        connections = settings.warmup_db_connections or max(
+            1, settings.pool_size // settings.workers
+        )
+        return await self.queue_manager.repository.warm_up(connections)
+
+    async def warm_processors(self) -> Dict[str, int]:
+        """Conexões keep-alive abertas por processador"""
+        processor = self.queue_manager.processor
+        connections = settings.warmup_processor_connections
+        opened = {}
+        for config in processor.processors.values():
+            # GET idempotente (404 para um id inexistente) no host do processador
+            opened[config["circuit_breaker"].name] = await processor.transport.warm(
+                f"{config['url']}/warmup", connections
+            )
+        # Nenhuma conexão com um processador: a etapa falhou (ok: false)
+        if connections and not all(opened.values()):
+            raise ConnectionError(f"No connection opened: {opened}")
+        return opened
+
+    async def warm_summary(self) -> int:
+        """Percorre o índice do summary (ou consulta o rollup) uma vez"""
+        repository = self.queue_manager.repository
+        if repository.rollup:
+            summary = await repository.summary(self.queue_manager.summary.processor_ids)
+        else:
+            summary = self.queue_manager.summary.summary(None, None)
+        return sum(count for count, _ in summary.values())
+
+    def mark_stopping(self) -> None:
+        """Shutdown: deixa de estar pronto antes de drenar"""
+        self.ready = False
+
+
+async def get_warmup(request: Request) -> WarmUp:
+    """Obtém o estado de warm-up/prontidão do estado da aplicação"""
+    return request.app.state.warmup
@@ -1,2 +1,171 @@
-class HealthCheckService():
-    pass
\ No newline at end of file
+import asyncio
+import struct
+from types import MappingProxyType
+from typing import Callable, Dict, List, Mapping, NamedTuple, Optional
+
+import httpx
+
+from app.core.clock import Clock, system_clock
+from app.core.config import settings
+from app.core.shared import LeaderLock, SharedRecord
+
+
+class HealthStatus(NamedTuple):
+    """Último estado conhecido de um processador (imutável)"""
+
+    failing: bool = False
+    min_response_time: int = 0
+    checked_at: float = 0.0
+
+    @property
+    def healthy(self) -> bool:
+        return not self.failing
+
+
+UNKNOWN = HealthStatus()
+
+# failing, minResponseTime (ms), checked_at (clock.monotonic)
+ENTRY_FORMAT = "?Id"
+
+
+class HealthCheckService:
+    """Poller em background do /health dos processadores
+
+    Apenas um processo (o líder do flock) consulta os processadores, no
+    máximo uma vez a cada `health_check_interval` segundos por processador.
+    O resultado é publicado num registro compartilhado (mmap) e cada processo
+    mantém uma cópia imutável em `snapshot`, lida pelo roteamento sem await.
+    """
+
+    def __init__(
+        self,
+        client: httpx.AsyncClient,
+        health_urls: Dict[int, str],
+        state_path: Optional[str] = None,
+        clock: Optional[Clock] = None,
+    ):
+        self.client = client
+        self.clock = clock or system_clock
+        self.health_urls = dict(health_urls)
+        self.processor_ids = tuple(sorted(self.health_urls))
+        self.interval = settings.health_check_interval
+        self.refresh_interval = settings.health_refresh_interval_ms / 1000
+
+        path = settings.health_state_path if state_path is None else state_path
+        self.record = SharedRecord(
+            path, struct.Struct("<" + ENTRY_FORMAT * len(self.processor_ids))
+        )
+        self.leader = LeaderLock(f"{path}.lock" if path else "")
+
+        self.snapshot: Mapping[int, HealthStatus] = MappingProxyType(
+            {processor_id: UNKNOWN for processor_id in self.processor_ids}
+        )
+        self.running = False
+        self._task: Optional[asyncio.Task] = None
+
+        # Chamados a cada resultado novo de health check (ex.: circuit breaker)
+        self.listeners: List[Callable[[int, HealthStatus], None]] = []
+
+    def get(self, processor_id: int) -> HealthStatus:
+        """Estado publicado do processador (sem I/O)"""
+        return self.snapshot.get(processor_id, UNKNOWN)
+
+    async def start(self) -> None:
+        """Inicia o poller"""
+        self.running = True
+        self._refresh()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Para o poller e libera a liderança"""
+        self.running = False
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+        self.leader.release()
+
+    async def _run(self) -> None:
+        """Loop: líder consulta quando vencido, todos atualizam o snapshot"""
+        while self.running:
+            try:
+                if self.leader.try_acquire():
+                    await self._poll_due()
+                self._refresh()
+            except Exception as e:
+                print(f"Health check error: {e}")
+
+            await asyncio.sleep(self.refresh_interval)
+
+    async def _poll_due(self) -> None:
+        """Consulta os processadores cujo último check expirou"""
+        current = self._read_shared()
+        now = self.clock.monotonic()
+
+        due = [
+            processor_id
+            for processor_id, status in current.items()
+            if not 0 <= now - status.checked_at < self.interval
+        ]
+        if not due:
+            return
+
+        results = await asyncio.gather(
+            *(self._check(processor_id, current[processor_id]) for processor_id in due)
+        )
+        current.update(zip(due, results))
+        self._write_shared(current)
+
+    async def _check(self, processor_id: int, previous: HealthStatus) -> HealthStatus:
+        """Chama /health e interpreta failing/minResponseTime"""
+        now = self.clock.monotonic()
+        try:
+            response = await self.client.get(
+                self.health_urls[processor_id], timeout=2.0
+            )
+            if response.status_code == 429:
+                # Estourou o limite: mantém o último estado conhecido
+                return previous._replace(checked_at=now)
+
+            response.raise_for_status()
+            data = response.json()
+            return HealthStatus(
+                failing=bool(data.get("failing", False)),
+                min_response_time=int(data.get("minResponseTime", 0)),
+                checked_at=now,
+            )
+        except Exception:
+            return HealthStatus(
+                failing=True,
+                min_response_time=previous.min_response_time,
+                checked_at=now,
+            )
+
+    def _read_shared(self) -> Dict[int, HealthStatus]:
+        """Lê o registro compartilhado"""
+        values = self.record.read()
+        width = len(ENTRY_FORMAT)
+        return {
+            processor_id: HealthStatus(*values[i * width : (i + 1) * width])
+            for i, processor_id in enumerate(self.processor_ids)
+        }
+
+    def _write_shared(self, statuses: Dict[int, HealthStatus]) -> None:
+        """Publica o estado no registro compartilhado"""
+        values = []
+        for processor_id in self.processor_ids:
+            values.extend(statuses[processor_id])
+        self.record.write(*values)
+
+    def _refresh(self) -> None:
+        """Troca o snapshot local por uma nova cópia imutável"""
+        previous = self.snapshot
+        self.snapshot = MappingProxyType(self._read_shared())
+
+        # Notifica só checks novos (o snapshot é relido a cada refresh)
+        for processor_id, status in self.snapshot.items():
+            if (
+                status.checked_at
+                and status.checked_at != previous[processor_id].checked_at
+            ):
+                for listener in self.listeners:
+                    listener(processor_id, status)
@@ -1,161 +1,346 @@
-import time
-from typing import Any, Dict
+from typing import Any, Callable, Dict, List, Optional
 
 import httpx
+import orjson
 
+from app.core.clock import Clock, system_clock
 from app.core.config import settings
-from app.models.payment import Payment
+from app.core.metrics import registry
+from app.core.shared import shared_path
+from app.services.core.circuit import CircuitBreaker, CircuitOpenError
+from app.services.core.hedge import HedgePolicy, ambiguous, confirm
+from app.services.core.limiter import AdaptiveLimiter
+from app.services.core.routing import Candidate, RoutingEngine
+from app.services.core.transport import TransportError, create_transport
+from app.services.health import HealthCheckService, HealthStatus
 
-from app.services.core.circuit import CircuitBreaker
+
+PROCESSOR_CALL_SECONDS = registry.histogram(
+    "processor_call_seconds",
+    "Latência da chamada ao processador",
+    ("processor", "outcome"),
+)
 
 
 class PaymentProcessor:
     """Intermediação para 2 processadores com resiliência"""
 
-    def __init__(self):
+    def __init__(self, clock: Optional[Clock] = None):
+        # Relógio injetável (o simulador usa um relógio virtual)
+        self.clock = clock or system_clock
         self.processors = {
             0: {
                 "url": f"{settings.payment_0_url}/payments",
                 "health_url": f"{settings.payment_0_url}/health",
                 "circuit_breaker": CircuitBreaker(
-                    failure_threshold=3, timeout_seconds=30, name="processor_1"
+                    name="processor_1",
+                    state_path=shared_path("circuit-processor_1"),
+                    clock=self.clock,
                 ),
                 "fee": 0.02,  # 2%
-                "max_concurrent": 15,
-                "current_load": 0,
+                "limiter": AdaptiveLimiter(initial_limit=15, name="processor_1"),
                 "priority": 1,
             },
             1: {
                 "url": f"{settings.payment_1_url}/payments",
                 "health_url": f"{settings.payment_1_url}/health",
                 "circuit_breaker": CircuitBreaker(
-                    failure_threshold=5, timeout_seconds=60, name="processor_2"
+                    name="processor_2",
+                    state_path=shared_path("circuit-processor_2"),
+                    clock=self.clock,
                 ),
                 "fee": 0.025,  # 2.5%
-                "max_concurrent": 20,
-                "current_load": 0,
+                "limiter": AdaptiveLimiter(initial_limit=20, name="processor_2"),
                 "priority": 2,
             },
         }
 
+        # Filhos dos histogramas resolvidos uma vez (sem lookup no hot path)
+        for config in self.processors.values():
+            name = config["circuit_breaker"].name
+            config["call_success"] = PROCESSOR_CALL_SECONDS.labels(name, "success")
+            config["call_failure"] = PROCESSOR_CALL_SECONDS.labels(name, "failure")
+
         self.client = httpx.AsyncClient(
             timeout=httpx.Timeout(settings.request_timeout),
             limits=httpx.Limits(max_connections=50, max_keepalive_connections=20),
         )
 
-        # Cache de health check (máximo 1 vez a cada 5 segundos)
-        self.health_cache = {}
-        self.last_health_check = {}
+        # Transporte das chamadas de pagamento (o health check segue no httpx)
+        self.transport = create_transport(settings.processor_transport, self.client)
 
-    async def get_optimal_processor(self) -> int:
-        """Seleciona o melhor processador disponível"""
-        current_time = time.time()
-        available_processors = []
+        # Health check em background (máximo 1 vez a cada 5 segundos)
+        self.health = HealthCheckService(
+            self.client,
+            {
+                processor_id: config["health_url"]
+                for processor_id, config in self.processors.items()
+            },
+            clock=self.clock,
+        )
 
-        for processor_id, config in self.processors.items():
-            # Verifica circuit breaker
-            if not config["circuit_breaker"].is_healthy:
-                continue
-
-            # Verifica carga atual
-            if config["current_load"] >= config["max_concurrent"]:
-                continue
-
-            # Health check limitado a 1 vez a cada 5 segundos
-            if (
-                processor_id not in self.last_health_check
-                or current_time - self.last_health_check[processor_id]
-                > settings.health_check_interval
-            ):
-                health_status = await self._check_health(processor_id)
-                self.health_cache[processor_id] = health_status
-                self.last_health_check[processor_id] = current_time
-
-            if self.health_cache.get(processor_id, {}).get("healthy", False):
-                available_processors.append(
-                    (processor_id, config["priority"], config["fee"])
-                )
+        # Resultado de cada health check alimenta o circuit breaker
+        self.health.listeners.append(self._on_health)
+
+        # Estatísticas (EWMA) e estratégia de roteamento
+        self.routing = RoutingEngine(
+            self.processors.keys(), shared_path=shared_path("in_flight")
+        )
+        self.max_hold = settings.routing_max_hold_ms / 1000
 
-        if not available_processors:
-            # Fallback para processador com menor carga
-            return min(
+        # Hedge opcional de chamadas lentas (consulta idempotente pelo external_id)
+        self.hedge = (
+            HedgePolicy(
                 self.processors.keys(),
-                key=lambda x: self.processors[x]["current_load"],
+                {
+                    pid: config["circuit_breaker"].name
+                    for pid, config in self.processors.items()
+                },
+                clock=self.clock,
             )
+            if settings.hedge_enabled
+            else None
+        )
+
+        # Gauges por processador lidos na coleta do /metrics
+        registry.gauge(
+            "processor_limit",
+            "Limite de concorrência adaptativo",
+            lambda: self._per_processor(
+                lambda pid: self.processors[pid]["limiter"].limit
+            ),
+            ("processor",),
+        )
+        registry.gauge(
+            "processor_waiting",
+            "Workers aguardando permit do processador",
+            lambda: self._per_processor(
+                lambda pid: self.processors[pid]["limiter"].waiting
+            ),
+            ("processor",),
+        )
+        registry.gauge(
+            "processor_in_flight",
+            "Chamadas em andamento por processador",
+            lambda: self._per_processor(self.routing.in_flight),
+            ("processor",),
+        )
+        registry.gauge(
+            "processor_healthy",
+            "Processador disponível (circuit breaker e health check)",
+            lambda: self._per_processor(lambda pid: int(self.is_available(pid))),
+            ("processor",),
+        )
+
+    def _per_processor(self, value: Callable[[int], float]) -> Dict[tuple, float]:
+        """Valor de gauge rotulado pelo nome de cada processador"""
+        return {
+            (config["circuit_breaker"].name,): value(processor_id)
+            for processor_id, config in self.processors.items()
+        }
+
+    def _on_health(self, processor_id: int, status: HealthStatus) -> None:
+        """Health check novo: circuito (abre ou sonda cedo) e taxa de sucesso"""
+        self.processors[processor_id]["circuit_breaker"].on_health(status.failing)
+        self.routing.on_health(processor_id, status.failing)
+
+    def is_available(self, processor_id: int) -> bool:
+        """Circuit breaker fechado e health check saudável"""
+        return (
+            self.processors[processor_id]["circuit_breaker"].is_healthy
+            and self.health.get(processor_id).healthy
+        )
+
+    async def start(self) -> None:
+        """Inicia o health check em background"""
+        await self.health.start()
+
+    def get_candidates(self) -> List[Candidate]:
+        """Monta a visão atual de cada processador para o roteamento"""
+        candidates = []
+
+        for processor_id, config in self.processors.items():
+            stats = self.routing.stats[processor_id]
+            limiter = config["limiter"]
+            # Snapshot publicado pelo health check (sem I/O no hot path)
+            health = self.health.get(processor_id)
+
+            candidates.append(
+                Candidate(
+                    processor_id=processor_id,
+                    fee=config["fee"],
+                    priority=config["priority"],
+                    available=self.is_available(processor_id),
+                    saturated=limiter.saturated,
+                    latency=max(stats.latency, health.min_response_time / 1000),
+                    success_rate=stats.success_rate,
+                    in_flight=self.routing.in_flight(processor_id),
+                    limit=limiter.limit,
+                    waiting=limiter.waiting,
+                )
+            )
+
+        return candidates
+
+    async def get_optimal_processor(self) -> int:
+        """Seleciona o melhor processador e aguarda um permit dele
 
-        # Prioriza menor taxa (processador mais barato)
-        available_processors.sort(key=lambda x: (x[1], x[2]))
-        return available_processors[0][0]
+        O chamador deve devolver o permit com `limiter.release(...)`.
+        """
+        decision = self.routing.choose(self.get_candidates())
+        limiter = self.processors[decision.processor_id]["limiter"]
 
-    async def process_payment(self, payment: Payment) -> Dict[str, Any]:
-        """Processa pagamento com processador selecionado"""
-        processor_id = await self.get_optimal_processor()
+        if decision.hold > 0:
+            # Vale mais esperar pelo processador escolhido do que usar outro
+            if await limiter.acquire(timeout=self.max_hold):
+                return decision.processor_id
+
+            decision = self.routing.choose(self.get_candidates(), allow_hold=False)
+            limiter = self.processors[decision.processor_id]["limiter"]
+
+        # Sem capacidade livre: entra na fila do processador (sem redirecionar)
+        await limiter.acquire()
+        return decision.processor_id
+
+    async def process_payment(
+        self,
+        payment_id: int,
+        amount: float,
+        currency: str = "BRL",
+        processor_id: Optional[int] = None,
+    ) -> Dict[str, Any]:
+        """Processa pagamento com processador selecionado
+
+        Com `processor_id` (retentativa de uma falha ambígua) não há
+        roteamento: só o mesmo processador deduplica pelo external_id, então
+        reenviar para o outro poderia cobrar duas vezes. Uma falha ambígua
+        que a consulta não esclareceu volta com `ambiguous`.
+        """
+        if processor_id is None:
+            processor_id = await self.get_optimal_processor()
+        else:
+            await self.processors[processor_id]["limiter"].acquire()
         processor_config = self.processors[processor_id]
 
         payment_data = {
-            "amount": payment.amount,
-            "currency": payment.currency,
-            "external_id": str(payment.id),
+            "amount": amount,
+            "currency": currency,
+            "external_id": str(payment_id),
         }
 
         # Incrementa contador de carga
-        processor_config["current_load"] += 1
+        self.routing.begin(processor_id)
+        start_time = self.clock.perf_counter()
+        success = False
+        rejected = False
 
         try:
-            response = await processor_config["circuit_breaker"].call(
-                self._make_payment_request,
-                processor_config["url"],
-                payment_data,
-            )
+            if self.hedge is None:
+                response = await processor_config["circuit_breaker"].call(
+                    self._confirmed_payment_request,
+                    processor_config["url"],
+                    payment_data,
+                )
+            else:
+                response = await processor_config["circuit_breaker"].call(
+                    self._hedged_payment_request,
+                    processor_id,
+                    processor_config["url"],
+                    payment_data,
+                )
+            success = True
 
             return {
                 "success": True,
                 "processor_id": processor_id,
                 "external_id": response.get("id"),
-                "fee": payment.amount * processor_config["fee"],
+                "fee": amount * processor_config["fee"],
             }
 
+        except CircuitOpenError as e:
+            # Recusado antes de chegar ao processador: não conta como tentativa
+            rejected = True
+            return {
+                "success": False,
+                "error": str(e),
+                "processor_id": processor_id,
+                "rejected": True,
+            }
         except Exception as e:
             return {
                 "success": False,
                 "error": str(e),
                 "processor_id": processor_id,
+                "ambiguous": ambiguous(e),
             }
         finally:
-            # Decrementa contador de carga
-            processor_config["current_load"] -= 1
+            # Decrementa contador de carga, devolve o permit e alimenta as médias
+            if rejected:
+                # Nenhuma amostra: o AIMD e a taxa de sucesso só veem chamadas reais
+                self.routing.discard(processor_id)
+                processor_config["limiter"].discard()
+            else:
+                latency = self.clock.perf_counter() - start_time
+                processor_config["call_success" if success else "call_failure"].observe(
+                    latency
+                )
+                self.routing.end(processor_id, latency, success)
+                processor_config["limiter"].release(latency, success)
 
     async def _make_payment_request(
         self, url: str, data: Dict[str, Any]
     ) -> Dict[str, Any]:
         """Faz requisição HTTP para o processador"""
-        response = await self.client.post(url, json=data)
-        response.raise_for_status()
-        return response.json()
+        status, body = await self.transport.post_json(url, orjson.dumps(data))
+        if status >= 400:
+            raise TransportError(f"HTTP {status} from {url}", status)
+        return orjson.loads(body) if body else {}
 
-    async def _check_health(self, processor_id: int) -> Dict[str, Any]:
-        """Verifica saúde do processador"""
-        try:
-            config = self.processors[processor_id]
-            response = await self.client.get(config["health_url"], timeout=2.0)
-            response.raise_for_status()
-            return {"healthy": True}
-        except Exception:
-            return {"healthy": False}
+    async def _confirmed_payment_request(
+        self, url: str, data: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """Requisição sem hedge: falha ambígua é conferida pela consulta"""
+        return await confirm(
+            self._make_payment_request(url, data),
+            lambda: self._find_payment(f"{url}/{data['external_id']}"),
+        )
+
+    async def _hedged_payment_request(
+        self, processor_id: int, url: str, data: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """Requisição com hedge: consulta o status se passar do atraso adaptativo"""
+        return await self.hedge.call(
+            processor_id,
+            self._make_payment_request(url, data),
+            lambda: self._find_payment(f"{url}/{data['external_id']}"),
+        )
+
+    async def _find_payment(self, url: str) -> Optional[Dict[str, Any]]:
+        """Consulta o pagamento pelo external_id (None se ainda não existe)"""
+        status, body = await self.transport.get(url)
+        if status == 404:
+            return None
+        if status >= 400:
+            raise TransportError(f"HTTP {status} from {url}", status)
+        return orjson.loads(body)
 
     def get_processor_stats(self) -> Dict[str, Any]:
         """Estatísticas para payment-summary"""
-        return {
-            0: {
-                "current_load": self.processors[0]["current_load"],
-                "healthy": self.health_cache.get(0, {}).get("healthy", False),
-            },
-            1: {
-                "current_load": self.processors[1]["current_load"],
-                "healthy": self.health_cache.get(1, {}).get("healthy", False),
-            },
-        }
+        stats = {}
+        for processor_id, config in self.processors.items():
+            health = self.health.get(processor_id)
+            routing = self.routing.stats[processor_id]
+            stats[processor_id] = {
+                **config["limiter"].snapshot(),
+                "latency": routing.latency,
+                "success_rate": routing.success_rate,
+                "healthy": health.healthy,
+                "min_response_time": health.min_response_time,
+            }
+        return stats
 
     async def close(self) -> None:
-        """Fecha cliente HTTP"""
+        """Para o health check e fecha cliente HTTP"""
+        await self.health.stop()
+        await self.transport.close()
         await self.client.aclose()
@@ -0,0 +1,248 @@
+"""Benchmark end-to-end: gerador de carga com taxa de chegada em rampa
+
+Dispara POST /payments em malha aberta (chegadas Poisson com taxa variando
+linearmente de --start-rate a --end-rate), espera o processamento assentar
+e compara o /payment-summary da aplicação com o resumo dos processadores.
+
+Uso (aplicação já rodando em :9999, emuladores locais em 3001/3002):
+
+    python -m bench.loadgen --spawn-processors --duration 30 \\
+        --start-rate 50 --end-rate 500
+
+Com --spawn-processors os dois emuladores de `processors` sobem no mesmo
+processo; a aplicação deve apontar PAYMENT_0_URL/PAYMENT_1_URL para eles.
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+import httpx
+
+from processors.emulator import EmulatorConfig, ProcessorEmulator
+
+
+def percentile(samples: List[float], q: float) -> float:
+    """Percentil por ordenação (samples em segundos)"""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class LoadGenerator:
+    """Gera carga em malha aberta e coleta latências de ingresso"""
+
+    def __init__(
+        self,
+        client: httpx.AsyncClient,
+        rng: random.Random,
+        max_inflight: int,
+    ):
+        self.client = client
+        self.rng = rng
+        self.slots = asyncio.Semaphore(max_inflight)
+        self.latencies: List[float] = []
+        self.statuses: Counter = Counter()
+        self.sent_amount = 0.0
+        self.dropped = 0
+
+    async def _send(self, amount: float) -> None:
+        start_time = time.perf_counter()
+        try:
+            response = await self.client.post("/payments", json={"amount": amount})
+            self.statuses[response.status_code] += 1
+        except httpx.HTTPError as e:
+            self.statuses[type(e).__name__] += 1
+        finally:
+            self.latencies.append(time.perf_counter() - start_time)
+            self.slots.release()
+
+    async def run(self, duration: float, start_rate: float, end_rate: float) -> None:
+        tasks = set()
+        started = time.perf_counter()
+        next_arrival = 0.0
+
+        while next_arrival < duration:
+            rate = start_rate + (end_rate - start_rate) * next_arrival / duration
+            next_arrival += self.rng.expovariate(max(rate, 1e-6))
+
+            delay = started + next_arrival - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+            # Malha aberta: se o limite local estourou, conta como descartado
+            if self.slots.locked():
+                self.dropped += 1
+                continue
+            await self.slots.acquire()
+
+            amount = round(self.rng.uniform(1, 100), 2)
+            self.sent_amount += amount
+            task = asyncio.create_task(self._send(amount))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+
+        if tasks:
+            await asyncio.gather(*tasks)
+
+
+async def fetch_processor_summary(
+    client: httpx.AsyncClient, url: str, start: datetime, end: datetime
+) -> Optional[Dict]:
+    try:
+        response = await client.get(
+            f"{url}/admin/payments-summary",
+            params={"from": start.isoformat(), "to": end.isoformat()},
+        )
+        response.raise_for_status()
+        return response.json()
+    except httpx.HTTPError:
+        return None
+
+
+async def run_benchmark(args) -> Dict:
+    emulators = []
+    if args.spawn_processors:
+        for index, (port, fee) in enumerate(((3001, 0.05), (3002, 0.15))):
+            emulator = ProcessorEmulator(
+                EmulatorConfig(
+                    port=port,
+                    name=f"processor_{index + 1}",
+                    fee=fee,
+                    latency=args.latency,
+                    failure_windows=args.failure_windows if index == 0 else "",
+                    seed=args.seed + index,
+                )
+            )
+            await emulator.start()
+            emulators.append(emulator)
+
+    processor_urls = args.processors.split(",")
+    limits = httpx.Limits(max_connections=args.max_inflight)
+
+    async with httpx.AsyncClient(
+        base_url=args.app, timeout=args.timeout, limits=limits
+    ) as client:
+        if args.purge:
+            await client.post("/purge-payments")
+            for url in processor_urls:
+                try:
+                    await client.post(f"{url}/admin/purge-payments")
+                except httpx.HTTPError:
+                    pass
+
+        generator = LoadGenerator(client, random.Random(args.seed), args.max_inflight)
+        started_at = datetime.now(timezone.utc)
+        wall_start = time.perf_counter()
+        await generator.run(args.duration, args.start_rate, args.end_rate)
+        elapsed = time.perf_counter() - wall_start
+
+        # Espera o processamento assíncrono assentar
+        await asyncio.sleep(args.settle)
+        ended_at = datetime.now(timezone.utc)
+
+        response = await client.get(
+            "/payment-summary",
+            params={"from": started_at.isoformat(), "to": ended_at.isoformat()},
+        )
+        app_summary = response.json()
+        processor_summaries = [
+            await fetch_processor_summary(client, url, started_at, ended_at)
+            for url in processor_urls
+        ]
+
+    for emulator in emulators:
+        await emulator.stop()
+
+    accepted = generator.statuses.get(200, 0)
+    report = {
+        "duration_s": round(elapsed, 3),
+        "requests": len(generator.latencies),
+        "dropped_by_generator": generator.dropped,
+        "statuses": {str(key): value for key, value in generator.statuses.items()},
+        "throughput_rps": round(accepted / elapsed, 1) if elapsed else 0.0,
+        "latency_ms": {
+            name: round(percentile(generator.latencies, q) * 1000, 3)
+            for name, q in (("p50", 0.5), ("p99", 0.99), ("p999", 0.999))
+        },
+        "fees_paid": None,
+        "consistency": [],
+    }
+
+    if all(processor_summaries):
+        report["fees_paid"] = round(
+            sum(summary["totalFee"] for summary in processor_summaries), 2
+        )
+        for key, summary in zip(("processor_1", "processor_2"), processor_summaries):
+            app_side = app_summary[key]
+            report["consistency"].append(
+                {
+                    "processor": key,
+                    "app_count": app_side["count"],
+                    "processor_count": summary["totalRequests"],
+                    "app_amount": round(app_side["total_amount"], 2),
+                    "processor_amount": summary["totalAmount"],
+                    "consistent": app_side["count"] == summary["totalRequests"]
+                    and abs(app_side["total_amount"] - summary["totalAmount"]) < 0.01,
+                }
+            )
+
+    return report
+
+
+def print_report(report: Dict) -> None:
+    latency = report["latency_ms"]
+    print(f"duration      {report['duration_s']} s")
+    print(
+        f"requests      {report['requests']} ({report['dropped_by_generator']} dropped)"
+    )
+    print(f"statuses      {report['statuses']}")
+    print(f"throughput    {report['throughput_rps']} req/s")
+    print(
+        f"latency       p50={latency['p50']} ms  p99={latency['p99']} ms"
+        f"  p999={latency['p999']} ms"
+    )
+    print(f"fees paid     {report['fees_paid']}")
+    for item in report["consistency"]:
+        flag = "ok" if item["consistent"] else "MISMATCH"
+        print(
+            f"{item['processor']:<13} app={item['app_count']}/{item['app_amount']}"
+            f"  processor={item['processor_count']}/{item['processor_amount']}  {flag}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="End-to-end load benchmark")
+    parser.add_argument("--app", default="http://localhost:9999")
+    parser.add_argument(
+        "--processors", default="http://localhost:3001,http://localhost:3002"
+    )
+    parser.add_argument("--spawn-processors", action="store_true")
+    parser.add_argument("--latency", default="lognormal:20:0.4")
+    parser.add_argument("--failure-windows", default="")
+    parser.add_argument("--duration", type=float, default=30.0)
+    parser.add_argument("--start-rate", type=float, default=50.0)
+    parser.add_argument("--end-rate", type=float, default=500.0)
+    parser.add_argument("--max-inflight", type=int, default=500)
+    parser.add_argument("--timeout", type=float, default=10.0)
+    parser.add_argument("--settle", type=float, default=5.0)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--no-purge", dest="purge", action="store_false")
+    parser.add_argument("--json", action="store_true", help="print JSON report")
+    args = parser.parse_args()
+
+    report = asyncio.run(run_benchmark(args))
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report)
+
+
+if __name__ == "__main__":
+    main()
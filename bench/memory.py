@@ -0,0 +1,145 @@
+"""Benchmark de memória: bytes por pagamento enfileirado
+
+Compara as representações de um pagamento na fila de trabalho:
+
+    orm+dict   instância SQLModel `Payment` + dict da task (representação antiga)
+    dict       apenas o dict da task
+    record     `PaymentRecord` (__slots__, centavos e µs inteiros)
+    spill      registro de tamanho fixo no segmento em disco (heap ~0)
+
+Uso:
+
+    python -m bench.memory --count 50000
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import tempfile
+import tracemalloc
+from datetime import datetime, timezone
+from typing import Callable, Dict, List
+
+from app.models.payment import Payment, PaymentStatus
+from app.models.record import PaymentRecord
+from app.services.core.spill import RECORD, SpillQueue
+
+
+def orm_and_dict(i: int):
+    now = datetime.now(timezone.utc)
+    payment = Payment(
+        id=i,
+        amount=10.5,
+        currency="BRL",
+        status=PaymentStatus.PENDING,
+        created_at=now,
+        updated_at=now,
+    )
+    task = {
+        "payment_id": payment.id,
+        "amount": payment.amount,
+        "currency": payment.currency,
+        "created_at": payment.created_at,
+        "attempts": payment.attempts,
+    }
+    return payment, task
+
+
+def task_dict(i: int):
+    return {
+        "payment_id": i,
+        "amount": 10.5 + i / 100,
+        "currency": "BRL",
+        "created_at": datetime.now(timezone.utc),
+        "attempts": 0,
+    }
+
+
+def record(i: int):
+    return PaymentRecord(1050 + i, "BRL", id=i)
+
+
+def measure(factory: Callable[[int], object], count: int) -> float:
+    """Bytes de heap por item mantido numa PriorityQueue"""
+    queue = asyncio.PriorityQueue()
+    sequence = itertools.count()
+
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    for i in range(count):
+        queue.put_nowait((0, next(sequence), factory(i)))
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    return (after - before) / count
+
+
+def measure_spill(count: int, capacity: int) -> Dict[str, float]:
+    """Heap e disco por item com a fila limitada transbordando para o disco"""
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "bench.spill")
+        queue = SpillQueue(capacity=capacity, path=path)
+        queue.open()
+
+        tracemalloc.start()
+        before = tracemalloc.get_traced_memory()[0]
+        for i in range(count):
+            queue.put(0, record(i))
+        after = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+
+        disk = os.path.getsize(path)
+        queue.close()
+
+    return {"heap": (after - before) / count, "disk": disk / count}
+
+
+def run(count: int, capacity: int) -> List[Dict]:
+    results = [
+        {"representation": name, "bytes_per_payment": round(measure(factory, count), 1)}
+        for name, factory in (
+            ("orm+dict", orm_and_dict),
+            ("dict", task_dict),
+            ("record", record),
+        )
+    ]
+    spill = measure_spill(count, capacity)
+    results.append(
+        {
+            "representation": f"spill (capacity={capacity})",
+            "bytes_per_payment": round(spill["heap"], 1),
+            "disk_bytes_per_payment": round(spill["disk"], 1),
+            "record_size": RECORD.size,
+        }
+    )
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bytes per queued payment")
+    parser.add_argument("--count", type=int, default=20000)
+    parser.add_argument("--capacity", type=int, default=1000)
+    parser.add_argument("--json", action="store_true", help="print JSON report")
+    args = parser.parse_args()
+
+    results = run(args.count, args.capacity)
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    baseline = results[0]["bytes_per_payment"]
+    for item in results:
+        size = item["bytes_per_payment"]
+        extra = ""
+        if "disk_bytes_per_payment" in item:
+            extra = f"  (+{item['disk_bytes_per_payment']} B on disk)"
+        print(
+            f"{item['representation']:<24} {size:>8.1f} B/payment"
+            f"  {baseline / size if size else float('inf'):>6.1f}x{extra}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,559 @@
+"""Microbenchmarks do hot path com baseline e gate de regressão
+
+Cada caso roda isolado, contra stand-ins locais (sem rede nem banco):
+
+    routing.get_optimal_processor   escolha do processador + permit do limiter
+    circuit.call                    CircuitBreaker.call local (sem estado compartilhado)
+    circuit.call_shared             CircuitBreaker.call sobre o registro mmap
+    queue.enqueue_dispatch          enqueue_payment -> get -> _process_payment_task
+                                    (processador substituído por um stub)
+    models.payment_create           validação de PaymentCreate a partir do JSON
+    models.payment_response         PaymentResponse.from_orm + serialização
+    fast.payment_response           serialização do fast path (orjson)
+    summary.record                  SummaryIndex.record_cents
+    summary.query                   SummaryIndex.summary numa faixa (1 dia de buckets)
+
+Cada caso roda em --processes processos novos (o layout de memória e o
+hash seed variam entre processos e pesam mais que o ruído dentro de um).
+Em cada processo: melhor de --repeat amostras de ~--min-time segundos com
+o GC desligado (como no timeit, ruído só deixa mais lento) e bytes alocados
+por operação (pico do tracemalloc numa execução separada). O resultado do
+caso é a mediana entre os processos.
+
+ops/s absoluto depende da máquina e do momento (frequência da CPU, vizinhos
+barulhentos), então o gate compara o `score`: ops/s do caso dividido pelo
+ops/s de um loop de calibração em Python puro, medido no mesmo processo e
+intercalado com as amostras do caso. O `spread` é a variação do score
+entre os processos ((máx - mín) / mediana).
+
+O resultado é comparado com o baseline gravado (bench/baseline.json): o
+score cair mais que --tolerance e mais que o spread medido (o maior entre o
+atual e o do baseline), ou subir mais que --alloc-tolerance em bytes por
+operação, é regressão, e o processo sai com código 1. Com o baseline de
+outro ambiente (Python, arquitetura ou modelo de CPU) a velocidade só é
+informada; a alocação continua no gate.
+
+Uso:
+
+    python -m bench.micro                 # compara com o baseline
+    python -m bench.micro --save          # grava um novo baseline
+    python -m bench.micro -k circuit      # só os casos que contêm "circuit"
+"""
+
+import argparse
+import asyncio
+import gc
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+import warnings
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable, Dict, List, NamedTuple, Optional
+
+import orjson
+
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "baseline.json")
+
+# Folga absoluta na comparação de alocação (ruído de poucos objetos pequenos)
+ALLOC_SLACK_BYTES = 64
+
+
+class Bench(NamedTuple):
+    """Operação medida (síncrona ou corrotina) e limpeza opcional"""
+
+    op: Callable
+    is_async: bool = False
+    teardown: Optional[Callable[[], Awaitable[None]]] = None
+
+
+CASES: Dict[str, Callable[[], Awaitable[Bench]]] = {}
+
+
+def case(name: str):
+    """Registra a fábrica (async) de um caso"""
+
+    def register(factory: Callable[[], Awaitable[Bench]]):
+        CASES[name] = factory
+        return factory
+
+    return register
+
+
+# Casos --------------------------------------------------------------------
+
+
+@case("routing.get_optimal_processor")
+async def routing_case() -> Bench:
+    from app.services.payment import PaymentProcessor
+
+    processor = PaymentProcessor()
+    limiters = {pid: config["limiter"] for pid, config in processor.processors.items()}
+
+    async def op():
+        processor_id = await processor.get_optimal_processor()
+        limiters[processor_id].release(0.01, True)
+
+    return Bench(op, is_async=True, teardown=processor.close)
+
+
+async def _noop():
+    return None
+
+
+@case("circuit.call")
+async def circuit_case() -> Bench:
+    from app.services.core.circuit import CircuitBreaker
+
+    breaker = CircuitBreaker(name="micro")
+
+    async def op():
+        await breaker.call(_noop)
+
+    return Bench(op, is_async=True)
+
+
+@case("circuit.call_shared")
+async def circuit_shared_case() -> Bench:
+    from app.services.core.circuit import CircuitBreaker
+
+    directory = tempfile.TemporaryDirectory()
+    breaker = CircuitBreaker(
+        name="micro_shared", state_path=os.path.join(directory.name, "circuit")
+    )
+
+    async def op():
+        await breaker.call(_noop)
+
+    async def teardown():
+        breaker.record.close()
+        directory.cleanup()
+
+    return Bench(op, is_async=True, teardown=teardown)
+
+
+class NullRepository:
+    """Stand-in do repositório: a fila não lê nada dele fora do start"""
+
+    name = "null"
+    rollup = False
+
+
+@case("queue.enqueue_dispatch")
+async def queue_case() -> Bench:
+    from app.models.record import PaymentRecord
+    from app.services.core.queue import QueueManager
+
+    queue_manager = QueueManager(NullRepository())
+
+    async def process_payment(payment_id, amount, currency="BRL", processor_id=None):
+        return {
+            "success": True,
+            "processor_id": payment_id & 1,
+            "external_id": str(payment_id),
+            "fee": amount * 0.05,
+        }
+
+    # Só o processador vira stub: fila, status em lote e summary são os reais
+    queue_manager.processor.process_payment = process_payment
+    status_writer = queue_manager.status_writer
+    ids = iter(range(sys.maxsize))
+
+    async def op():
+        payment_id = next(ids) & 1023
+        await queue_manager.enqueue_payment(PaymentRecord(1990, id=payment_id))
+        task = await queue_manager.queue.get()
+        await queue_manager._process_payment_task(task)
+        queue_manager.queue.task_done()
+        if payment_id == 1023:
+            # O flush real (fora do caso) esvaziaria os pendentes
+            status_writer.pending.clear()
+            status_writer.completed.clear()
+
+    return Bench(op, is_async=True, teardown=queue_manager.processor.close)
+
+
+@case("models.payment_create")
+async def payment_create_case() -> Bench:
+    from app.models.payment import PaymentCreate
+
+    body = b'{"amount": 19.9, "currency": "BRL"}'
+    return Bench(lambda: PaymentCreate.model_validate_json(body))
+
+
+@case("models.payment_response")
+async def payment_response_case() -> Bench:
+    from app.models.payment import PaymentResponse
+    from app.models.record import PaymentRecord
+
+    payment = PaymentRecord(1990, id=42)
+
+    # Mesma conversão da rota (from_orm está depreciado no pydantic 2)
+    warnings.filterwarnings("ignore", category=DeprecationWarning)
+    return Bench(lambda: PaymentResponse.from_orm(payment).model_dump_json())
+
+
+@case("fast.payment_response")
+async def fast_response_case() -> Bench:
+    from app.models.record import PaymentRecord
+
+    payment = PaymentRecord(1990, id=42)
+
+    def op():
+        return orjson.dumps(
+            {
+                "id": payment.id,
+                "amount": payment.amount,
+                "currency": payment.currency,
+                "status": payment.status,
+                "processor_id": payment.processor_id,
+                "created_at": payment.created_at,
+            },
+            option=orjson.OPT_UTC_Z,
+        )
+
+    return Bench(op)
+
+
+def _filled_index():
+    """SummaryIndex com um dia de buckets de 1 s já ocupados"""
+    from app.services.core.summary import SummaryIndex
+
+    index = SummaryIndex((0, 1), bucket_ms=1000)
+    start_ms = 1_750_000_000_000
+    for i in range(86_400):
+        index.record_cents(i & 1, 1990, start_ms + i * 1000)
+    return index, start_ms
+
+
+@case("summary.record")
+async def summary_record_case() -> Bench:
+    index, start_ms = _filled_index()
+    offsets = iter(range(sys.maxsize))
+
+    def op():
+        index.record_cents(0, 1990, start_ms + (next(offsets) % 86_400) * 1000)
+
+    return Bench(op)
+
+
+@case("summary.query")
+async def summary_query_case() -> Bench:
+    index, start_ms = _filled_index()
+    start = datetime.fromtimestamp(start_ms / 1000, timezone.utc) + timedelta(hours=1)
+    end = start + timedelta(hours=12)
+    return Bench(lambda: index.summary(start, end))
+
+
+# Harness ------------------------------------------------------------------
+
+
+async def run_ops(bench: Bench, count: int) -> float:
+    """Executa `count` operações com o GC desligado; retorna os segundos"""
+    op = bench.op
+    gc.collect()
+    gc.disable()
+    try:
+        start_time = time.perf_counter()
+        if bench.is_async:
+            for _ in range(count):
+                await op()
+        else:
+            for _ in range(count):
+                op()
+        return time.perf_counter() - start_time
+    finally:
+        gc.enable()
+
+
+async def calibrate(bench: Bench, min_time: float) -> int:
+    """Operações por amostra para que cada amostra dure ~min_time"""
+    count = 1
+    while True:
+        elapsed = await run_ops(bench, count)
+        if elapsed >= min_time / 10:
+            return max(1, int(count * min_time / elapsed))
+        count *= 10 if elapsed < min_time / 100 else 2
+
+
+async def alloc_per_op(bench: Bench, count: int = 500) -> float:
+    """Média do pico de memória alocada durante uma operação (bytes)"""
+    op = bench.op
+    tracemalloc.start()
+    try:
+        total = 0
+        for _ in range(count):
+            tracemalloc.reset_peak()
+            before, _ = tracemalloc.get_traced_memory()
+            if bench.is_async:
+                await op()
+            else:
+                op()
+            _, peak = tracemalloc.get_traced_memory()
+            total += peak - before
+        return total / count
+    finally:
+        tracemalloc.stop()
+
+
+def _reference_op():
+    """Carga de referência: dict, chamadas, iteração e sort de uma lista curta"""
+    values = {"amount": 1990, "fee": 5}
+    total = 0
+    for key in ("amount", "fee", "missing"):
+        total += values.get(key, 0)
+    return sorted((total, len(values), 1))
+
+
+REFERENCE = Bench(_reference_op)
+
+
+async def measure(name: str, repeat: int, min_time: float) -> Dict:
+    bench = await CASES[name]()
+    try:
+        # Aquecimento: caches, specializations do interpretador, arrays crescidos
+        await run_ops(bench, 200)
+        await run_ops(REFERENCE, 200)
+        count = await calibrate(bench, min_time)
+        reference_count = await calibrate(REFERENCE, min_time)
+
+        # Intercalado: uma mudança de frequência da CPU pega os dois igualmente
+        rates, reference_rates = [], []
+        for _ in range(repeat):
+            reference_rates.append(
+                reference_count / await run_ops(REFERENCE, reference_count)
+            )
+            rates.append(count / await run_ops(bench, count))
+        allocated = await alloc_per_op(bench)
+    finally:
+        if bench.teardown is not None:
+            await bench.teardown()
+
+    return {
+        "ops_per_s": max(rates),
+        "score": max(rates) / max(reference_rates),
+        "alloc_bytes": allocated,
+    }
+
+
+def run_case(name: str, processes: int, repeat: int, min_time: float) -> Dict:
+    """Mede o caso em processos novos e combina pela mediana"""
+    if processes <= 0:
+        samples = [asyncio.run(measure(name, repeat, min_time))]
+    else:
+        command = [
+            sys.executable,
+            "-m",
+            "bench.micro",
+            "--worker",
+            name,
+            "--repeat",
+            str(repeat),
+            "--min-time",
+            str(min_time),
+        ]
+        samples = [
+            json.loads(subprocess.run(command, check=True, capture_output=True).stdout)
+            for _ in range(processes)
+        ]
+
+    scores = [sample["score"] for sample in samples]
+    score = statistics.median(scores)
+    return {
+        "ops_per_s": round(statistics.median(s["ops_per_s"] for s in samples), 1),
+        "score": round(score, 4),
+        "spread": round((max(scores) - min(scores)) / score, 3),
+        "alloc_bytes": round(statistics.median(s["alloc_bytes"] for s in samples), 1),
+    }
+
+
+def cpu_model() -> str:
+    """Modelo da CPU (/proc/cpuinfo no Linux; platform.processor nos demais)"""
+    try:
+        with open("/proc/cpuinfo") as file:
+            for line in file:
+                if line.startswith("model name"):
+                    return line.split(":", 1)[1].strip()
+    except OSError:
+        pass
+    return platform.processor()
+
+
+def environment() -> Dict[str, str]:
+    return {
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "machine": platform.machine(),
+        "system": platform.system(),
+        "cpu": cpu_model(),
+    }
+
+
+# Comparação ---------------------------------------------------------------
+
+
+def compare(
+    results: Dict[str, Dict],
+    baseline: Dict[str, Dict],
+    tolerance: float,
+    alloc_tolerance: float,
+    gate_speed: bool = True,
+) -> List[Dict]:
+    """Linhas do diff contra o baseline, com o status de cada caso
+
+    A velocidade só regride se o score cair mais que `tolerance` e mais que
+    o spread (ruído entre processos) do resultado atual e do baseline.
+    """
+    rows = []
+    for name, result in results.items():
+        base = baseline.get(name)
+        row = {"case": name, **result, "status": "new"}
+        if base is not None and "score" in base:
+            speed = result["score"] / base["score"] - 1
+            threshold = max(tolerance, result["spread"], base["spread"])
+            alloc_limit = (
+                base["alloc_bytes"] * (1 + alloc_tolerance) + ALLOC_SLACK_BYTES
+            )
+            row.update(
+                base_score=base["score"],
+                base_alloc_bytes=base["alloc_bytes"],
+                speed_change=round(speed, 3),
+                threshold=round(threshold, 3),
+            )
+            problems = []
+            if gate_speed and speed < -threshold:
+                problems.append("slower")
+            if result["alloc_bytes"] > alloc_limit:
+                problems.append("allocs")
+            if problems:
+                row["status"] = "REGRESSION (" + ", ".join(problems) + ")"
+            elif gate_speed and speed > threshold:
+                row["status"] = "faster"
+            else:
+                row["status"] = "ok"
+        rows.append(row)
+    return rows
+
+
+def format_rows(rows: List[Dict]) -> str:
+    """Tabela legível: atual x baseline por caso"""
+    lines = [
+        f"{'case':<32} {'ops/s':>12} {'score':>8} {'baseline':>8} {'change':>8}"
+        f" {'noise':>7} {'B/op':>9} {'baseline':>9}  status"
+    ]
+    for row in rows:
+        base_score = row.get("base_score")
+        change = row.get("speed_change")
+        threshold = row.get("threshold")
+        base_alloc = row.get("base_alloc_bytes")
+        lines.append(
+            f"{row['case']:<32} {row['ops_per_s']:>12,.0f} {row['score']:>8.3f}"
+            f" {'-' if base_score is None else format(base_score, '.3f'):>8}"
+            f" {'-' if change is None else format(change, '+.1%'):>8}"
+            f" {'-' if threshold is None else format(threshold, '.0%'):>7}"
+            f" {row['alloc_bytes']:>9,.0f}"
+            f" {'-' if base_alloc is None else format(base_alloc, ',.0f'):>9}"
+            f"  {row['status']}"
+        )
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Hot-path microbenchmarks")
+    parser.add_argument(
+        "-k", dest="pattern", default="", help="only cases containing this"
+    )
+    parser.add_argument("--processes", type=int, default=3, help="0 = in-process")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument(
+        "--min-time", type=float, default=0.1, help="seconds per sample"
+    )
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument(
+        "--save", action="store_true", help="write results as the baseline"
+    )
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.25,
+        help="allowed score drop (fraction; the measured spread applies if larger)",
+    )
+    parser.add_argument(
+        "--alloc-tolerance",
+        type=float,
+        default=0.10,
+        help="allowed bytes/op increase (fraction)",
+    )
+    parser.add_argument("--json", action="store_true", help="print JSON report")
+    args = parser.parse_args()
+
+    if args.worker:
+        # Processo filho: mede um caso e devolve o JSON no stdout
+        print(json.dumps(asyncio.run(measure(args.worker, args.repeat, args.min_time))))
+        return
+
+    names = [name for name in CASES if args.pattern in name]
+    if not names:
+        parser.error(f"no case matches {args.pattern!r}")
+
+    results = {
+        name: run_case(name, args.processes, args.repeat, args.min_time)
+        for name in names
+    }
+
+    if args.save:
+        saved = {"environment": environment(), "cases": {}}
+        if os.path.exists(args.baseline):
+            with open(args.baseline) as file:
+                saved["cases"] = json.load(file).get("cases", {})
+        saved["cases"].update(results)
+        with open(args.baseline, "w") as file:
+            json.dump(saved, file, indent=2, sort_keys=True)
+            file.write("\n")
+        print(format_rows(compare(results, {}, args.tolerance, args.alloc_tolerance)))
+        print(f"\nbaseline written to {args.baseline}")
+        return
+
+    baseline = {"cases": {}}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+    else:
+        print(f"no baseline at {args.baseline}; run with --save first", file=sys.stderr)
+
+    same_environment = baseline.get("environment", environment()) == environment()
+    if not same_environment:
+        print(
+            f"warning: baseline recorded on {baseline['environment']}, "
+            f"running on {environment()}; speed is reported but not gated",
+            file=sys.stderr,
+        )
+
+    rows = compare(
+        results,
+        baseline["cases"],
+        args.tolerance,
+        args.alloc_tolerance,
+        gate_speed=same_environment,
+    )
+    regressions = [row for row in rows if row["status"].startswith("REGRESSION")]
+
+    if args.json:
+        print(json.dumps({"environment": environment(), "cases": rows}, indent=2))
+    else:
+        print(format_rows(rows))
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) against {args.baseline}")
+
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
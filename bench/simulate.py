@@ -0,0 +1,381 @@
+"""Simulador de eventos discretos das políticas de roteamento, retry e breaker
+
+Roda o QueueManager/PaymentProcessor reais (roteamento, limiter, circuit
+breaker, retentativas, hedge) contra dois emuladores de `processors` num
+único processo, com relógio virtual (app.core.clock.VirtualClock): sleeps,
+timeouts, backoffs e health checks não esperam tempo de verdade, então um
+minuto de carga roda em poucos segundos, sempre com o mesmo resultado para
+a mesma --seed.
+
+Cada política é um conjunto de valores de Settings; para cada uma o
+relatório traz:
+
+    done         pagamentos confirmados (e vazão por segundo simulado)
+    fees         taxas pagas nos confirmados e valor líquido recebido
+    lateness     atraso entre a chegada e a confirmação (p50/p99/max)
+    lost         não confirmados ao fim do --drain (falharam ou pendentes)
+    unconfirmed  cobrados por um processador mas nunca confirmados na aplicação
+    speedup      tempo simulado / tempo de parede; nada espera o relógio real,
+                 então o limite é a CPU gasta por evento do loop (e varia
+                 com a carga da máquina)
+
+Uso:
+
+    python -m bench.simulate              # cenário outage, todas as políticas
+    python -m bench.simulate --scenario slow --policy priority --policy cost
+    python -m bench.simulate --policy "fast-retry:retry_base_delay_ms=100"
+    python -m bench.simulate --scenario cenario.json --rate 500 --json
+
+Cenário em arquivo: lista JSON com os campos de EmulatorConfig de cada
+processador (latency, failure_rate, failure_windows, slow_windows, ...).
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import time
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+import httpx
+import orjson
+
+from app.core.clock import VirtualClock
+from app.core.config import settings
+from app.models.payment import PaymentStatus
+from app.models.record import PaymentRecord
+from app.services.core.queue import QueueManager
+from app.services.core.transport import TransportError
+from bench.loadgen import percentile
+from processors.emulator import EmulatorConfig, ProcessorEmulator
+
+
+# Latências de referência (ms) e janelas em segundos desde o início
+BASE = ({"latency": "lognormal:20:0.4"}, {"latency": "lognormal:35:0.4"})
+
+SCENARIOS: Dict[str, Tuple[Dict[str, Any], Dict[str, Any]]] = {
+    "steady": BASE,
+    "outage": ({**BASE[0], "failure_windows": "15-35"}, BASE[1]),
+    "slow": ({**BASE[0], "slow_windows": "15-35:1500"}, BASE[1]),
+    "flaky": ({**BASE[0], "failure_rate": 0.2}, {**BASE[1], "failure_rate": 0.05}),
+    "stall": ({**BASE[0], "response_stall": "0.05:8000"}, BASE[1]),
+    "both-down": (
+        {**BASE[0], "failure_windows": "20-30"},
+        {**BASE[1], "failure_windows": "20-30"},
+    ),
+}
+
+POLICIES: Dict[str, Dict[str, Any]] = {
+    "priority": {"routing_strategy": "priority"},
+    "cost": {"routing_strategy": "cost"},
+    "cost-gradient": {"routing_strategy": "cost", "limiter_algorithm": "gradient"},
+    "cost-hedge": {"routing_strategy": "cost", "hedge_enabled": True},
+}
+
+# Sempre: um processo, sem estado compartilhado em disco nem fila em disco
+ISOLATED = {
+    "workers": 1,
+    "shared_state_dir": "",
+    "health_state_path": "",
+    "queue_backend": "memory",
+    "queue_spill_path": "",
+    "summary_backend": "memory",
+}
+
+
+def parse_policy(spec: str) -> Tuple[str, Dict[str, Any]]:
+    """ "nome" ou "nome:campo=valor,..." (sobre a política de mesmo nome)"""
+    name, _, assignments = spec.partition(":")
+    if name not in POLICIES and not assignments:
+        raise ValueError(f"Unknown policy: {name}")
+
+    values = dict(POLICIES.get(name, {}))
+    for assignment in filter(None, assignments.split(",")):
+        key, _, raw = assignment.partition("=")
+        key = key.strip()
+        if key not in type(settings).model_fields:
+            raise ValueError(f"Unknown setting: {key}")
+        current = getattr(settings, key)
+        if isinstance(current, bool):
+            values[key] = raw.strip().lower() in ("1", "true", "yes")
+        else:
+            values[key] = type(current)(raw.strip())
+    return name, values
+
+
+def load_scenario(name: str) -> Tuple[Dict[str, Any], ...]:
+    """Cenário embutido ou arquivo JSON com a config de cada processador"""
+    if name in SCENARIOS:
+        return SCENARIOS[name]
+    if os.path.exists(name):
+        with open(name) as file:
+            return tuple(json.load(file))
+    raise ValueError(f"Unknown scenario: {name}")
+
+
+class SimulatedNetwork:
+    """Os emuladores atrás das interfaces de transporte e de cliente HTTP
+
+    `post_json`/`get` fazem o papel do transporte do PaymentProcessor e
+    `client` o do httpx usado pelo health check. Como num servidor de
+    verdade, o emulador segue processando depois de um timeout do cliente.
+    """
+
+    def __init__(self, emulators: Dict[str, ProcessorEmulator], timeout: float):
+        self.emulators = emulators
+        self.timeout = timeout
+        self.client = SimulatedClient(self)
+
+    async def _request(
+        self, method: str, url: str, body: bytes = b""
+    ) -> Tuple[int, Any]:
+        parts = urlsplit(url)
+        emulator = self.emulators[f"{parts.scheme}://{parts.netloc}"]
+        handler = asyncio.ensure_future(emulator.handle(method, parts.path, body))
+        try:
+            return await asyncio.wait_for(asyncio.shield(handler), self.timeout)
+        except asyncio.TimeoutError:
+            raise TransportError(f"Timeout calling {url}")
+
+    async def post_json(self, url: str, body: bytes) -> Tuple[int, bytes]:
+        status, payload = await self._request("POST", url, body)
+        return status, orjson.dumps(payload)
+
+    async def get(self, url: str) -> Tuple[int, bytes]:
+        status, payload = await self._request("GET", url)
+        return status, orjson.dumps(payload)
+
+    async def close(self) -> None:
+        pass
+
+
+class SimulatedClient:
+    """O pedaço do httpx.AsyncClient usado pelo health check"""
+
+    def __init__(self, network: SimulatedNetwork):
+        self.network = network
+
+    async def get(self, url: str, timeout: Optional[float] = None) -> httpx.Response:
+        status, payload = await self.network._request("GET", url)
+        return httpx.Response(status, json=payload, request=httpx.Request("GET", url))
+
+
+class SimulatedRepository:
+    """Repositório em memória: só o último status de cada pagamento"""
+
+    name = "simulated"
+    rollup = False
+
+    def __init__(self):
+        self.status: Dict[int, PaymentStatus] = {}
+
+    async def update_status(self, rows: List[Dict[str, Any]], completed=None) -> None:
+        for row in rows:
+            self.status[row["id"]] = row["status"]
+
+    async def completed(self):
+        return
+        yield
+
+
+def arrivals(args) -> List[Tuple[float, int]]:
+    """Chegadas Poisson (instante em segundos, centavos), iguais para toda política"""
+    rng = random.Random(args.seed)
+    at, result = 0.0, []
+    while True:
+        at += rng.expovariate(args.rate)
+        if at >= args.duration:
+            return result
+        result.append((at, rng.randint(100, 100000)))
+
+
+async def simulate(
+    clock: VirtualClock, scenario, load: List[Tuple[float, int]], args
+) -> Dict[str, Any]:
+    repository = SimulatedRepository()
+    manager = QueueManager(repository, clock)
+    processor = manager.processor
+
+    # Emuladores com as taxas que o PaymentProcessor espera de cada um
+    emulators = {}
+    for processor_id, config in processor.processors.items():
+        parts = urlsplit(config["url"])
+        emulators[f"{parts.scheme}://{parts.netloc}"] = ProcessorEmulator(
+            EmulatorConfig(
+                **{
+                    "name": config["circuit_breaker"].name,
+                    "fee": config["fee"],
+                    "seed": args.seed + processor_id,
+                    **scenario[processor_id],
+                }
+            ),
+            clock,
+        )
+    network = SimulatedNetwork(emulators, settings.request_timeout)
+    processor.transport = network
+    processor.health.client = network.client
+
+    # Confirmação = processador respondeu sucesso (mesmo ponto do summary)
+    arrived: Dict[int, float] = {}
+    lateness: Dict[int, float] = {}
+    fees = amount = 0.0
+    process_payment = processor.process_payment
+
+    async def confirm(
+        payment_id: int,
+        value: float,
+        currency: str = "BRL",
+        processor_id: Optional[int] = None,
+    ):
+        nonlocal fees, amount
+        result = await process_payment(payment_id, value, currency, processor_id)
+        if result["success"] and payment_id not in lateness:
+            lateness[payment_id] = clock.monotonic() - arrived[payment_id]
+            fees += result["fee"]
+            amount += value
+        return result
+
+    processor.process_payment = confirm
+
+    await manager.start()
+    origin = clock.monotonic()
+    for payment_id, (at, cents) in enumerate(load, 1):
+        await asyncio.sleep(origin + at - clock.monotonic())
+        arrived[payment_id] = clock.monotonic()
+        await manager.enqueue_payment(
+            PaymentRecord(
+                cents, created_us=int(clock.now().timestamp() * 1e6), id=payment_id
+            )
+        )
+
+    # Drena retentativas até resolver tudo ou estourar o prazo
+    deadline = origin + args.duration + args.drain
+    while clock.monotonic() < deadline:
+        failed = sum(
+            1 for status in repository.status.values() if status == PaymentStatus.FAILED
+        )
+        if len(lateness) + failed >= len(load):
+            break
+        await asyncio.sleep(0.1)
+    elapsed = clock.monotonic() - origin
+
+    # Resultado medido antes do stop (o stop ainda drena a fila local)
+    await manager.status_writer.flush()
+    failed = sum(
+        1
+        for payment_id, status in repository.status.items()
+        if status == PaymentStatus.FAILED and payment_id not in lateness
+    )
+    charged = set()
+    for emulator in emulators.values():
+        charged.update(int(external_id) for external_id in emulator.payments)
+    samples = list(lateness.values())
+
+    await manager.stop()
+
+    return {
+        "payments": len(load),
+        "done": len(lateness),
+        "throughput": round(len(lateness) / elapsed, 1),
+        "fees": round(fees, 2),
+        "net": round(amount - fees, 2),
+        "lateness_p50_ms": round(percentile(samples, 0.50) * 1000, 1),
+        "lateness_p99_ms": round(percentile(samples, 0.99) * 1000, 1),
+        "lateness_max_ms": round(max(samples, default=0.0) * 1000, 1),
+        "lost": len(load) - len(lateness),
+        "failed": failed,
+        "unconfirmed": len(charged - lateness.keys()),
+        "simulated_s": round(elapsed, 1),
+    }
+
+
+def run_policy(
+    name: str, values: Dict[str, Any], scenario, load, args
+) -> Dict[str, Any]:
+    """Executa uma política num loop virtual novo, com Settings sobrescritos"""
+    overrides = {**ISOLATED, **values}
+    previous = {key: getattr(settings, key) for key in overrides}
+    for key, value in overrides.items():
+        setattr(settings, key, value)
+
+    # Jitter do backoff usa o random global
+    random.seed(args.seed)
+    clock = VirtualClock()
+    start_time = time.perf_counter()
+    try:
+        with asyncio.Runner(loop_factory=clock.new_event_loop) as runner:
+            result = runner.run(simulate(clock, scenario, load, args))
+    finally:
+        for key, value in previous.items():
+            setattr(settings, key, value)
+
+    wall = time.perf_counter() - start_time
+    return {
+        "policy": name,
+        **result,
+        "wall_s": round(wall, 2),
+        "speedup": round(result["simulated_s"] / wall, 1),
+    }
+
+
+def format_rows(rows: List[Dict[str, Any]]) -> str:
+    lines = [
+        f"{'policy':<16} {'done':>7} {'/s':>7} {'fees':>10} {'net':>12}"
+        f" {'p50 ms':>8} {'p99 ms':>8} {'max ms':>8} {'lost':>6} {'unconf':>6}"
+        f" {'speedup':>8}"
+    ]
+    for row in rows:
+        lines.append(
+            f"{row['policy']:<16} {row['done']:>7} {row['throughput']:>7.1f}"
+            f" {row['fees']:>10.2f} {row['net']:>12.2f}"
+            f" {row['lateness_p50_ms']:>8.1f} {row['lateness_p99_ms']:>8.1f}"
+            f" {row['lateness_max_ms']:>8.1f} {row['lost']:>6} {row['unconfirmed']:>6}"
+            f" {row['speedup']:>7.1f}x"
+        )
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Virtual-clock simulation of routing, retry and breaker policies"
+    )
+    parser.add_argument(
+        "--scenario", default="outage", help=f"{', '.join(SCENARIOS)} or a JSON file"
+    )
+    parser.add_argument(
+        "--policy",
+        action="append",
+        help="policy name or name:setting=value,... (repeatable; default: all)",
+    )
+    parser.add_argument(
+        "--duration", type=float, default=60.0, help="arrival window (s)"
+    )
+    parser.add_argument("--rate", type=float, default=200.0, help="arrivals per second")
+    parser.add_argument(
+        "--drain", type=float, default=30.0, help="extra time to settle (s)"
+    )
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--json", action="store_true", help="print JSON report")
+    args = parser.parse_args()
+
+    try:
+        scenario = load_scenario(args.scenario)
+        policies = [parse_policy(spec) for spec in args.policy or POLICIES]
+    except ValueError as e:
+        parser.error(str(e))
+
+    load = arrivals(args)
+    rows = [run_policy(name, values, scenario, load, args) for name, values in policies]
+
+    if args.json:
+        print(json.dumps({"scenario": args.scenario, "policies": rows}, indent=2))
+        return
+
+    print(f"scenario {args.scenario}: {len(load)} payments over {args.duration:.0f}s")
+    print(format_rows(rows))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""Microbenchmark do armazenamento de pagamentos (Postgres x log local)
+
+Exercita o repositório configurado em DATABASE_URL com a mesma forma de
+carga do servidor: lotes de INSERT (group commit da ingestão), UPDATEs de
+status em lote e o replay dos concluídos usado no restart.
+
+    insert    pagamentos gravados por segundo (lotes de --batch, --concurrency
+              lotes simultâneos), com p50/p99 por lote
+    update    linhas de status gravadas por segundo
+    replay    tempo para reler todos os concluídos (reconstrução do summary)
+
+Uso (uma execução por backend):
+
+    DATABASE_URL=postgresql+asyncpg://... python -m bench.storage
+    DATABASE_URL=embedded:///tmp/rinha-bench/payments python -m bench.storage
+"""
+
+import argparse
+import asyncio
+import json
+import time
+from datetime import datetime, timezone
+from typing import Dict, List
+
+from app.core.config import settings
+from app.models.payment import PaymentStatus
+from app.models.record import PaymentRecord
+from app.services.core.repository import create_repository
+from bench.loadgen import percentile
+
+
+async def measure_inserts(repository, count: int, batch: int, concurrency: int):
+    """Lotes de INSERT simultâneos; retorna (ids, latências por lote, segundos)"""
+    batches = [
+        [PaymentRecord(1000 + i) for i in range(start, min(start + batch, count))]
+        for start in range(0, count, batch)
+    ]
+    ids: List[int] = []
+    latencies: List[float] = []
+    slots = asyncio.Semaphore(concurrency)
+
+    async def write(payments: List[PaymentRecord]) -> None:
+        async with slots:
+            start_time = time.perf_counter()
+            ids.extend(await repository.insert(payments))
+            latencies.append(time.perf_counter() - start_time)
+
+    start_time = time.perf_counter()
+    await asyncio.gather(*(write(payments) for payments in batches))
+    return ids, latencies, time.perf_counter() - start_time
+
+
+async def measure_updates(repository, ids: List[int], batch: int) -> float:
+    """UPDATEs de conclusão em lotes de `batch` linhas"""
+    now = datetime.now(timezone.utc)
+    start_time = time.perf_counter()
+    for start in range(0, len(ids), batch):
+        await repository.update_status(
+            [
+                {
+                    "id": payment_id,
+                    "status": PaymentStatus.COMPLETED,
+                    "external_id": f"bench-{payment_id}",
+                    "processor_id": payment_id % 2,
+                    "fee": 0.05,
+                    "attempts": 1,
+                    "updated_at": now,
+                }
+                for payment_id in ids[start : start + batch]
+            ]
+        )
+    return time.perf_counter() - start_time
+
+
+async def run(args) -> Dict:
+    repository = create_repository()
+    await repository.start()
+    try:
+        await repository.purge()
+
+        ids, latencies, insert_seconds = await measure_inserts(
+            repository, args.count, args.batch, args.concurrency
+        )
+        update_seconds = await measure_updates(repository, ids, args.update_batch)
+
+        start_time = time.perf_counter()
+        replayed = 0
+        async for _ in repository.completed():
+            replayed += 1
+        replay_seconds = time.perf_counter() - start_time
+
+        await repository.purge()
+    finally:
+        await repository.stop()
+
+    return {
+        "backend": repository.name,
+        "payments": len(ids),
+        "insert_per_s": round(len(ids) / insert_seconds, 1),
+        "insert_p50_ms": round(percentile(latencies, 0.50) * 1000, 3),
+        "insert_p99_ms": round(percentile(latencies, 0.99) * 1000, 3),
+        "update_per_s": round(len(ids) / update_seconds, 1),
+        "replayed": replayed,
+        "replay_ms": round(replay_seconds * 1000, 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Payment storage microbenchmark")
+    parser.add_argument("--count", type=int, default=20000)
+    parser.add_argument("--batch", type=int, default=settings.ingest_batch_size)
+    parser.add_argument("--concurrency", type=int, default=settings.ingest_max_flushes)
+    parser.add_argument(
+        "--update-batch", type=int, default=settings.status_flush_batch_size
+    )
+    parser.add_argument("--json", action="store_true", help="print JSON report")
+    args = parser.parse_args()
+
+    result = asyncio.run(run(args))
+    if args.json:
+        print(json.dumps(result, indent=2))
+        return
+
+    print(
+        f"{result['backend']:<9} {result['payments']} payments"
+        f"  insert {result['insert_per_s']:>10.1f}/s"
+        f" (p50 {result['insert_p50_ms']:.3f} ms, p99 {result['insert_p99_ms']:.3f} ms)"
+        f"  update {result['update_per_s']:>10.1f}/s"
+        f"  replay {result['replayed']} in {result['replay_ms']:.1f} ms"
+    )
+
+
+if __name__ == "__main__":
+    main()
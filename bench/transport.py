@@ -0,0 +1,173 @@
+"""Microbenchmark dos transportes de chamada ao processador
+
+Compara o transporte de referência (httpx) com o cliente mínimo sobre
+asyncio streams fazendo POST /payments contra um emulador local. O
+emulador roda num subprocesso para que o tempo de CPU medido seja só o
+do cliente.
+
+    latency   p50/p99 por requisição (segundos, relógio de parede)
+    rps       requisições por segundo com --concurrency chamadas simultâneas
+    cpu/req   tempo de CPU do cliente por requisição (µs)
+
+Uso:
+
+    python -m bench.transport --requests 5000 --concurrency 32
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import subprocess
+import sys
+import time
+from typing import Dict, List
+
+import httpx
+import orjson
+
+from app.services.core.transport import HttpxTransport, StreamTransport
+from bench.loadgen import percentile
+
+
+def spawn_emulator(port: int) -> subprocess.Popen:
+    """Sobe o emulador sem latência artificial num subprocesso"""
+    return subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "processors",
+            "--port",
+            str(port),
+            "--latency",
+            "fixed:0",
+        ],
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+
+
+async def wait_ready(url: str, timeout: float = 10.0) -> None:
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as client:
+        while True:
+            try:
+                await client.post(f"{url}/admin/purge-payments")
+                return
+            except httpx.HTTPError:
+                if time.monotonic() > deadline:
+                    raise
+                await asyncio.sleep(0.1)
+
+
+async def measure(transport, url: str, requests: int, concurrency: int, ids) -> Dict:
+    """Dispara `requests` POSTs com `concurrency` chamadas simultâneas"""
+    latencies: List[float] = []
+    errors = 0
+    pending = iter(range(requests))
+
+    async def worker():
+        nonlocal errors
+        for _ in pending:
+            body = orjson.dumps(
+                {"amount": 10.5, "currency": "BRL", "external_id": str(next(ids))}
+            )
+            start = time.perf_counter()
+            status, _ = await transport.post_json(url, body)
+            latencies.append(time.perf_counter() - start)
+            if status >= 400:
+                errors += 1
+
+    # Aquecimento: abre conexões e popula caches antes de medir
+    for _ in range(concurrency):
+        await transport.post_json(
+            url,
+            orjson.dumps(
+                {"amount": 1, "currency": "BRL", "external_id": str(next(ids))}
+            ),
+        )
+
+    cpu = time.process_time()
+    wall = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    wall = time.perf_counter() - wall
+    cpu = time.process_time() - cpu
+
+    return {
+        "transport": transport.name,
+        "requests": requests,
+        "concurrency": concurrency,
+        "errors": errors,
+        "rps": round(requests / wall, 1),
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 3),
+        "cpu_us_per_request": round(cpu / requests * 1e6, 1),
+    }
+
+
+async def run(args) -> List[Dict]:
+    base = f"http://127.0.0.1:{args.port}"
+    emulator = spawn_emulator(args.port) if args.spawn else None
+    try:
+        await wait_ready(base)
+        url = f"{base}/payments"
+        ids = itertools.count()
+        results = []
+
+        for _ in range(args.rounds):
+            client = httpx.AsyncClient(
+                timeout=10.0,
+                limits=httpx.Limits(
+                    max_connections=args.concurrency,
+                    max_keepalive_connections=args.concurrency,
+                ),
+            )
+            for transport in (
+                HttpxTransport(client),
+                StreamTransport(pool_size=args.concurrency, timeout=10.0),
+            ):
+                results.append(
+                    await measure(transport, url, args.requests, args.concurrency, ids)
+                )
+                await transport.close()
+            await client.aclose()
+        return results
+    finally:
+        if emulator is not None:
+            emulator.terminate()
+            emulator.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Processor transport microbenchmark")
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--rounds", type=int, default=1)
+    parser.add_argument("--port", type=int, default=3099)
+    parser.add_argument(
+        "--no-spawn",
+        dest="spawn",
+        action="store_false",
+        help="use an emulator already listening on --port",
+    )
+    parser.add_argument("--json", action="store_true", help="print JSON report")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    for item in results:
+        print(
+            f"{item['transport']:<8} {item['rps']:>9.1f} req/s"
+            f"  p50 {item['p50_ms']:>7.3f} ms  p99 {item['p99_ms']:>7.3f} ms"
+            f"  cpu {item['cpu_us_per_request']:>7.1f} µs/req"
+            f"  errors {item['errors']}"
+        )
+
+
+if __name__ == "__main__":
+    main()
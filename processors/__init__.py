@@ -0,0 +1,4 @@
+from processors.emulator import EmulatorConfig, ProcessorEmulator
+
+
+__all__ = ["EmulatorConfig", "ProcessorEmulator"]
@@ -0,0 +1,41 @@
+import argparse
+import asyncio
+
+from processors.emulator import EmulatorConfig, ProcessorEmulator
+
+
+def main():
+    """Executa um emulador (configurável por env ou argumentos)"""
+    defaults = EmulatorConfig.from_env()
+    parser = argparse.ArgumentParser(description="Payment processor emulator")
+    parser.add_argument("--port", type=int, default=defaults.port)
+    parser.add_argument("--name", default=defaults.name)
+    parser.add_argument("--fee", type=float, default=defaults.fee)
+    parser.add_argument("--latency", default=defaults.latency)
+    parser.add_argument("--failure-rate", type=float, default=defaults.failure_rate)
+    parser.add_argument("--failure-windows", default=defaults.failure_windows)
+    parser.add_argument("--slow-windows", default=defaults.slow_windows)
+    parser.add_argument("--response-stall", default=defaults.response_stall)
+    parser.add_argument(
+        "--health-rate-limit", type=float, default=defaults.health_rate_limit
+    )
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    config = EmulatorConfig(
+        port=args.port,
+        name=args.name,
+        fee=args.fee,
+        latency=args.latency,
+        failure_rate=args.failure_rate,
+        failure_windows=args.failure_windows,
+        slow_windows=args.slow_windows,
+        response_stall=args.response_stall,
+        health_rate_limit=args.health_rate_limit,
+        seed=args.seed,
+    )
+    asyncio.run(ProcessorEmulator(config).serve_forever())
+
+
+if __name__ == "__main__":
+    main()
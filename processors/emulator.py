@@ -0,0 +1,317 @@
+"""Emulador local de processador de pagamentos (somente stdlib)
+
+Atende o mesmo contrato usado pelo PaymentProcessor:
+
+    POST /payments                 {"amount", "currency", "external_id"}
+    GET  /payments/{external_id}   consulta (404 se não existir)
+    GET  /health                   {"failing", "minResponseTime"} com rate limit
+    GET  /admin/payments-summary   totais para checar consistência (?from=&to=)
+    POST /admin/purge-payments     zera o estado
+
+Configuração por variáveis de ambiente (ou argumentos de `python -m processors`):
+
+    PORT                  porta (3001)
+    PROCESSOR_NAME        nome exibido nos logs
+    FEE                   taxa por transação (0.05)
+    LATENCY               fixed:MS | uniform:LO:HI | exp:MEAN | lognormal:MEDIAN:SIGMA
+    FAILURE_RATE          probabilidade de HTTP 500 fora das janelas (0.0)
+    FAILURE_WINDOWS       janelas de falha total (s desde o start): "10-20,40-45"
+    SLOW_WINDOWS          janelas com latência extra: "30-40:800" (ms)
+    RESPONSE_STALL        cobra e só então segura a resposta: "0.05:2000" (prob:ms)
+    HEALTH_RATE_LIMIT_S   intervalo mínimo entre chamadas ao /health (5)
+"""
+
+import asyncio
+import json
+import math
+import os
+import random
+import time
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qsl
+
+
+REASONS = {
+    200: "OK",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    422: "Unprocessable Entity",
+    429: "Too Many Requests",
+    500: "Internal Server Error",
+}
+
+
+def parse_latency(spec: str) -> Callable[[random.Random], float]:
+    """Converte a especificação de latência num sorteador (segundos)"""
+    kind, *args = spec.split(":")
+    values = [float(arg) for arg in args]
+
+    if kind == "fixed":
+        return lambda rng: values[0] / 1000
+    if kind == "uniform":
+        return lambda rng: rng.uniform(values[0], values[1]) / 1000
+    if kind == "exp":
+        return lambda rng: rng.expovariate(1000 / values[0])
+    if kind == "lognormal":
+        mu = math.log(values[0] / 1000)
+        return lambda rng: rng.lognormvariate(mu, values[1])
+    raise ValueError(f"Unknown latency distribution: {spec}")
+
+
+def parse_windows(spec: str) -> List[Tuple[float, float, float]]:
+    """Converte "10-20,30-40:800" em [(inicio, fim, extra_ms), ...]"""
+    windows = []
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        span, _, extra = item.partition(":")
+        start, end = span.split("-")
+        windows.append((float(start), float(end), float(extra or 0)))
+    return windows
+
+
+def parse_datetime(value: Optional[str]) -> Optional[datetime]:
+    if not value:
+        return None
+    return datetime.fromisoformat(value)
+
+
+class WallClock:
+    """Relógio real; o simulador (bench.simulate) injeta um virtual"""
+
+    monotonic = staticmethod(time.monotonic)
+
+    @staticmethod
+    def now() -> datetime:
+        return datetime.now(timezone.utc)
+
+
+@dataclass
+class EmulatorConfig:
+    port: int = 3001
+    name: str = "processor"
+    fee: float = 0.05
+    latency: str = "lognormal:20:0.4"
+    failure_rate: float = 0.0
+    failure_windows: str = ""
+    slow_windows: str = ""
+    response_stall: str = ""
+    health_rate_limit: float = 5.0
+    seed: Optional[int] = None
+
+    @classmethod
+    def from_env(cls) -> "EmulatorConfig":
+        env = os.environ
+        return cls(
+            port=int(env.get("PORT", cls.port)),
+            name=env.get("PROCESSOR_NAME", cls.name),
+            fee=float(env.get("FEE", cls.fee)),
+            latency=env.get("LATENCY", cls.latency),
+            failure_rate=float(env.get("FAILURE_RATE", cls.failure_rate)),
+            failure_windows=env.get("FAILURE_WINDOWS", cls.failure_windows),
+            slow_windows=env.get("SLOW_WINDOWS", cls.slow_windows),
+            response_stall=env.get("RESPONSE_STALL", cls.response_stall),
+            health_rate_limit=float(
+                env.get("HEALTH_RATE_LIMIT_S", cls.health_rate_limit)
+            ),
+        )
+
+
+@dataclass
+class ProcessedPayment:
+    external_id: str
+    amount: float
+    fee: float
+    requested_at: datetime
+    id: str = field(default_factory=lambda: str(uuid.uuid4()))
+
+
+class ProcessorEmulator:
+    """Servidor HTTP/1.1 keep-alive mínimo que emula um processador"""
+
+    def __init__(self, config: EmulatorConfig, clock=None):
+        self.config = config
+        self.clock = clock or WallClock()
+        self.rng = random.Random(config.seed)
+        self.sample_latency = parse_latency(config.latency)
+        self.failure_windows = parse_windows(config.failure_windows)
+        self.slow_windows = parse_windows(config.slow_windows)
+        rate, _, stall_ms = (config.response_stall or "0:0").partition(":")
+        self.stall_rate, self.stall = float(rate), float(stall_ms or 0) / 1000
+        self.payments: Dict[str, ProcessedPayment] = {}
+        self.started_at = self.clock.monotonic()
+        self.last_health_call = -math.inf
+        self.server: Optional[asyncio.base_events.Server] = None
+
+    # Estado dinâmico -------------------------------------------------------
+
+    def elapsed(self) -> float:
+        return self.clock.monotonic() - self.started_at
+
+    def failing(self) -> bool:
+        now = self.elapsed()
+        return any(start <= now < end for start, end, _ in self.failure_windows)
+
+    def extra_latency(self) -> float:
+        now = self.elapsed()
+        return (
+            sum(extra for start, end, extra in self.slow_windows if start <= now < end)
+            / 1000
+        )
+
+    def min_response_time(self) -> int:
+        """Estimativa do piso de latência atual (ms), como no /health real"""
+        base = min(self.sample_latency(self.rng) for _ in range(16))
+        return int((base + self.extra_latency()) * 1000)
+
+    # Servidor --------------------------------------------------------------
+
+    async def start(self, host: str = "127.0.0.1") -> None:
+        self.started_at = self.clock.monotonic()
+        self.server = await asyncio.start_server(
+            self._serve_connection, host, self.config.port
+        )
+        # Porta 0: usa a que o sistema escolheu
+        self.config.port = self.server.sockets[0].getsockname()[1]
+
+    async def stop(self) -> None:
+        if self.server is not None:
+            self.server.close()
+            # wait_closed espera as conexões; keep-alives ociosos são fechados aqui
+            self.server.close_clients()
+            await self.server.wait_closed()
+
+    async def serve_forever(self, host: str = "0.0.0.0") -> None:
+        await self.start(host)
+        print(f"{self.config.name} listening on {host}:{self.config.port}")
+        async with self.server:
+            await self.server.serve_forever()
+
+    async def _serve_connection(self, reader, writer) -> None:
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, target, _ = request_line.decode().split(" ", 2)
+
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode().partition(":")
+                    headers[name.strip().lower()] = value.strip()
+
+                length = int(headers.get("content-length", 0))
+                body = await reader.readexactly(length) if length else b""
+
+                status, payload = await self.handle(method, target, body)
+                data = json.dumps(payload).encode()
+                writer.write(
+                    f"HTTP/1.1 {status} {REASONS.get(status, 'OK')}\r\n"
+                    f"content-type: application/json\r\n"
+                    f"content-length: {len(data)}\r\n\r\n".encode()
+                    + data
+                )
+                await writer.drain()
+
+                if headers.get("connection", "").lower() == "close":
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    # Rotas -----------------------------------------------------------------
+
+    async def handle(self, method: str, target: str, body: bytes):
+        path, _, query = target.partition("?")
+        params = dict(parse_qsl(query))
+
+        if path == "/payments" and method == "POST":
+            return await self.create_payment(body)
+        if path.startswith("/payments/") and method == "GET":
+            payment = self.payments.get(path[len("/payments/") :])
+            if payment is None:
+                return 404, {"message": "payment not found"}
+            return 200, self._payment_json(payment)
+        if path == "/health" and method == "GET":
+            return self.health()
+        if path == "/admin/payments-summary" and method == "GET":
+            return 200, self.summary(params.get("from"), params.get("to"))
+        if path == "/admin/purge-payments" and method == "POST":
+            self.payments.clear()
+            return 200, {"message": "All payments purged."}
+        return 404, {"message": "not found"}
+
+    async def create_payment(self, body: bytes):
+        try:
+            data = json.loads(body)
+            external_id = str(data["external_id"])
+            amount = float(data["amount"])
+        except (ValueError, KeyError, TypeError):
+            return 422, {"message": "invalid payload"}
+
+        await asyncio.sleep(self.sample_latency(self.rng) + self.extra_latency())
+
+        if self.failing() or self.rng.random() < self.config.failure_rate:
+            return 500, {"message": "processor failure"}
+
+        # Mesmo external_id não é cobrado duas vezes
+        existing = self.payments.get(external_id)
+        if existing is not None:
+            return 422, {"message": "payment already processed", "id": existing.id}
+
+        payment = ProcessedPayment(
+            external_id=external_id,
+            amount=amount,
+            fee=amount * self.config.fee,
+            requested_at=self.clock.now(),
+        )
+        self.payments[external_id] = payment
+
+        # Cobrado, mas a resposta demora (o cliente só descobre consultando)
+        if self.stall_rate and self.rng.random() < self.stall_rate:
+            await asyncio.sleep(self.stall)
+        return 200, {"id": payment.id, "message": "payment processed successfully"}
+
+    def health(self):
+        now = self.clock.monotonic()
+        if now - self.last_health_call < self.config.health_rate_limit:
+            return 429, {"message": "too many requests"}
+        self.last_health_call = now
+        return 200, {
+            "failing": self.failing(),
+            "minResponseTime": self.min_response_time(),
+        }
+
+    def summary(self, start: Optional[str], end: Optional[str]):
+        start_at, end_at = parse_datetime(start), parse_datetime(end)
+        count = 0
+        amount = 0.0
+        fee = 0.0
+        for payment in self.payments.values():
+            if start_at and payment.requested_at < start_at:
+                continue
+            if end_at and payment.requested_at > end_at:
+                continue
+            count += 1
+            amount += payment.amount
+            fee += payment.fee
+        return {
+            "totalRequests": count,
+            "totalAmount": round(amount, 2),
+            "totalFee": round(fee, 2),
+            "feePerTransaction": self.config.fee,
+        }
+
+    @staticmethod
+    def _payment_json(payment: ProcessedPayment):
+        return {
+            "id": payment.id,
+            "external_id": payment.external_id,
+            "amount": payment.amount,
+            "requestedAt": payment.requested_at.isoformat(),
+        }
@@ -0,0 +1,7 @@
+import os
+
+# Testes de banco só rodam com TEST_DATABASE_URL (um Postgres descartável: as
+# tabelas são esvaziadas). O engine é criado na importação de app.*, então a
+# URL precisa estar no ambiente antes disso.
+if os.environ.get("TEST_DATABASE_URL"):
+    os.environ["DATABASE_URL"] = os.environ["TEST_DATABASE_URL"]
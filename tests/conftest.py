@@ -0,0 +1,45 @@
+import asyncio
+import os
+
+import pytest
+
+from app.core.clock import VirtualClock
+from app.core.config import settings
+from app.core.database import engine, init_db
+
+
+@pytest.fixture
+def clock() -> VirtualClock:
+    return VirtualClock()
+
+
+@pytest.fixture
+def run_virtual(clock):
+    """Roda uma corrotina num event loop com o relógio virtual"""
+
+    def run(coro):
+        with asyncio.Runner(loop_factory=clock.new_event_loop) as runner:
+            return runner.run(coro)
+
+    return run
+
+
+@pytest.fixture
+def isolated_state(tmp_path, monkeypatch):
+    """Estado compartilhado (health, circuitos, contadores) sob tmp_path"""
+    monkeypatch.setattr(settings, "health_state_path", str(tmp_path / "health"))
+    monkeypatch.setattr(settings, "shared_state_dir", str(tmp_path))
+    return tmp_path
+
+
+@pytest.fixture
+async def database():
+    """Postgres de TEST_DATABASE_URL com as tabelas criadas e vazias"""
+    if not os.environ.get("TEST_DATABASE_URL"):
+        pytest.skip("TEST_DATABASE_URL not set")
+
+    await init_db()
+    async with engine.begin() as connection:
+        await connection.exec_driver_sql("TRUNCATE payments, payment_rollups")
+    yield engine
+    await engine.dispose()
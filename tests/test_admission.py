@@ -0,0 +1,70 @@
+import pytest
+
+from app.core.clock import VirtualClock
+from app.services.core.admission import AdmissionController
+from app.services.core.queue import PAYMENTS_PROCESSED
+
+
+class Processor:
+    def __init__(self, available: bool = True):
+        self.processors = {0: {}}
+        self.available = available
+
+    def is_available(self, processor_id: int) -> bool:
+        return self.available
+
+
+class QueueManager:
+    """Só o que a admissão lê: profundidade total e idade da cabeça"""
+
+    def __init__(self, depth: int = 0, head_age: float = 0.0, available: bool = True):
+        self._depth = depth
+        self._head_age = head_age
+        self.processor = Processor(available)
+        self.clock = VirtualClock()
+
+    def depth(self) -> int:
+        return self._depth
+
+    def head_age(self) -> float:
+        return self._head_age
+
+
+def controller(queue_manager) -> AdmissionController:
+    return AdmissionController(
+        queue_manager, slo_ms=1000, min_depth=10, max_depth=1000, alpha=0.5
+    )
+
+
+def test_admits_below_min_depth():
+    assert controller(QueueManager(depth=5, head_age=60)).check() is None
+
+
+def test_sheds_overload_when_backlog_is_old():
+    rejection = controller(QueueManager(depth=50, head_age=5)).check()
+    assert rejection.status == 429
+    assert rejection.reason == "overload"
+    assert rejection.retry_after >= 1
+
+
+def test_deep_but_fresh_queue_is_admitted():
+    assert controller(QueueManager(depth=50, head_age=0.1)).check() is None
+
+
+def test_unavailable_and_full():
+    assert controller(QueueManager(depth=50, available=False)).check().status == 503
+    rejection = controller(QueueManager(depth=1000)).check()
+    assert (rejection.status, rejection.reason) == (503, "queue_full")
+
+
+def test_drain_rate_is_sampled_on_the_injected_clock():
+    queue_manager = QueueManager(depth=5)
+    admission = controller(queue_manager)
+
+    PAYMENTS_PROCESSED.inc(100)
+    admission.check()
+    assert admission.drain_rate == 0.0
+
+    queue_manager.clock.advance(2.0)
+    admission.check()
+    assert admission.drain_rate == pytest.approx(0.5 * 100 / 2.0)
@@ -0,0 +1,39 @@
+from bench.micro import compare
+
+
+def result(score: float, spread: float = 0.05, alloc: float = 100.0) -> dict:
+    return {
+        "ops_per_s": score * 1e6,
+        "score": score,
+        "spread": spread,
+        "alloc_bytes": alloc,
+    }
+
+
+def status(current: dict, base: dict, **options) -> str:
+    (row,) = compare({"case": current}, {"case": base}, 0.25, 0.10, **options)
+    return row["status"]
+
+
+def test_drop_beyond_tolerance_is_a_regression():
+    assert status(result(0.5), result(1.0)).startswith("REGRESSION (slower")
+    assert status(result(0.8), result(1.0)) == "ok"
+    assert status(result(1.5), result(1.0)) == "faster"
+
+
+def test_drop_within_measured_spread_is_noise():
+    assert status(result(0.6, spread=0.5), result(1.0)) == "ok"
+    assert status(result(0.6), result(1.0, spread=0.5)) == "ok"
+    assert status(result(0.4, spread=0.5), result(1.0)).startswith("REGRESSION")
+
+
+def test_other_environment_only_gates_allocations():
+    assert status(result(0.1), result(1.0), gate_speed=False) == "ok"
+    assert status(result(0.1, alloc=500), result(1.0), gate_speed=False) == (
+        "REGRESSION (allocs)"
+    )
+
+
+def test_baseline_without_score_is_new():
+    (row,) = compare({"case": result(1.0)}, {"case": {"ops_per_s": 1.0}}, 0.25, 0.10)
+    assert row["status"] == "new"
@@ -0,0 +1,143 @@
+import asyncio
+
+import pytest
+
+from app.services.core.circuit import CircuitBreaker, CircuitOpenError, CircuitState
+
+
+def breaker(clock, **overrides) -> CircuitBreaker:
+    options = dict(
+        window=10,
+        min_calls=4,
+        failure_rate=0.5,
+        slow_rate=0.8,
+        slow_call_ms=1000,
+        open_seconds=5.0,
+        half_open_probes=2,
+        clock=clock,
+    )
+    options.update(overrides)
+    return CircuitBreaker("test", **options)
+
+
+async def ok():
+    return "ok"
+
+
+async def fail():
+    raise RuntimeError("processor error")
+
+
+def test_opens_on_failure_rate_after_min_calls(clock, run_virtual):
+    subject = breaker(clock)
+
+    async def scenario():
+        for _ in range(3):
+            with pytest.raises(RuntimeError):
+                await subject.call(fail)
+        # Abaixo de min_calls: ainda fechado
+        assert subject.state == CircuitState.CLOSED
+        with pytest.raises(RuntimeError):
+            await subject.call(fail)
+        assert subject.state == CircuitState.OPEN
+
+        with pytest.raises(CircuitOpenError):
+            await subject.call(ok)
+
+    run_virtual(scenario())
+
+
+def test_window_slides_out_old_failures(clock, run_virtual):
+    subject = breaker(clock)
+
+    async def scenario():
+        for _ in range(3):
+            with pytest.raises(RuntimeError):
+                await subject.call(fail)
+            for _ in range(3):
+                await subject.call(ok)
+        # 3 falhas em 12 chamadas: a primeira já saiu da janela (10)
+        assert (subject.count, subject.failures) == (10, 2)
+        assert subject.state == CircuitState.CLOSED
+
+        for _ in range(10):
+            await subject.call(ok)
+        assert subject.failures == 0
+
+    run_virtual(scenario())
+
+
+def test_opens_on_slow_calls(clock, run_virtual):
+    subject = breaker(clock)
+
+    async def slow():
+        await asyncio.sleep(1.5)
+
+    async def scenario():
+        for _ in range(4):
+            await subject.call(slow)
+        assert subject.state == CircuitState.OPEN
+
+    run_virtual(scenario())
+
+
+def test_half_open_admits_bounded_probes_and_closes(clock, run_virtual):
+    subject = breaker(clock)
+
+    async def scenario():
+        for _ in range(4):
+            with pytest.raises(RuntimeError):
+                await subject.call(fail)
+        assert not subject.is_healthy
+
+        await asyncio.sleep(5.0)
+        assert subject.is_healthy
+
+        release = asyncio.Event()
+
+        async def probe():
+            await release.wait()
+
+        probes = [asyncio.create_task(subject.call(probe)) for _ in range(2)]
+        await asyncio.sleep(0)
+        assert subject.state == CircuitState.HALF_OPEN
+        # Vagas de probe esgotadas
+        with pytest.raises(CircuitOpenError):
+            await subject.call(ok)
+
+        release.set()
+        await asyncio.gather(*probes)
+        assert subject.state == CircuitState.CLOSED
+
+    run_virtual(scenario())
+
+
+def test_half_open_failure_reopens(clock, run_virtual):
+    subject = breaker(clock)
+
+    async def scenario():
+        subject.on_health(failing=True)
+        assert subject.state == CircuitState.OPEN
+        subject.on_health(failing=False)
+        assert subject.state == CircuitState.HALF_OPEN
+
+        with pytest.raises(RuntimeError):
+            await subject.call(fail)
+        assert subject.state == CircuitState.OPEN
+
+    run_virtual(scenario())
+
+
+def test_shared_state_between_breakers(clock, run_virtual, tmp_path):
+    path = str(tmp_path / "circuit")
+    first = breaker(clock, state_path=path)
+    second = breaker(clock, state_path=path)
+
+    async def scenario():
+        for _ in range(4):
+            with pytest.raises(RuntimeError):
+                await first.call(fail)
+        with pytest.raises(CircuitOpenError):
+            await second.call(ok)
+
+    run_virtual(scenario())
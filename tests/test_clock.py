@@ -0,0 +1,35 @@
+import asyncio
+import time
+from datetime import timedelta
+
+import pytest
+
+
+def test_sleeps_advance_virtual_time_without_waiting(clock, run_virtual):
+    async def scenario():
+        await asyncio.gather(asyncio.sleep(3600), asyncio.sleep(60))
+        await asyncio.sleep(0.5)
+
+    started = time.monotonic()
+    run_virtual(scenario())
+
+    assert time.monotonic() - started < 1
+    assert clock.monotonic() - clock.ORIGIN == pytest.approx(3600.5)
+    assert clock.now() == clock.start + timedelta(seconds=3600.5)
+
+
+def test_wait_for_times_out_in_virtual_time(clock, run_virtual):
+    async def scenario():
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(asyncio.Event().wait(), timeout=30)
+        return asyncio.get_running_loop().time()
+
+    assert run_virtual(scenario()) == pytest.approx(clock.ORIGIN + 30)
+
+
+def test_idle_loop_still_wakes_for_other_threads(clock, run_virtual):
+    async def scenario():
+        return await asyncio.to_thread(lambda: time.sleep(0.01) or "done")
+
+    assert run_virtual(scenario()) == "done"
+    assert clock.monotonic() == clock.ORIGIN
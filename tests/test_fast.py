@@ -0,0 +1,115 @@
+import orjson
+import pytest
+from fastapi import FastAPI
+
+from app.routes.fast import FastPathApp
+from app.routes.payments import SHED_DETAILS
+from app.services.core.admission import Rejection
+
+
+def http_scope(method: str, path: str, query: bytes = b"") -> dict:
+    return {"type": "http", "method": method, "path": path, "query_string": query}
+
+
+async def call(app, scope, body: bytes = b"", messages=None):
+    messages = [] if messages is None else messages
+
+    async def receive():
+        return {"type": "http.request", "body": body, "more_body": False}
+
+    async def send(message):
+        messages.append(message)
+
+    await app(scope, receive, send)
+    return messages
+
+
+async def test_handler_error_before_the_response_is_a_500():
+    fast = FastPathApp(FastAPI())
+
+    async def broken(scope, receive, send):
+        raise RuntimeError("boom")
+
+    fast.handlers[("GET", "/payment-summary")] = broken
+    messages = await call(fast, http_scope("GET", "/payment-summary"))
+
+    assert messages[0]["status"] == 500
+    assert orjson.loads(messages[1]["body"]) == {"detail": "Internal server error"}
+
+
+async def test_handler_error_after_the_response_started_is_reraised():
+    fast = FastPathApp(FastAPI())
+
+    async def broken_midway(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        raise RuntimeError("boom")
+
+    fast.handlers[("GET", "/payment-summary")] = broken_midway
+    messages = []
+    with pytest.raises(RuntimeError):
+        await call(fast, http_scope("GET", "/payment-summary"), messages=messages)
+    assert [m["type"] for m in messages] == ["http.response.start"]
+
+
+def app_with_state(**state) -> FastAPI:
+    app = FastAPI()
+    for name, value in state.items():
+        setattr(app.state, name, value)
+    return app
+
+
+@pytest.mark.parametrize(
+    "body",
+    [
+        b"not json",
+        b"{}",
+        b'{"amount": true}',
+        b'{"amount": "10"}',
+        b'{"amount": 0}',
+        b'{"amount": 10, "currency": "REAL"}',
+        b'{"amount": 10, "currency": 1}',
+        b"[1]",
+    ],
+)
+async def test_invalid_payment_payload_is_a_422(body):
+    fast = FastPathApp(app_with_state(admission=None))
+    messages = await call(fast, http_scope("POST", "/payments"), body)
+
+    assert messages[0]["status"] == 422
+    assert orjson.loads(messages[1]["body"]) == {"detail": "Invalid payment payload"}
+
+
+async def test_shed_payment_gets_the_status_and_retry_after():
+    class Shedding:
+        def check(self):
+            return Rejection(503, 2, "unavailable")
+
+    fast = FastPathApp(app_with_state(admission=Shedding()))
+    messages = await call(fast, http_scope("POST", "/payments"), b'{"amount": 10}')
+
+    assert messages[0]["status"] == 503
+    assert (b"retry-after", b"2") in messages[0]["headers"]
+    assert orjson.loads(messages[1]["body"])["detail"] == SHED_DETAILS["unavailable"]
+
+
+async def test_invalid_summary_range_is_a_422():
+    fast = FastPathApp(FastAPI())
+    scope = http_scope("GET", "/payment-summary", b"from=yesterday")
+    messages = await call(fast, scope)
+
+    assert messages[0]["status"] == 422
+    assert orjson.loads(messages[1]["body"]) == {"detail": "Invalid from/to parameters"}
+
+
+async def test_other_routes_fall_through_to_the_app():
+    seen = []
+
+    async def app(scope, receive, send):
+        seen.append((scope["method"], scope["path"]))
+        await send({"type": "http.response.start", "status": 204, "headers": []})
+
+    fast = FastPathApp(app)
+    messages = await call(fast, http_scope("GET", "/payments/1"))
+
+    assert seen == [("GET", "/payments/1")]
+    assert messages[0]["status"] == 204
@@ -0,0 +1,95 @@
+import asyncio
+
+import httpx
+
+from app.services.health import HealthCheckService
+
+URLS = {0: "http://p1/health", 1: "http://p2/health"}
+
+
+class Client:
+    """Responde /health com (status, corpo) configuráveis por URL"""
+
+    def __init__(self, responses):
+        self.responses = responses
+        self.calls = []
+
+    async def get(self, url, timeout=None):
+        self.calls.append(url)
+        status, payload = self.responses[url]
+        return httpx.Response(status, json=payload, request=httpx.Request("GET", url))
+
+
+def healthy(min_response_time: int = 0):
+    return 200, {"failing": False, "minResponseTime": min_response_time}
+
+
+def test_only_the_leader_polls_and_followers_see_its_result(
+    tmp_path, clock, run_virtual
+):
+    path = str(tmp_path / "health")
+    leader_client = Client({URLS[0]: (200, {"failing": True}), URLS[1]: healthy(40)})
+    follower_client = Client({})
+
+    async def scenario():
+        leader = HealthCheckService(leader_client, URLS, state_path=path, clock=clock)
+        follower = HealthCheckService(
+            follower_client, URLS, state_path=path, clock=clock
+        )
+        seen = []
+        follower.listeners.append(
+            lambda pid, status: seen.append((pid, status.failing))
+        )
+
+        await leader.start()
+        await follower.start()
+        await asyncio.sleep(1)
+        await follower.stop()
+        await leader.stop()
+        return follower, seen
+
+    follower, seen = run_virtual(scenario())
+    assert sorted(leader_client.calls) == sorted(URLS.values())
+    assert follower_client.calls == []
+    assert follower.get(0).failing and not follower.get(1).failing
+    assert follower.get(1).min_response_time == 40
+    assert sorted(seen) == [(0, True), (1, False)]
+
+
+def test_rate_limited_check_keeps_the_last_known_state(tmp_path, clock, run_virtual):
+    client = Client({URLS[0]: healthy(25), URLS[1]: healthy()})
+
+    async def scenario():
+        service = HealthCheckService(
+            client, URLS, state_path=str(tmp_path / "health"), clock=clock
+        )
+        await service.start()
+        await asyncio.sleep(1)
+        first = service.get(0)
+
+        client.responses[URLS[0]] = (429, {})
+        await asyncio.sleep(service.interval + 1)
+        await service.stop()
+        return first, service.get(0)
+
+    first, after = run_virtual(scenario())
+    assert client.calls.count(URLS[0]) == 2
+    assert after.checked_at > first.checked_at
+    assert (after.failing, after.min_response_time) == (False, 25)
+
+
+def test_unreachable_processor_is_failing(tmp_path, clock, run_virtual):
+    class Down(Client):
+        async def get(self, url, timeout=None):
+            raise httpx.ConnectError("refused")
+
+    async def scenario():
+        service = HealthCheckService(
+            Down({}), URLS, state_path=str(tmp_path / "health"), clock=clock
+        )
+        await service.start()
+        await asyncio.sleep(1)
+        await service.stop()
+        return service.get(0)
+
+    assert run_virtual(scenario()).failing
@@ -0,0 +1,176 @@
+import asyncio
+
+import pytest
+
+from app.services.core.hedge import HedgePolicy, LatencyWindow
+from app.services.core.transport import TransportError
+
+
+def policy(clock, warm: bool = True) -> HedgePolicy:
+    hedge = HedgePolicy((0,), quantile=0.95, min_delay_ms=50, window=64, clock=clock)
+    if warm:
+        for _ in range(64):
+            hedge.windows[0].observe(0.1)
+    return hedge
+
+
+def test_latency_window_quantile():
+    window = LatencyWindow(size=100, quantile=0.95, refresh=100)
+    for i in range(100):
+        window.observe(i / 1000)
+    assert window.value == pytest.approx(0.095)
+
+
+def test_no_hedge_until_the_window_has_samples(clock):
+    assert policy(clock, warm=False).delay(0) is None
+    assert policy(clock).delay(0) == pytest.approx(0.1)
+
+
+def test_fast_call_is_not_hedged(clock, run_virtual):
+    probes = []
+
+    async def scenario():
+        async def request():
+            await asyncio.sleep(0.01)
+            return {"id": "fast"}
+
+        async def probe():
+            probes.append(1)
+
+        return await policy(clock).call(0, request(), probe)
+
+    assert run_virtual(scenario()) == {"id": "fast"}
+    assert probes == []
+
+
+def test_slow_call_is_resolved_by_the_probe(clock, run_virtual):
+    cancelled = []
+
+    async def scenario():
+        async def request():
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.append(1)
+                raise
+
+        async def probe():
+            return {"id": "found"}
+
+        return await policy(clock).call(0, request(), probe)
+
+    assert run_virtual(scenario()) == {"id": "found"}
+    assert cancelled == [1]
+
+
+def test_probe_miss_waits_for_the_original_call(clock, run_virtual):
+    async def scenario():
+        async def request():
+            await asyncio.sleep(0.5)
+            return {"id": "primary"}
+
+        async def probe():
+            return None
+
+        return await policy(clock).call(0, request(), probe)
+
+    assert run_virtual(scenario()) == {"id": "primary"}
+
+
+def test_failure_without_response_is_confirmed_by_probe(clock, run_virtual):
+    async def scenario():
+        async def request():
+            raise ConnectionResetError("dropped after write")
+
+        async def probe():
+            return {"id": "charged"}
+
+        return await policy(clock, warm=False).call(0, request(), probe)
+
+    assert run_virtual(scenario()) == {"id": "charged"}
+
+
+def test_http_error_is_not_probed(clock, run_virtual):
+    probes = []
+
+    async def scenario():
+        async def request():
+            raise TransportError("HTTP 500", 500)
+
+        async def probe():
+            probes.append(1)
+            return {"id": "unexpected"}
+
+        return await policy(clock, warm=False).call(0, request(), probe)
+
+    with pytest.raises(TransportError):
+        run_virtual(scenario())
+    assert probes == []
+
+
+def test_probe_miss_is_retried_until_the_payment_shows_up(clock, run_virtual):
+    probes = []
+    origin = clock.monotonic()
+
+    async def scenario():
+        async def request():
+            await asyncio.sleep(10)
+
+        async def probe():
+            probes.append(clock.monotonic() - origin)
+            return {"id": "late"} if len(probes) == 3 else None
+
+        return await policy(clock).call(0, request(), probe)
+
+    assert run_virtual(scenario()) == {"id": "late"}
+    # Intervalos dobrando a partir do atraso (0.1 s): 0.1, 0.3, 0.7
+    assert probes == pytest.approx([0.1, 0.3, 0.7], abs=1e-6)
+
+
+def test_probes_stop_at_max_probes(clock, run_virtual):
+    probes = []
+
+    async def scenario():
+        async def request():
+            await asyncio.sleep(5)
+            return {"id": "primary"}
+
+        async def probe():
+            probes.append(1)
+
+        hedge = policy(clock)
+        hedge.max_probes = 2
+        return await hedge.call(0, request(), probe)
+
+    assert run_virtual(scenario()) == {"id": "primary"}
+    assert len(probes) == 2
+
+
+def test_window_observes_hedge_wins_and_failures(clock, run_virtual):
+    hedge = policy(clock)
+    window = hedge.windows[0]
+
+    async def scenario():
+        async def slow():
+            await asyncio.sleep(10)
+
+        async def found():
+            return {"id": "found"}
+
+        async def failing():
+            await asyncio.sleep(0.02)
+            raise TransportError("HTTP 500", 500)
+
+        await hedge.call(0, slow(), found)
+        with pytest.raises(TransportError):
+            await hedge.call(0, failing(), found)
+
+    before = window.count
+    run_virtual(scenario())
+    assert window.count == before + 2
+    assert window.samples[(window.index - 2) % len(window.samples)] == pytest.approx(
+        0.1
+    )
+    assert window.samples[(window.index - 1) % len(window.samples)] == pytest.approx(
+        0.02
+    )
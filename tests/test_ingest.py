@@ -0,0 +1,73 @@
+import asyncio
+
+import pytest
+
+from app.models.record import PaymentRecord
+from app.services.core.ingest import IngestPipeline
+
+
+class Repository:
+    """Grava em memória e devolve ids sequenciais na ordem do lote"""
+
+    def __init__(self, fail: bool = False):
+        self.batches = []
+        self.fail = fail
+
+    async def insert(self, payments):
+        await asyncio.sleep(0.001)
+        if self.fail:
+            raise ConnectionError("database down")
+        self.batches.append([payment.cents for payment in payments])
+        start = sum(map(len, self.batches)) - len(payments)
+        return list(range(start + 1, start + len(payments) + 1))
+
+
+def test_full_batches_are_written_together_with_ids_in_order(run_virtual):
+    repository = Repository()
+
+    async def scenario():
+        pipeline = IngestPipeline(repository, batch_size=3, linger_ms=50, max_flushes=1)
+        await pipeline.start()
+        payments = await asyncio.gather(
+            *(pipeline.submit(PaymentRecord(cents)) for cents in range(1, 8))
+        )
+        await pipeline.stop()
+        return payments
+
+    payments = run_virtual(scenario())
+    assert repository.batches == [[1, 2, 3], [4, 5, 6], [7]]
+    assert [payment.id for payment in payments] == list(range(1, 8))
+
+
+def test_partial_batch_waits_for_the_linger(clock, run_virtual):
+    repository = Repository()
+
+    async def scenario():
+        pipeline = IngestPipeline(repository, batch_size=100, linger_ms=50)
+        await pipeline.start()
+        start = clock.monotonic()
+        payment = await pipeline.submit(PaymentRecord(500))
+        elapsed = clock.monotonic() - start
+        await pipeline.stop()
+        return payment, elapsed
+
+    payment, elapsed = run_virtual(scenario())
+    assert payment.id == 1
+    assert elapsed == pytest.approx(0.051)
+
+
+def test_failed_batch_fails_every_waiting_request(run_virtual):
+    async def scenario():
+        pipeline = IngestPipeline(Repository(fail=True), batch_size=2, linger_ms=50)
+        await pipeline.start()
+        results = await asyncio.gather(
+            pipeline.submit(PaymentRecord(1)),
+            pipeline.submit(PaymentRecord(2)),
+            return_exceptions=True,
+        )
+        await pipeline.stop()
+        return results
+
+    assert all(
+        isinstance(result, ConnectionError) for result in run_virtual(scenario())
+    )
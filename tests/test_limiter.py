@@ -0,0 +1,97 @@
+import asyncio
+
+import pytest
+
+from app.services.core.limiter import (
+    AdaptiveLimiter,
+    AIMDAlgorithm,
+    GradientAlgorithm,
+    create_algorithm,
+)
+
+
+def limiter(initial=4, algorithm=None) -> AdaptiveLimiter:
+    return AdaptiveLimiter(
+        initial, algorithm=algorithm or AIMDAlgorithm(), min_limit=2, max_limit=8
+    )
+
+
+def test_aimd_grows_when_used_and_backs_off_on_failure():
+    algorithm = AIMDAlgorithm()
+    assert algorithm.update(4.0, 0.01, True, in_flight=4) == pytest.approx(4.25)
+    # Limite ocioso não cresce
+    assert algorithm.update(4.0, 0.01, True, in_flight=1) == 4.0
+    assert algorithm.update(4.0, 0.01, False, in_flight=4) == pytest.approx(
+        4.0 * algorithm.backoff
+    )
+    slow = algorithm.slow_threshold + 1
+    assert algorithm.update(4.0, slow, True, in_flight=4) < 4.0
+
+
+def test_gradient_shrinks_when_latency_rises():
+    algorithm = GradientAlgorithm()
+    limit = 10.0
+    for _ in range(20):
+        limit = algorithm.update(limit, 0.01, True, in_flight=10)
+    grown = limit
+
+    for _ in range(20):
+        limit = algorithm.update(limit, 0.2, True, in_flight=int(limit))
+    assert limit < grown
+
+
+def test_unknown_algorithm_is_rejected():
+    with pytest.raises(ValueError):
+        create_algorithm("vegas")
+
+
+def test_limit_is_clamped():
+    subject = limiter(initial=100)
+    assert subject.limit == 8
+
+    for _ in range(50):
+        subject.in_flight += 1
+        subject.release(0.01, False)
+    assert subject.limit == 2
+
+
+async def test_permits_are_granted_in_fifo_order():
+    subject = limiter(initial=2)
+    assert await subject.acquire()
+    assert await subject.acquire()
+    assert subject.saturated
+
+    order = []
+
+    async def wait(name):
+        await subject.acquire()
+        order.append(name)
+
+    tasks = [asyncio.create_task(wait(name)) for name in ("a", "b")]
+    await asyncio.sleep(0)
+    assert subject.waiting == 2
+
+    subject.release(0.01, True)
+    subject.release(0.01, True)
+    await asyncio.gather(*tasks)
+    assert order == ["a", "b"]
+    assert subject.in_flight == 2
+
+
+async def test_acquire_timeout_leaves_queue_clean():
+    subject = limiter(initial=2)
+    await subject.acquire()
+    await subject.acquire()
+
+    assert not await subject.acquire(timeout=0.01)
+    assert subject.waiting == 0
+    assert subject.in_flight == 2
+
+
+async def test_discard_returns_permit_without_sample():
+    subject = limiter(initial=4)
+    await subject.acquire()
+
+    subject.discard()
+    assert subject.in_flight == 0
+    assert subject.limit == 4
@@ -0,0 +1,39 @@
+from app.core.config import settings
+from app.core.metrics import MetricsRegistry
+
+
+def sample_registry() -> MetricsRegistry:
+    registry = MetricsRegistry(prefix="t_")
+    registry.counter("requests_total", "Requests", ("outcome",)).labels("ok").inc(3)
+    registry.histogram("latency_seconds", "Latency", buckets=(0.1, 1.0)).observe(0.5)
+    registry.gauge("depth", "Depth", lambda: 7)
+    return registry
+
+
+def test_exposition_format():
+    assert sample_registry().render().splitlines() == [
+        "# HELP t_requests_total Requests",
+        "# TYPE t_requests_total counter",
+        't_requests_total{outcome="ok"} 3',
+        "# HELP t_latency_seconds Latency",
+        "# TYPE t_latency_seconds histogram",
+        't_latency_seconds_bucket{le="0.1"} 0',
+        't_latency_seconds_bucket{le="1"} 1',
+        't_latency_seconds_bucket{le="+Inf"} 1',
+        "t_latency_seconds_sum 0.5",
+        "t_latency_seconds_count 1",
+        "# HELP t_depth Depth",
+        "# TYPE t_depth gauge",
+        "t_depth 7",
+    ]
+
+
+def test_series_carry_the_worker_label_with_several_workers(monkeypatch):
+    monkeypatch.setattr(settings, "workers", 2)
+    monkeypatch.setattr(settings, "worker_slot", 1)
+    lines = sample_registry().render().splitlines()
+
+    assert 't_requests_total{outcome="ok",worker="1"} 3' in lines
+    assert 't_latency_seconds_bucket{worker="1",le="+Inf"} 1' in lines
+    assert 't_latency_seconds_sum{worker="1"} 0.5' in lines
+    assert 't_depth{worker="1"} 7' in lines
@@ -0,0 +1,76 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import text
+
+from app.core.config import settings
+from app.core.database import engine
+from app.models.payment import PARTITIONED
+from app.models.record import PaymentRecord, to_us
+from app.services.core.partitions import CHILDREN, PartitionManager
+from app.services.core.repository import SqlPaymentRepository
+
+
+def utc(*args) -> datetime:
+    return datetime(*args, tzinfo=timezone.utc)
+
+
+@pytest.mark.parametrize(
+    "hours, instant, start",
+    [
+        (6, utc(2025, 7, 1, 13, 30), utc(2025, 7, 1, 12)),
+        (6, utc(2025, 7, 1, 12), utc(2025, 7, 1, 12)),
+        (24, utc(2025, 7, 1, 23, 59, 59), utc(2025, 7, 1)),
+        (5, utc(1970, 1, 1, 4, 59), utc(1970, 1, 1)),
+    ],
+)
+def test_windows_are_aligned_to_the_epoch(monkeypatch, hours, instant, start):
+    monkeypatch.setattr(settings, "payments_partition_hours", hours)
+    partitions = PartitionManager()
+    assert partitions._window(instant) == start
+
+
+def test_partition_names_sort_by_start():
+    partitions = PartitionManager()
+    names = [
+        partitions._name(utc(2025, 7, 1, 12)),
+        partitions._name(utc(2025, 7, 2, 6)),
+        partitions._name(utc(2025, 12, 31, 18)),
+    ]
+    assert names[0] == "payments_p2025070112"
+    assert names == sorted(names)
+
+
+@pytest.mark.skipif(not PARTITIONED, reason="payments_partition_hours=0")
+@pytest.mark.usefixtures("database")
+async def test_purge_counts_and_drops_past_partitions():
+    repository = SqlPaymentRepository()
+    partitions = repository.partitions
+    await partitions.ensure()
+
+    # Uma partição passada, com uma linha nela e outra na atual
+    now = datetime.now(timezone.utc)
+    past = partitions._window(now) - partitions.width
+    async with engine.begin() as conn:
+        await conn.execute(
+            text(
+                f"CREATE TABLE {partitions._name(past)} PARTITION OF payments"
+                f" FOR VALUES FROM ('{past.isoformat()}')"
+                f" TO ('{(past + partitions.width).isoformat()}')"
+            )
+        )
+    await repository.insert(
+        [
+            PaymentRecord(100, created_us=to_us(past + timedelta(minutes=1))),
+            PaymentRecord(200, created_us=to_us(now)),
+        ]
+    )
+
+    assert await repository.purge() == 2
+
+    async with engine.connect() as conn:
+        children = set(await conn.scalars(text(CHILDREN)))
+        count = await conn.scalar(text("SELECT count(*) FROM payments"))
+    assert partitions._name(past) not in children
+    assert partitions._name(partitions._window(now)) in children
+    assert count == 0
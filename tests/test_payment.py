@@ -0,0 +1,137 @@
+import asyncio
+
+import orjson
+import pytest
+
+from app.services.core.admission import AdmissionController
+from app.services.core.circuit import CircuitState
+from app.services.core.queue import PAYMENTS_PROCESSED, PAYMENTS_REJECTED
+from app.services.core.transport import TransportError
+from app.services.payment import PaymentProcessor
+
+# Sem o health e os circuitos em /dev/shm do host (compartilhados entre execuções)
+pytestmark = pytest.mark.usefixtures("isolated_state")
+
+
+class FakeTransport:
+    """Processador que cobra o POST e responde conforme `post_error`/`lookup`"""
+
+    def __init__(self, post_error=None, lookup=None):
+        self.post_error = post_error
+        self.lookup = lookup
+        self.posts = []
+        self.gets = []
+
+    async def post_json(self, url, body):
+        self.posts.append(url)
+        if self.post_error is not None:
+            raise self.post_error
+        return 200, orjson.dumps({"id": "charged"})
+
+    async def get(self, url):
+        self.gets.append(url)
+        if isinstance(self.lookup, Exception):
+            raise self.lookup
+        if self.lookup is None:
+            return 404, b""
+        return 200, orjson.dumps(self.lookup)
+
+    async def close(self):
+        pass
+
+
+async def test_circuit_rejection_leaves_limiter_and_stats_alone(clock):
+    processor = PaymentProcessor(clock)
+    try:
+        for config in processor.processors.values():
+            config["circuit_breaker"].on_health(failing=True)
+            assert config["circuit_breaker"].state == CircuitState.OPEN
+        limits = {pid: c["limiter"].limit for pid, c in processor.processors.items()}
+
+        for _ in range(20):
+            result = await processor.process_payment(1, 10.0)
+            assert result["rejected"]
+
+        for processor_id, config in processor.processors.items():
+            stats = processor.routing.stats[processor_id]
+            assert config["limiter"].limit == limits[processor_id]
+            assert config["limiter"].in_flight == 0
+            assert stats.samples == 0
+            assert stats.in_flight == 0
+    finally:
+        await processor.close()
+
+
+def test_drain_rate_ignores_circuit_rejections():
+    before = AdmissionController._completed()
+    PAYMENTS_REJECTED.inc(5)
+    assert AdmissionController._completed() == before
+
+    PAYMENTS_PROCESSED.inc()
+    assert AdmissionController._completed() == before + 1
+
+
+async def test_ambiguous_failure_is_confirmed_without_hedge(clock):
+    processor = PaymentProcessor(clock)
+    processor.transport = FakeTransport(
+        post_error=ConnectionResetError("dropped after write"),
+        lookup={"id": "charged"},
+    )
+    try:
+        assert processor.hedge is None
+        result = await processor.process_payment(7, 10.0)
+        assert result["success"]
+        assert result["external_id"] == "charged"
+        assert len(processor.transport.posts) == 1
+        assert processor.transport.gets[0].endswith("/payments/7")
+    finally:
+        await processor.close()
+
+
+async def test_duplicate_is_success_after_lookup(clock):
+    processor = PaymentProcessor(clock)
+    processor.transport = FakeTransport(
+        post_error=TransportError("HTTP 422", 422), lookup={"id": "earlier"}
+    )
+    try:
+        result = await processor.process_payment(7, 10.0)
+        assert result["success"]
+        assert result["external_id"] == "earlier"
+    finally:
+        await processor.close()
+
+
+async def test_unresolved_ambiguous_failure_pins_the_retry(clock):
+    processor = PaymentProcessor(clock)
+    processor.transport = FakeTransport(
+        post_error=asyncio.TimeoutError(), lookup=ConnectionResetError()
+    )
+    try:
+        result = await processor.process_payment(7, 10.0)
+        assert not result["success"]
+        assert result["ambiguous"]
+
+        # A retentativa vai para o mesmo processador, mesmo que o roteamento
+        # preferisse o outro
+        pinned = result["processor_id"]
+        other = 1 - pinned
+        processor.processors[pinned]["fee"] = 0.5
+        processor.transport = FakeTransport()
+        retry = await processor.process_payment(7, 10.0, processor_id=pinned)
+        assert retry["success"]
+        assert retry["processor_id"] == pinned
+        assert await processor.get_optimal_processor() == other
+    finally:
+        await processor.close()
+
+
+async def test_http_error_is_not_ambiguous(clock):
+    processor = PaymentProcessor(clock)
+    processor.transport = FakeTransport(post_error=TransportError("HTTP 500", 500))
+    try:
+        result = await processor.process_payment(7, 10.0)
+        assert not result["success"]
+        assert not result["ambiguous"]
+        assert processor.transport.gets == []
+    finally:
+        await processor.close()
@@ -0,0 +1,81 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import select, update
+
+from app.core.config import settings
+from app.core.database import async_session
+from app.models.payment import Payment, PaymentStatus
+from app.services.core.pgqueue import PostgresQueueBackend
+
+pytestmark = pytest.mark.usefixtures("database")
+
+
+async def insert(*payments: Payment) -> list:
+    async with async_session() as session:
+        session.add_all(payments)
+        await session.commit()
+    return [payment.id for payment in payments]
+
+
+async def rows() -> dict:
+    async with async_session() as session:
+        result = await session.execute(
+            select(Payment.id, Payment.status, Payment.claimed_by)
+        )
+        return {row.id: (row.status, row.claimed_by) for row in result}
+
+
+def backend(slot: int, monkeypatch) -> PostgresQueueBackend:
+    monkeypatch.setattr(settings, "instance_id", "test")
+    monkeypatch.setattr(settings, "worker_slot", slot)
+    return PostgresQueueBackend()
+
+
+async def test_claim_takes_pending_and_unowned_retrying_rows(monkeypatch):
+    pending, retrying, owned = await insert(
+        Payment(amount=10),
+        Payment(amount=20, status=PaymentStatus.RETRYING, processor_id=1),
+        Payment(amount=30, status=PaymentStatus.RETRYING, claimed_by="other:0"),
+    )
+    first, second = backend(0, monkeypatch), backend(1, monkeypatch)
+
+    claimed = await first.claim(10)
+    assert [(task.id, task.cents, task.pinned) for task in claimed] == [
+        (pending, 1000, None),
+        (retrying, 2000, 1),
+    ]
+    assert await second.claim(10) == []
+    assert (await rows())[owned] == (PaymentStatus.RETRYING, "other:0")
+    assert (await rows())[pending] == (PaymentStatus.PROCESSING, first.owner)
+
+
+async def test_sweep_recovers_only_expired_leases_of_other_owners(monkeypatch):
+    expired = datetime.now(timezone.utc) - timedelta(
+        seconds=settings.queue_lease_seconds + 1
+    )
+    dead, alive, mine = await insert(
+        Payment(amount=10, status=PaymentStatus.PROCESSING, claimed_by="dead:0"),
+        Payment(amount=20, status=PaymentStatus.PROCESSING, claimed_by="alive:0"),
+        Payment(amount=30, status=PaymentStatus.RETRYING, claimed_by="test:0"),
+    )
+    async with async_session() as session:
+        await session.execute(
+            update(Payment)
+            .where(Payment.id.in_([dead, mine]))
+            .values(updated_at=expired)
+            .execution_options(synchronize_session=False)
+        )
+        await session.commit()
+
+    queue = backend(0, monkeypatch)
+    assert await queue.sweep() == 1
+    assert await rows() == {
+        dead: (PaymentStatus.PENDING, None),
+        alive: (PaymentStatus.PROCESSING, "alive:0"),
+        mine: (PaymentStatus.RETRYING, "test:0"),
+    }
+
+    # O dono devolve o próprio trabalho (RETRYING continua, sem dono)
+    assert await queue.release() == 1
+    assert (await rows())[mine] == (PaymentStatus.RETRYING, None)
@@ -0,0 +1,94 @@
+import asyncio
+import threading
+import time
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.core.config import Settings
+from app.core.profiling import LoopLagMonitor, SamplingProfiler
+from app.routes import admin
+
+
+def spin(until: threading.Event) -> None:
+    while not until.is_set():
+        pass
+
+
+def test_profiler_samples_the_target_thread_in_collapsed_format():
+    profiler = SamplingProfiler()
+    target = threading.get_ident()
+    done = threading.Event()
+    result = {}
+
+    def collect():
+        result["stacks"] = profiler.sample(0.05, 0.001, [target])
+        done.set()
+
+    sampler = threading.Thread(target=collect)
+    sampler.start()
+    spin(done)
+    sampler.join()
+
+    # Raiz -> folha, só a thread alvo (a thread do sampler nunca aparece)
+    stacks = result["stacks"]
+    test_frame = "test_profiler_samples_the_target_thread_in_collapsed_format ("
+    assert all(test_frame in stack for stack in stacks)
+    assert any(";spin (tests/test_profiling.py:" in stack for stack in stacks)
+    assert not any("collect (" in stack for stack in stacks)
+
+
+def test_profiler_runs_one_collection_at_a_time():
+    profiler = SamplingProfiler()
+    started = threading.Event()
+
+    def slow_sample():
+        started.set()
+        profiler.sample(0.1, 0.01)
+
+    sampler = threading.Thread(target=slow_sample)
+    sampler.start()
+    started.wait()
+    while not profiler.busy:
+        time.sleep(0.001)
+
+    with pytest.raises(RuntimeError):
+        profiler.sample(0.01)
+    sampler.join()
+    assert not profiler.busy
+
+
+async def test_loop_monitor_reports_the_blocking_callback():
+    monitor = LoopLagMonitor(interval_ms=10, slow_ms=50)
+    await monitor.start()
+    await asyncio.sleep(0.02)
+
+    def block_the_loop():
+        time.sleep(0.2)
+
+    block_the_loop()
+    await asyncio.sleep(0.05)
+    await monitor.stop()
+
+    snapshot = monitor.snapshot()
+    assert snapshot["max_ms"] >= 150
+    [report] = snapshot["slow_callbacks"]
+    assert report["blocked_ms"] >= 50
+    assert "block_the_loop" in report["stack"][-1]
+
+
+def test_admin_profile_rejects_a_concurrent_run():
+    app = FastAPI()
+    app.include_router(admin.router)
+    app.state.profiler = SamplingProfiler()
+
+    with TestClient(app) as client:
+        with app.state.profiler._lock:
+            response = client.get("/admin/profile", params={"seconds": 0.01})
+
+    assert response.status_code == 409
+
+
+def test_admin_routes_are_opt_in():
+    assert Settings.model_fields["admin_enabled"].default is False
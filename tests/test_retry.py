@@ -0,0 +1,73 @@
+import asyncio
+
+import pytest
+
+from app.services.core.retry import RetryScheduler
+
+
+def test_backoff_is_exponential_with_equal_jitter():
+    scheduler = RetryScheduler(lambda item: None, base_delay=0.5, max_delay=4.0)
+    for attempts, ceiling in ((1, 0.5), (2, 1.0), (3, 2.0), (4, 4.0), (10, 4.0)):
+        for _ in range(50):
+            assert ceiling / 2 <= scheduler.backoff(attempts) <= ceiling
+
+
+def test_items_are_delivered_in_due_order(clock, run_virtual):
+    delivered = []
+
+    async def scenario():
+        scheduler = RetryScheduler(
+            lambda item: delivered.append((item, clock.monotonic() - clock.ORIGIN)),
+            clock=clock,
+        )
+        await scheduler.start()
+        scheduler.schedule("late", 2.0)
+        scheduler.schedule("early", 0.5)
+        scheduler.schedule("middle", 1.0)
+        await asyncio.sleep(3.0)
+        await scheduler.stop()
+        return scheduler
+
+    scheduler = run_virtual(scenario())
+
+    assert [item for item, _ in delivered] == ["early", "middle", "late"]
+    assert [due for _, due in delivered] == pytest.approx([0.5, 1.0, 2.0])
+    assert len(scheduler) == 0
+
+
+def test_stop_keeps_pending_items(clock, run_virtual):
+    delivered = []
+
+    async def scenario():
+        scheduler = RetryScheduler(delivered.append, clock=clock)
+        await scheduler.start()
+        scheduler.schedule("soon", 0.1)
+        scheduler.schedule("later", 60.0)
+        await asyncio.sleep(1.0)
+        await scheduler.stop()
+        return scheduler
+
+    scheduler = run_virtual(scenario())
+
+    assert delivered == ["soon"]
+    assert len(scheduler) == 1
+
+
+def test_callback_error_does_not_stop_the_timer(clock, run_virtual):
+    delivered = []
+
+    def callback(item):
+        if item == "bad":
+            raise RuntimeError("boom")
+        delivered.append(item)
+
+    async def scenario():
+        scheduler = RetryScheduler(callback, clock=clock)
+        await scheduler.start()
+        scheduler.schedule("bad", 0.1)
+        scheduler.schedule("good", 0.2)
+        await asyncio.sleep(1.0)
+        await scheduler.stop()
+
+    run_virtual(scenario())
+    assert delivered == ["good"]
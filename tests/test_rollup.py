@@ -0,0 +1,83 @@
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import select
+
+from app.core.config import settings
+from app.core.database import async_session
+from app.models.payment import Payment, PaymentStatus
+from app.models.record import PaymentRecord, to_us
+from app.services.core.repository import SqlPaymentRepository
+
+
+class Session:
+    """Devolve `open_ids` no SELECT ... FOR UPDATE e guarda o upsert"""
+
+    def __init__(self, open_ids):
+        self.open_ids = open_ids
+        self.upserts = []
+
+    async def execute(self, statement, params=None):
+        if params is None:
+            return SimpleNamespace(scalars=lambda: iter(self.open_ids))
+        self.upserts.append(params)
+
+
+@pytest.fixture
+def repository(monkeypatch):
+    monkeypatch.setattr(settings, "summary_backend", "rollup")
+    monkeypatch.setattr(settings, "summary_bucket_ms", 1000)
+    return SqlPaymentRepository()
+
+
+async def test_roll_up_sums_only_unfinished_payments_per_bucket(repository):
+    completed = {
+        1: (0, 1000, 5_100),
+        2: (0, 2500, 5_900),
+        3: (1, 700, 5_500),
+        4: (0, 300, 6_000),
+        5: (0, 9999, 5_000),  # já estava concluído no banco
+    }
+    session = Session([1, 2, 3, 4])
+    await repository._roll_up(session, completed)
+
+    # Uma linha por (processador, bucket), em ordem fixa de chave
+    assert session.upserts == [
+        [
+            {"processor_id": 0, "bucket": 5_000, "count": 2, "cents": 3500},
+            {"processor_id": 0, "bucket": 6_000, "count": 1, "cents": 300},
+            {"processor_id": 1, "bucket": 5_000, "count": 1, "cents": 700},
+        ]
+    ]
+
+
+async def test_roll_up_skips_the_upsert_when_everything_was_counted(repository):
+    session = Session([])
+    await repository._roll_up(session, {1: (0, 1000, 5_100)})
+    assert session.upserts == []
+
+
+@pytest.mark.usefixtures("database")
+async def test_resent_completion_is_counted_once(repository):
+    created_at = datetime(2025, 7, 1, 12, tzinfo=timezone.utc)
+    [payment_id] = await repository.insert(
+        [PaymentRecord(1990, "BRL", to_us(created_at))]
+    )
+    created_ms = int(created_at.timestamp() * 1000)
+    row = {
+        "id": payment_id,
+        "created_at": created_at,
+        "status": PaymentStatus.COMPLETED,
+        "processor_id": 0,
+    }
+
+    for _ in range(2):
+        await repository.update_status([row], {payment_id: (0, 1990, created_ms)})
+
+    assert await repository.summary((0, 1)) == {0: (1, 1990), 1: (0, 0)}
+    async with async_session() as session:
+        status = await session.scalar(
+            select(Payment.status).where(Payment.id == payment_id)
+        )
+    assert status == PaymentStatus.COMPLETED
@@ -0,0 +1,118 @@
+import pytest
+
+from app.services.core.routing import (
+    Candidate,
+    CostModelStrategy,
+    PriorityStrategy,
+    RoutingEngine,
+    create_strategy,
+)
+
+
+def candidate(processor_id, **overrides) -> Candidate:
+    values = dict(
+        processor_id=processor_id,
+        fee=0.05,
+        priority=processor_id,
+        available=True,
+        saturated=False,
+        latency=0.05,
+        success_rate=1.0,
+        in_flight=0,
+        limit=10,
+        waiting=0,
+    )
+    values.update(overrides)
+    return Candidate(**values)
+
+
+def test_priority_prefers_lowest_priority_then_fee():
+    strategy = PriorityStrategy()
+    decision = strategy.choose(
+        [candidate(0, fee=0.05), candidate(1, fee=0.01, priority=0)]
+    )
+    assert decision.processor_id == 1
+
+
+def test_cost_model_trades_fee_for_latency():
+    strategy = CostModelStrategy(max_hold=0.05)
+    cheap_slow = candidate(0, fee=0.05, latency=1.0)
+    pricey_fast = candidate(1, fee=0.15, latency=0.05)
+    assert strategy.choose([cheap_slow, pricey_fast]).processor_id == 1
+
+    cheap_fast = candidate(0, fee=0.05, latency=0.05)
+    assert strategy.choose([cheap_fast, pricey_fast]).processor_id == 0
+
+
+def test_cost_model_holds_for_saturated_processor_when_worth_it():
+    strategy = CostModelStrategy(max_hold=0.05)
+    saturated = candidate(0, fee=0.05, latency=0.01, saturated=True, limit=10)
+    fallback = candidate(1, fee=0.15, latency=0.5)
+
+    decision = strategy.choose([saturated, fallback])
+    assert decision.processor_id == 0
+    assert decision.hold == pytest.approx(0.001)
+
+    assert strategy.choose([saturated, fallback], allow_hold=False).processor_id == 1
+
+
+def test_falls_back_to_least_loaded_when_nothing_is_available():
+    strategy = CostModelStrategy(max_hold=0.05)
+    decision = strategy.choose(
+        [
+            candidate(0, available=False, in_flight=5),
+            candidate(1, available=False, in_flight=2),
+        ]
+    )
+    assert decision.processor_id == 1
+
+
+def test_unknown_strategy_is_rejected():
+    with pytest.raises(ValueError):
+        create_strategy("random")
+
+
+def test_engine_tracks_in_flight_and_ewma():
+    engine = RoutingEngine((0, 1), strategy=PriorityStrategy(), alpha=0.5)
+    engine.begin(0)
+    assert engine.in_flight(0) == 1
+
+    engine.end(0, 0.25, True)
+    stats = engine.stats[0]
+    assert engine.in_flight(0) == 0
+    assert stats.latency == pytest.approx(0.15)
+
+    engine.begin(0)
+    engine.end(0, 5.0, False)
+    assert stats.success_rate == pytest.approx(0.5)
+    # Falha não entra na média de latência
+    assert stats.latency == pytest.approx(0.15)
+
+
+def test_success_rate_recovers_on_healthy_checks_after_a_burst_of_failures():
+    engine = RoutingEngine(
+        (0, 1), strategy=CostModelStrategy(max_hold=0.0), alpha=0.2, recovery=0.5
+    )
+
+    def choice() -> int:
+        return engine.choose(
+            [
+                candidate(pid, success_rate=stats.success_rate, fee=(0.02, 0.10)[pid])
+                for pid, stats in engine.stats.items()
+            ]
+        ).processor_id
+
+    assert choice() == 0
+    for _ in range(20):
+        engine.begin(0)
+        engine.end(0, 0.05, False)
+    assert choice() == 1
+
+    # Sem tráfego a média não se move; falhando no health check também não
+    engine.on_health(0, failing=True)
+    assert choice() == 1
+
+    for _ in range(4):
+        engine.on_health(0, failing=False)
+    assert engine.stats[0].success_rate > 0.9
+    assert choice() == 0
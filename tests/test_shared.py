@@ -0,0 +1,99 @@
+import os
+import struct
+
+from app.core.shared import LeaderLock, SharedCounters, SharedRecord
+
+LAYOUT = struct.Struct("<qd")
+
+
+def test_record_round_trips_between_mappings(tmp_path):
+    path = str(tmp_path / "record")
+    writer = SharedRecord(path, LAYOUT)
+    reader = SharedRecord(path, LAYOUT)
+    try:
+        assert reader.read() == (0, 0.0)
+        writer.write(7, 1.5)
+        assert reader.read() == (7, 1.5)
+        assert reader.update(lambda count, value: (count + 1, value * 2)) == (8, 3.0)
+        assert writer.read() == (8, 3.0)
+    finally:
+        writer.close()
+        reader.close()
+
+
+def test_odd_sequence_left_by_a_dead_writer(tmp_path):
+    path = str(tmp_path / "record")
+    writer = SharedRecord(path, LAYOUT)
+    reader = SharedRecord(path, LAYOUT)
+    try:
+        writer.write(1, 1.0)
+        assert reader.read() == (1, 1.0)
+
+        # Escritor morreu no meio: sequência ímpar e valores pela metade
+        (sequence,) = SharedRecord.SEQUENCE.unpack_from(writer.buffer, 0)
+        SharedRecord.SEQUENCE.pack_into(writer.buffer, 0, sequence + 1)
+        LAYOUT.pack_into(writer.buffer, SharedRecord.SEQUENCE.size, 99, 0.0)
+
+        # A leitura não fica presa: devolve a última leitura boa (ou zeros)
+        assert reader.read() == (1, 1.0)
+        fresh = SharedRecord(path, LAYOUT)
+        assert fresh.read() == (0, 0.0)
+        fresh.close()
+
+        # A próxima escrita devolve a sequência a um valor par
+        writer.write(2, 2.0)
+        (sequence,) = SharedRecord.SEQUENCE.unpack_from(writer.buffer, 0)
+        assert sequence % 2 == 0
+        assert reader.read() == (2, 2.0)
+    finally:
+        writer.close()
+        reader.close()
+
+
+def test_counters_sum_each_slot_row(tmp_path):
+    path = str(tmp_path / "counters")
+    first = SharedCounters(path, slots=2, width=2, slot=0)
+    second = SharedCounters(path, slots=2, width=2, slot=1)
+
+    first.add(0, 3)
+    second.add(0, 4)
+    second.add(1, -1)
+    assert (first.total(0), first.total(1)) == (7, -1)
+
+    # Um worker reiniciado zera só a própria linha
+    second.clear_slot()
+    assert (first.total(0), first.total(1)) == (3, 0)
+
+
+def test_anonymous_counters_are_shared_with_forked_children():
+    counters = SharedCounters("", slots=2, width=1, slot=0)
+    pid = os.fork()
+    if pid == 0:
+        # Filho escreve na linha do slot 1
+        counters.offset = 1
+        counters.add(0, 5)
+        os._exit(0)
+
+    os.waitpid(pid, 0)
+    counters.add(0, 1)
+    assert counters.total(0) == 6
+
+
+def test_only_one_leader_until_it_releases(tmp_path):
+    path = str(tmp_path / "leader.lock")
+    first, second = LeaderLock(path), LeaderLock(path)
+    try:
+        assert first.try_acquire()
+        assert first.try_acquire()
+        assert not second.try_acquire()
+
+        first.release()
+        assert second.try_acquire()
+        assert not first.try_acquire()
+    finally:
+        first.release()
+        second.release()
+
+
+def test_without_a_path_every_process_leads():
+    assert LeaderLock("").try_acquire()
@@ -0,0 +1,107 @@
+import time
+
+from app.models.record import PaymentRecord
+from app.services.core.spill import SpillLog, SpillQueue, decode_task, encode_task
+
+NEW, RETRY = 0, 1
+
+
+def record(cents: int) -> PaymentRecord:
+    task = PaymentRecord(cents, id=cents)
+    task.enqueued_at = time.perf_counter()
+    return task
+
+
+async def drain(queue: SpillQueue):
+    cents = []
+    while not queue.empty():
+        cents.append((await queue.get()).cents)
+        queue.task_done()
+    return cents
+
+
+def test_spill_log_is_fifo_and_survives_reopen(tmp_path):
+    path = str(tmp_path / "log")
+    log = SpillLog(path)
+    for i in range(3):
+        log.append(i, i * 100, 0, 0, NEW, b"BRL", 0)
+    assert log.pop()[0] == 0
+    log.close()
+
+    reopened = SpillLog(path)
+    assert len(reopened) == 2
+    assert [reopened.pop()[0] for _ in range(2)] == [1, 2]
+
+
+def test_spill_log_prepend_keeps_order(tmp_path):
+    log = SpillLog(str(tmp_path / "log"))
+    for i in range(5):
+        log.append(i, 0, 0, 0, NEW, b"BRL", 0)
+    log.pop()
+
+    # Sem espaço livre no início: desloca os existentes
+    log.prepend([(10 + i, 0, 0, 0, NEW, b"BRL", 0) for i in range(3)])
+    # Espaço consumido no início: reaproveita
+    log.pop()
+    log.prepend([(20, 0, 0, 0, NEW, b"BRL", 0)])
+
+    assert [log.pop()[0] for _ in range(len(log))] == [20, 11, 12, 1, 2, 3, 4]
+
+
+async def test_priority_then_arrival_order():
+    queue = SpillQueue(capacity=10)
+    queue.put(RETRY, record(1))
+    queue.put(NEW, record(2))
+    queue.put(NEW, record(3))
+    queue.put(RETRY, record(4))
+
+    assert await drain(queue) == [2, 3, 1, 4]
+
+
+async def test_overflow_goes_to_disk_in_arrival_order(tmp_path):
+    queue = SpillQueue(capacity=2, path=str(tmp_path / "spill"))
+    queue.open()
+    for cents in range(1, 7):
+        queue.put(NEW, record(cents))
+
+    assert queue.spilled == 4
+    assert queue.qsize() == 6
+    assert await drain(queue) == [1, 2, 3, 4, 5, 6]
+
+
+async def test_persist_keeps_fifo_across_restart(tmp_path):
+    path = str(tmp_path / "spill")
+    queue = SpillQueue(capacity=2, path=path)
+    queue.open()
+    for cents in range(1, 6):
+        queue.put(NEW, record(cents))
+    queue.persist()
+    queue.close()
+
+    restarted = SpillQueue(capacity=2, path=path)
+    restarted.open()
+    assert await drain(restarted) == [1, 2, 3, 4, 5]
+
+
+async def test_head_age_follows_the_next_task():
+    queue = SpillQueue(capacity=10)
+    assert queue.head_age() == 0.0
+
+    old = record(1)
+    old.enqueued_at -= 5
+    queue.put(RETRY, old)
+    queue.put(NEW, record(2))
+    assert queue.head_age() < 1
+
+    await queue.get()
+    assert queue.head_age() >= 5
+
+    queue.clear()
+    assert queue.head_age() == 0.0
+
+
+def test_pinned_processor_survives_the_spill_record():
+    task = PaymentRecord(1000, id=5, attempts=2, pinned=0)
+    priority, decoded = decode_task(encode_task(NEW, task))
+    assert (priority, decoded.pinned, decoded.attempts) == (NEW, 0, 2)
+    assert decode_task(encode_task(NEW, PaymentRecord(1, id=6)))[1].pinned is None
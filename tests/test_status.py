@@ -0,0 +1,84 @@
+import asyncio
+
+from app.services.core.status import StatusWriter
+
+
+class Repository:
+    """Guarda os lotes de status gravados; pode falhar sob demanda"""
+
+    def __init__(self):
+        self.batches = []
+        self.fail = False
+
+    async def update_status(self, rows, completed):
+        await asyncio.sleep(0.001)
+        if self.fail:
+            raise ConnectionError("database down")
+        self.batches.append((rows, completed))
+
+
+def test_updates_to_the_same_payment_are_coalesced(run_virtual):
+    repository = Repository()
+
+    async def scenario():
+        writer = StatusWriter(repository, interval_ms=10, batch_size=100)
+        await writer.start()
+        writer.update(1, status="processing")
+        writer.update(2, status="processing")
+        writer.complete(1, 1990, 1000, status="completed", processor_id=0)
+        await asyncio.sleep(0.05)
+        await writer.stop()
+
+    run_virtual(scenario())
+    assert repository.batches == [
+        (
+            [
+                {"id": 1, "status": "completed", "processor_id": 0},
+                {"id": 2, "status": "processing"},
+            ],
+            {1: (0, 1990, 1000)},
+        )
+    ]
+
+
+def test_full_batch_is_flushed_before_the_interval(clock, run_virtual):
+    repository = Repository()
+
+    async def scenario():
+        writer = StatusWriter(repository, interval_ms=1000, batch_size=2)
+        await writer.start()
+        start = clock.monotonic()
+        writer.update(1, status="failed")
+        writer.update(2, status="failed")
+        while not repository.batches:
+            await asyncio.sleep(0.001)
+        elapsed = clock.monotonic() - start
+        await writer.stop()
+        return elapsed
+
+    assert run_virtual(scenario()) < 0.1
+
+
+def test_failed_flush_keeps_newer_updates(run_virtual):
+    repository = Repository()
+
+    async def scenario():
+        writer = StatusWriter(repository, interval_ms=1000, batch_size=100)
+        writer.update(1, status="processing", retries=1)
+        writer.complete(2, 500, 1000, status="completed", processor_id=1)
+        repository.fail = True
+        flush = asyncio.create_task(writer.flush())
+        await asyncio.sleep(0)
+        writer.update(1, status="completed")
+        await flush
+
+        repository.fail = False
+        await writer.flush()
+
+    run_virtual(scenario())
+    [(rows, completed)] = repository.batches
+    assert rows == [
+        {"id": 1, "status": "completed", "retries": 1},
+        {"id": 2, "status": "completed", "processor_id": 1},
+    ]
+    assert completed == {2: (1, 500, 1000)}
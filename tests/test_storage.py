@@ -0,0 +1,80 @@
+import asyncio
+
+from app.core.storage import INSERT, UPDATE, PaymentLog, read_header, read_log
+
+
+def insert(log: PaymentLog, cents: int) -> int:
+    payment_id = log.allocate()
+    log.append(INSERT, 0, -1, b"BRL", 0, payment_id, cents, 0.0, 0, b"", b"")
+    return payment_id
+
+
+async def test_append_survives_reopen(tmp_path):
+    path = str(tmp_path / "payments.log")
+    log = PaymentLog(path)
+    first = insert(log, 100)
+    insert(log, 200)
+    log.append(UPDATE, 2, 0, b"BRL", 1, first, 100, 2.0, 0, b"ext", b"")
+    log.close()
+
+    reopened = PaymentLog(path)
+    assert (len(reopened), reopened.inserts, reopened.next_seq) == (3, 2, 2)
+    assert insert(reopened, 300) == 3
+    reopened.close()
+
+    header, records = read_log(path)
+    assert header[0] == 4
+    assert [record[0] for record in records] == [INSERT, INSERT, UPDATE, INSERT]
+
+
+async def test_grows_past_the_initial_size(tmp_path):
+    path = str(tmp_path / "payments.log")
+    log = PaymentLog(path)
+    for cents in range(10_000):
+        insert(log, cents)
+    log.close()
+
+    assert read_header(path)[0] == 10_000
+
+
+async def test_sync_waits_for_group_fsync(tmp_path):
+    log = PaymentLog(str(tmp_path / "payments.log"), fsync_interval=0.001)
+    await log.start()
+    insert(log, 100)
+
+    await asyncio.wait_for(log.sync(), timeout=1)
+    assert log.synced_index == 1
+    # Nada novo: retorna sem esperar
+    await asyncio.wait_for(log.sync(), timeout=0.01)
+
+    await log.stop()
+    log.close()
+
+
+async def test_reset_releases_pending_sync(tmp_path):
+    log = PaymentLog(str(tmp_path / "payments.log"))
+    insert(log, 100)
+    # Sem o syncer rodando: o waiter só é liberado pelo reset
+    waiter = asyncio.create_task(log.sync())
+    await asyncio.sleep(0)
+    assert not waiter.done()
+
+    log.reset(epoch=1)
+    await asyncio.wait_for(waiter, timeout=1)
+    assert (len(log), log.epoch) == (0, 1)
+    log.close()
+
+
+async def test_fsync_across_reset_does_not_cover_new_records(tmp_path):
+    log = PaymentLog(str(tmp_path / "payments.log"))
+    for cents in range(5):
+        insert(log, cents)
+
+    fsync = asyncio.create_task(log._fsync())
+    await asyncio.sleep(0)
+    log.reset(epoch=1)
+    insert(log, 100)
+    await fsync
+
+    assert log.synced_index == 0
+    log.close()
@@ -0,0 +1,108 @@
+from datetime import datetime, timedelta, timezone
+
+from app.services.core.summary import SharedSummaryIndex, SummaryIndex
+
+BASE = datetime(2025, 7, 1, 12, 0, 0, tzinfo=timezone.utc)
+
+
+def at(seconds: float) -> datetime:
+    return BASE + timedelta(seconds=seconds)
+
+
+def test_record_and_query_by_range():
+    index = SummaryIndex((0, 1), bucket_ms=1000)
+    index.record(0, 19.90, at(0))
+    index.record(0, 10.10, at(5))
+    index.record(1, 5.00, at(10))
+
+    assert index.summary() == {0: (2, 3000), 1: (1, 500)}
+    assert index.summary(at(1), at(20)) == {0: (1, 1010), 1: (1, 500)}
+    assert index.summary(at(11), None) == {0: (0, 0), 1: (0, 0)}
+    assert index.summary(at(20), at(1)) == {0: (0, 0), 1: (0, 0)}
+
+
+def test_edges_are_rounded_to_the_bucket():
+    index = SummaryIndex((0,), bucket_ms=1000)
+    index.record(0, 1.00, at(0.9))
+
+    # Mesmo bucket de 1 s: o bucket da ponta entra inteiro
+    assert index.summary(at(0.95), None) == {0: (1, 100)}
+    assert index.summary(None, at(0.1)) == {0: (1, 100)}
+
+
+def test_grows_in_both_directions():
+    index = SummaryIndex((0,), bucket_ms=1000)
+    index.record(0, 1.00, at(0))
+    index.record(0, 2.00, at(-10_000))
+    index.record(0, 3.00, at(10_000))
+
+    assert index.summary() == {0: (3, 600)}
+    assert index.summary(at(-1), at(1)) == {0: (1, 100)}
+
+
+def test_outlier_goes_to_sparse_map():
+    index = SummaryIndex((0,), bucket_ms=1000, max_buckets=64)
+    index.record(0, 1.00, at(0))
+    index.record(0, 2.00, at(365 * 86400))
+    index.record(0, 3.00, at(-365 * 86400))
+
+    assert index.capacity <= 64
+    assert index.summary() == {0: (3, 600)}
+    assert index.summary(at(1), None) == {0: (1, 200)}
+    assert index.summary(None, at(-1)) == {0: (1, 300)}
+
+
+def test_purge_clears_everything():
+    index = SummaryIndex((0,), bucket_ms=1000, max_buckets=64)
+    index.record(0, 1.00, at(0))
+    index.record(0, 2.00, at(86400))
+    index.purge()
+
+    assert index.summary() == {0: (0, 0)}
+    index.record(0, 4.00, at(0))
+    assert index.summary() == {0: (1, 400)}
+
+
+async def test_rebuild_from_repository():
+    class Repository:
+        async def completed(self):
+            for row in ((0, 100, 1_000), (1, 250, 2_000), (7, 999, 3_000)):
+                yield row
+
+    index = SummaryIndex((0, 1), bucket_ms=1000)
+    index.record(0, 50.00, at(0))
+    await index.rebuild(Repository())
+
+    assert index.summary() == {0: (1, 100), 1: (1, 250)}
+
+
+def test_shared_slots_sum_across_processes(tmp_path):
+    first = SharedSummaryIndex(
+        str(tmp_path), (0,), 1000, slot=0, slots=2, max_buckets=64
+    )
+    second = SharedSummaryIndex(
+        str(tmp_path), (0,), 1000, slot=1, slots=2, max_buckets=64
+    )
+    first.record(0, 1.00, at(0))
+    second.record(0, 2.00, at(1))
+    second.record(0, 4.00, at(86400))
+
+    assert first.summary() == {0: (3, 700)}
+    assert first.summary(None, at(10)) == {0: (2, 300)}
+
+    second.purge()
+    assert first.summary() == {0: (0, 0)}
+
+
+def test_shared_slot_restores_after_restart(tmp_path):
+    index = SharedSummaryIndex(
+        str(tmp_path), (0,), 1000, slot=0, slots=1, max_buckets=64
+    )
+    index.record(0, 1.00, at(0))
+    index.record(0, 2.00, at(86400))
+
+    restarted = SharedSummaryIndex(
+        str(tmp_path), (0,), 1000, slot=0, slots=1, max_buckets=64
+    )
+    assert restarted.restored
+    assert restarted.summary() == {0: (2, 300)}
@@ -0,0 +1,132 @@
+import asyncio
+
+import pytest
+
+from app.services.core.transport import StreamTransport, TransportError
+
+
+class Server:
+    """Servidor HTTP de teste: cada conexão responde conforme `handler`"""
+
+    def __init__(self, handler):
+        self.handler = handler
+        self.requests = 0
+        self.server = None
+
+    async def __aenter__(self):
+        self.server = await asyncio.start_server(self._serve, "127.0.0.1", 0)
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.server.close()
+        await self.server.wait_closed()
+
+    @property
+    def url(self) -> str:
+        port = self.server.sockets[0].getsockname()[1]
+        return f"http://127.0.0.1:{port}/payments"
+
+    async def _serve(self, reader, writer):
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                length = 0
+                while (header := await reader.readline()) not in (b"\r\n", b""):
+                    name, _, value = header.partition(b":")
+                    if name.lower() == b"content-length":
+                        length = int(value)
+                await reader.readexactly(length)
+                self.requests += 1
+                if not await self.handler(self.requests, writer):
+                    break
+        finally:
+            writer.close()
+
+
+def ok(body: bytes = b"{}") -> bytes:
+    return b"HTTP/1.1 200 OK\r\nContent-Length: %d\r\n\r\n%s" % (len(body), body)
+
+
+async def test_keep_alive_reuses_the_connection():
+    async def handler(count, writer):
+        writer.write(ok(b'{"n": %d}' % count))
+        return True
+
+    async with Server(handler) as server:
+        transport = StreamTransport(pool_size=1, timeout=2)
+        assert await transport.post_json(server.url, b"{}") == (200, b'{"n": 1}')
+        assert await transport.post_json(server.url, b"{}") == (200, b'{"n": 2}')
+        await transport.close()
+
+
+async def test_status_line_without_reason_and_bodyless_status():
+    async def handler(count, writer):
+        # Sem reason phrase e sem Content-Length: não pode esperar o EOF
+        writer.write(b"HTTP/1.1 204\r\n\r\n")
+        return True
+
+    async with Server(handler) as server:
+        transport = StreamTransport(pool_size=1, timeout=1)
+        assert await transport.get(server.url) == (204, b"")
+        await transport.close()
+
+
+async def test_malformed_status_line():
+    async def handler(count, writer):
+        writer.write(b"garbage\r\n\r\n")
+        return False
+
+    async with Server(handler) as server:
+        transport = StreamTransport(pool_size=1, timeout=1)
+        with pytest.raises(TransportError):
+            await transport.get(server.url)
+        await transport.close()
+
+
+async def test_post_is_not_resent_after_it_was_written():
+    async def handler(count, writer):
+        if count == 1:
+            writer.write(ok())
+            return True
+        # Segunda requisição recebida e conexão derrubada sem resposta
+        return False
+
+    async with Server(handler) as server:
+        transport = StreamTransport(pool_size=1, timeout=2)
+        await transport.post_json(server.url, b"{}")
+        with pytest.raises((ConnectionError, asyncio.IncompleteReadError)):
+            await transport.post_json(server.url, b"{}")
+        assert server.requests == 2
+        await transport.close()
+
+
+async def test_get_is_retried_once_on_a_fresh_connection():
+    async def handler(count, writer):
+        if count == 2:
+            return False
+        writer.write(ok())
+        return True
+
+    async with Server(handler) as server:
+        transport = StreamTransport(pool_size=1, timeout=2)
+        await transport.get(server.url)
+        assert await transport.get(server.url) == (200, b"{}")
+        assert server.requests == 3
+        await transport.close()
+
+
+async def test_stale_idle_connection_is_replaced_before_sending():
+    async def handler(count, writer):
+        writer.write(ok())
+        # Fecha o keep-alive logo após responder
+        return False
+
+    async with Server(handler) as server:
+        transport = StreamTransport(pool_size=1, timeout=2)
+        await transport.post_json(server.url, b"{}")
+        await asyncio.sleep(0.05)
+        assert await transport.post_json(server.url, b"{}") == (200, b"{}")
+        assert server.requests == 2
+        await transport.close()
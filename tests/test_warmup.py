@@ -0,0 +1,83 @@
+import asyncio
+from types import SimpleNamespace
+
+from app.services.core.warmup import WarmUp
+
+
+class SlowWarmUp(WarmUp):
+    """Etapas substituídas por esperas controladas pelo teste"""
+
+    def __init__(self):
+        super().__init__(queue_manager=None)
+        self.release = asyncio.Event()
+
+    async def warm_database(self) -> int:
+        await self.release.wait()
+        return 1
+
+    async def warm_processors(self):
+        return {}
+
+    async def warm_summary(self) -> int:
+        raise RuntimeError("summary unavailable")
+
+
+async def test_not_ready_until_background_warmup_finishes():
+    warmup = SlowWarmUp()
+    warmup.start()
+    await asyncio.sleep(0)
+    assert not warmup.ready
+
+    warmup.release.set()
+    await warmup._task
+    assert warmup.ready
+    assert warmup.report["database"]["ok"]
+    # Etapa que falha não impede a prontidão
+    assert not warmup.report["summary"]["ok"]
+
+
+async def test_stop_cancels_pending_warmup():
+    warmup = SlowWarmUp()
+    warmup.start()
+    await asyncio.sleep(0)
+
+    await warmup.stop()
+    assert not warmup.ready
+    assert warmup._task.cancelled()
+
+
+class Transport:
+    def __init__(self, opened):
+        self.opened = opened
+
+    async def warm(self, url, connections):
+        return self.opened[url.split("/")[2]]
+
+
+def processor_warmup(opened) -> WarmUp:
+    processor = SimpleNamespace(
+        processors={
+            pid: {
+                "url": f"http://{host}/payments",
+                "circuit_breaker": SimpleNamespace(name=host),
+            }
+            for pid, host in enumerate(opened)
+        },
+        transport=Transport(opened),
+    )
+    return WarmUp(SimpleNamespace(processor=processor))
+
+
+async def test_processor_step_fails_when_no_connection_opens():
+    warmup = processor_warmup({"p1": 8, "p2": 0})
+    await warmup._step("processors", warmup.warm_processors)
+    assert not warmup.report["processors"]["ok"]
+    assert "p2" in warmup.report["processors"]["error"]
+
+    warmup = processor_warmup({"p1": 8, "p2": 3})
+    await warmup._step("processors", warmup.warm_processors)
+    assert warmup.report["processors"] == {
+        "ok": True,
+        "result": {"p1": 8, "p2": 3},
+        "seconds": warmup.report["processors"]["seconds"],
+    }